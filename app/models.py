@@ -1,12 +1,9 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Boolean
-from sqlalchemy.orm import sessionmaker, declarative_base
-import os
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean
+from sqlalchemy.orm import declarative_base
 
-# Usar la DATABASE_URL de Railway o una local para desarrollo
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db")
+# Engine y pool compartidos (app/db.py)
+from app.db import DATABASE_URL, engine, SessionLocal, get_db, AsyncSessionLocal, get_async_db
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 # Definición de tu modelo de API
@@ -25,11 +22,3 @@ def create_tables():
     print("Attempting to create database tables...")
     Base.metadata.create_all(bind=engine)
     print("Tables created successfully (if they didn't exist).")
-
-# Función para obtener una sesión de la base de datos
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
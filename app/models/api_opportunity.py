@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, Index, exists, inspect, select, true
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -17,5 +17,43 @@ class ApiOpportunity(Base):
     tags = Column(String)
     is_processed = Column(Boolean, default=False)
     is_deployed = Column(Boolean, default=False)
+    deploy_failures = Column(Integer, default=0)  # despliegues fallidos (ver auto_deploy.MAX_DEPLOY_ATTEMPTS)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    # Una oportunidad por URL de origen: las pasadas que vuelven a leer
+    # posts/repos ya guardados insertan con ON CONFLICT DO NOTHING
+    __table_args__ = (Index('uq_api_opportunities_source_url', 'source_url', unique=True),)
+
+def ensure_unique_source_url(bind):
+    """Crea el índice único de source_url en tablas anteriores a él.
+    
+    create_all() no añade índices a tablas existentes. Antes de crearlo se
+    eliminan los duplicados: se conserva la fila más antigua de cada URL,
+    heredando is_processed/is_deployed si alguna copia los tenía.
+    """
+    table = ApiOpportunity.__table__
+    unique_index = next(index for index in table.indexes if index.unique)
+    if unique_index.name in {index["name"] for index in inspect(bind).get_indexes(table.name)}:
+        return
+    
+    dup = table.alias("dup")
+    keepers = (
+        select(func.min(table.c.id))
+        .where(table.c.source_url.isnot(None))
+        .group_by(table.c.source_url)
+    )
+    with bind.begin() as conn:
+        for flag in ("is_processed", "is_deployed"):
+            conn.execute(
+                table.update()
+                .where(
+                    table.c.id.in_(keepers),
+                    exists().where(dup.c.source_url == table.c.source_url, dup.c[flag] == true()),
+                )
+                .values({flag: True})
+            )
+        conn.execute(
+            table.delete().where(table.c.source_url.isnot(None), table.c.id.notin_(keepers))
+        )
+        unique_index.create(bind=conn, checkfirst=True)
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database import Base
+
+class HarvestCursor(Base):
+    """Posición de lectura de un flujo de una fuente (p.ej. r/webdev en Reddit)"""
+    __tablename__ = "harvest_cursors"
+
+    id = Column(Integer, primary_key=True, index=True)
+    source = Column(String(50), nullable=False)
+    stream = Column(String(100), nullable=False)
+    last_seen_id = Column(String(100))  # fullname del item más reciente ya procesado
+    last_seen_created = Column(Float)  # created_utc de ese item
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (UniqueConstraint('source', 'stream', name='uq_harvest_cursor_stream'),)
+
+class SeenItem(Base):
+    """Items ya procesados de fuentes sin orden cronológico (p.ej. repos de GitHub)"""
+    __tablename__ = "harvest_seen_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    source = Column(String(50), nullable=False)
+    item_key = Column(String(300), nullable=False)
+    first_seen_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_seen_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (UniqueConstraint('source', 'item_key', name='uq_harvest_seen_item'),)
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.services.dashboard_service import DashboardService
-from app.models import get_db, APIEndpoint, WrapperConfig, APIService
+from app.services.counter_service import CounterService
+from app.models import get_async_db
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
@@ -12,26 +13,12 @@ async def get_dashboard():
     return FileResponse('static/index.html')
 
 @router.get("/data")
-async def get_dashboard_data(db: Session = Depends(get_db)):
+async def get_dashboard_data(db: AsyncSession = Depends(get_async_db)):
     """Devuelve datos para el dashboard"""
     try:
         dashboard_service = DashboardService()
         
-        total_endpoints = db.query(APIEndpoint).count()
-        discovered_endpoints = db.query(APIEndpoint).filter(
-            APIEndpoint.description.like("%Descubierto automáticamente%")
-        ).count()
-        wrappers_count = db.query(WrapperConfig).count()
-        active_deployments = db.query(WrapperConfig).filter(
-            WrapperConfig.is_active == True
-        ).count()
-        
-        stats = {
-            "total_endpoints": total_endpoints,
-            "discovered_endpoints": discovered_endpoints,
-            "wrappers_count": wrappers_count,
-            "active_deployments": active_deployments
-        }
+        stats = await CounterService().dashboard_stats(db)
         
         dashboard_data = dashboard_service.generate_dashboard_data(stats)
         return dashboard_data
@@ -40,30 +27,25 @@ async def get_dashboard_data(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Error loading dashboard: {str(e)}")
 
 @router.get("/analytics")
-async def get_analytics_dashboard(db: Session = Depends(get_db)):
+async def get_analytics_dashboard(db: AsyncSession = Depends(get_async_db)):
     """Dashboard de analíticas"""
-    total_endpoints = db.query(APIEndpoint).count()
-    total_wrappers = db.query(WrapperConfig).count()
-    total_services = db.query(APIService).count()
-    
-    methods_count = {
-        "GET": db.query(APIEndpoint).filter(APIEndpoint.method == "GET").count(),
-        "POST": db.query(APIEndpoint).filter(APIEndpoint.method == "POST").count(),
-        "PUT": db.query(APIEndpoint).filter(APIEndpoint.method == "PUT").count(),
-        "DELETE": db.query(APIEndpoint).filter(APIEndpoint.method == "DELETE").count()
-    }
+    stats = await CounterService().dashboard_stats(db)
     
     return {
         "overview": {
-            "total_endpoints": total_endpoints,
-            "total_wrappers": total_wrappers,
-            "total_services": total_services,
+            "total_endpoints": stats["total_endpoints"],
+            "total_wrappers": stats["wrappers_count"],
+            "total_services": stats["total_services"],
             "success_rate": "95%"
         },
-        "method_distribution": methods_count,
+        "method_distribution": stats["method_distribution"],
         "growth_metrics": {
-            "endpoints_this_week": total_endpoints,
-            "wrappers_this_week": total_wrappers,
-            "deployments_this_week": 0
+            **{
+                f"{metric}_{window}": growth[window]
+                for metric, growth in stats["growth"].items()
+                for window in ("this_week", "last_week")
+            },
+            "change_pct": {metric: growth["change_pct"] for metric, growth in stats["growth"].items()},
+            "daily": {metric: growth["daily"] for metric, growth in stats["growth"].items()}
         }
     }
@@ -1,53 +1,82 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from app.services.discovery_service import APIDiscoveryService
-from app.models import get_db, APIEndpoint
+from fastapi import APIRouter, HTTPException, Depends, Body, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from app.services.crawler_service import AsyncCrawlerService, MAX_CRAWL_CONCURRENCY, MAX_PER_HOST_LIMIT
+from app.services.job_queue import get_job_queue
+from app.services.persistence_service import PersistenceService, BATCH_SIZE
+from app.services.counter_service import CounterService
+from app.models import get_async_db, SessionLocal
+import json
 
 router = APIRouter(prefix="/discovery", tags=["discovery"])
 
-@router.post("/discover")
-async def discover_apis(url: str, db: Session = Depends(get_db)):
-    """Descubre automáticamente endpoints API desde una URL"""
+@router.post("/discover", status_code=202)
+async def discover_apis(
+    url: str,
+    max_depth: int = Query(2, ge=0, le=5),
+    max_pages: int = Query(50, ge=1, le=1000)
+):
+    """Encola el descubrimiento de endpoints API desde una URL (y sus páginas /api, /docs, /v1...)"""
+    job_id = get_job_queue().enqueue("discovery.discover", url=url, max_depth=max_depth, max_pages=max_pages)
+    return {
+        "message": f"Descubrimiento de {url} encolado",
+        "job_id": job_id,
+        "status_url": f"/jobs/{job_id}"
+    }
+
+@router.post("/crawl")
+async def crawl_apis(
+    urls: List[str] = Body(..., embed=True),
+    max_concurrency: int = Query(50, ge=1, le=MAX_CRAWL_CONCURRENCY),
+    per_host_limit: int = Query(2, ge=1, le=MAX_PER_HOST_LIMIT),
+    max_depth: int = Query(0, ge=0, le=5),
+    max_pages: int = Query(50, ge=1, le=1000),
+    persist: bool = False
+):
+    """Descubre endpoints en muchas URLs a la vez y los emite como NDJSON"""
+    crawler = AsyncCrawlerService(
+        max_concurrency=max_concurrency,
+        per_host_limit=per_host_limit,
+        max_depth=max_depth,
+        max_pages_per_domain=max_pages,
+        use_bloom=len(urls) * max_pages > 100_000
+    )
+    
+    async def stream():
+        batch = []
+        async for endpoint in crawler.crawl(urls):
+            if persist:
+                batch.append(endpoint)
+                if len(batch) >= BATCH_SIZE:
+                    await run_in_threadpool(_persist_batch, batch)
+                    batch = []
+            yield json.dumps(endpoint, ensure_ascii=False) + "\n"
+        if batch:
+            await run_in_threadpool(_persist_batch, batch)
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+def _persist_batch(endpoints: List[dict]):
+    """Guarda un lote de endpoints del crawl en su propia sesión"""
+    db = SessionLocal()
     try:
-        discovery_service = APIDiscoveryService()
-        discovered_endpoints = discovery_service.discover_from_webpage(url)
-        
-        # Guardar endpoints descubiertos en la base de datos
-        saved_count = 0
-        for endpoint_data in discovered_endpoints:
-            try:
-                endpoint = APIEndpoint(
-                    name=f"discovered_{endpoint_data['method']}_{saved_count}",
-                    url=endpoint_data['url'],
-                    method=endpoint_data['method'],
-                    description=f"Descubierto automáticamente desde {url}"
-                )
-                db.add(endpoint)
-                saved_count += 1
-            except Exception as e:
-                print(f"Error guardando endpoint: {e}")
-        
+        PersistenceService().bulk_upsert_endpoints(db, endpoints)
         db.commit()
-        
-        return {
-            "message": f"Descubiertos {len(discovered_endpoints)} endpoints, guardados {saved_count}",
-            "discovered": discovered_endpoints,
-            "saved_count": saved_count
-        }
-        
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error en descubrimiento: {str(e)}")
+        db.rollback()
+        print(f"Error guardando endpoints: {e}")
+    finally:
+        db.close()
 
 @router.get("/stats")
-async def discovery_stats(db: Session = Depends(get_db)):
+async def discovery_stats(db: AsyncSession = Depends(get_async_db)):
     """Estadísticas de descubrimiento"""
-    total_endpoints = db.query(APIEndpoint).count()
-    discovered_endpoints = db.query(APIEndpoint).filter(
-        APIEndpoint.description.like("%Descubierto automáticamente%")
-    ).count()
+    stats = await CounterService().dashboard_stats(db)
     
     return {
-        "total_endpoints": total_endpoints,
-        "discovered_endpoints": discovered_endpoints,
-        "manual_endpoints": total_endpoints - discovered_endpoints
+        "total_endpoints": stats["total_endpoints"],
+        "discovered_endpoints": stats["discovered_endpoints"],
+        "manual_endpoints": stats["manual_endpoints"]
     }
@@ -0,0 +1,12 @@
+from fastapi import APIRouter, HTTPException
+from app.services.job_queue import get_job_queue
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+@router.get("/{job_id}")
+async def job_status(job_id: str):
+    """Estado, progreso y resultado de un job encolado"""
+    status = get_job_queue().status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job no encontrado")
+    return status
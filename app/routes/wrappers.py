@@ -1,129 +1,148 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from app.services.wrapper_service import APIWrapperService
-from app.models import get_db, APIEndpoint, WrapperConfig
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.services.artifact_service import artifact_etag, decompress_code, etag_matches, wrapper_artifact
+from app.services.job_queue import get_job_queue
+from app.services.persistence_service import endpoints_under
+from app.services.wrapper_service import DEFAULT_FLAVOR, WRAPPER_FLAVORS
+from app.models import get_async_db, APIEndpoint, WrapperConfig, AsyncSessionLocal
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, keyset_page, ndjson_export
 import json
 
 router = APIRouter(prefix="/wrappers", tags=["wrappers"])
 
-@router.post("/generate")
+@router.post("/generate", status_code=202)
 async def generate_wrapper(
     base_url: str,
     wrapper_type: str = "rest",
-    db: Session = Depends(get_db)
+    flavor: str = DEFAULT_FLAVOR,  # async (httpx) o sync (requests)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Genera un wrapper automático para una API"""
-    try:
-        # Obtener endpoints existentes para esta base URL
-        endpoints = db.query(APIEndpoint).filter(
-            APIEndpoint.url.like(f"%{base_url}%"),
-            APIEndpoint.is_active == True
-        ).all()
-        
-        if not endpoints:
+    """Encola la generación de un wrapper automático para una API"""
+    if wrapper_type not in ("rest", "graphql"):
+        raise HTTPException(status_code=400, detail="Tipo de wrapper no soportado")
+    if flavor not in WRAPPER_FLAVORS:
+        raise HTTPException(status_code=400, detail="Variante de wrapper no soportada")
+    
+    if wrapper_type == "rest":
+        try:
+            criteria = endpoints_under(base_url)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        has_endpoints = await db.scalar(
+            select(APIEndpoint.id).where(*criteria, APIEndpoint.is_active == True).limit(1)
+        )
+        if not has_endpoints:
             raise HTTPException(
                 status_code=404, 
                 detail=f"No se encontraron endpoints para {base_url}. Ejecuta /discovery/discover primero."
             )
-        
-        wrapper_service = APIWrapperService()
-        
-        # Convertir endpoints a formato para el wrapper
-        endpoint_data = [
-            {
-                "url": endpoint.url.replace(base_url, ""),
-                "method": endpoint.method,
-                "description": endpoint.description or ""
-            }
-            for endpoint in endpoints
-        ]
-        
-        if wrapper_type == "rest":
-            result = wrapper_service.create_rest_wrapper(base_url, endpoint_data)
-        elif wrapper_type == "graphql":
-            result = wrapper_service.create_graphql_wrapper(base_url)
-        else:
-            raise HTTPException(status_code=400, detail="Tipo de wrapper no soportado")
-        
-        # Guardar configuración del wrapper
-        wrapper_config = WrapperConfig(
-            name=f"wrapper_{base_url.replace('https://', '').replace('/', '_')}",
-            target_api_id=None,  # Podría vincularse a un APIService específico
-            wrapper_type=wrapper_type,
-            config=result["config"]
-        )
-        
-        db.add(wrapper_config)
-        db.commit()
-        
-        return {
-            "message": f"Wrapper {wrapper_type} generado exitosamente",
-            "wrapper_config_id": wrapper_config.id,
-            "endpoints_wrapped": len(endpoints),
-            "wrapper_code_preview": result["wrapper_code"][:500] + "..." if len(result["wrapper_code"]) > 500 else result["wrapper_code"],
-            "download_url": f"/wrappers/{wrapper_config.id}/download"
-        }
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generando wrapper: {str(e)}")
+    
+    job_id = get_job_queue().enqueue("wrappers.generate", base_url=base_url, wrapper_type=wrapper_type, flavor=flavor)
+    return {
+        "message": f"Generación del wrapper {wrapper_type} encolada",
+        "job_id": job_id,
+        "status_url": f"/jobs/{job_id}"
+    }
 
 @router.get("/{wrapper_id}/download")
-async def download_wrapper(wrapper_id: int, db: Session = Depends(get_db)):
-    """Descarga el código completo del wrapper"""
-    wrapper_config = db.query(WrapperConfig).filter(WrapperConfig.id == wrapper_id).first()
-    if not wrapper_config:
+async def download_wrapper(
+    wrapper_id: int,
+    request: Request,
+    raw: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Descarga el código del wrapper desde su artefacto generado.
+    
+    Con `raw=true` se sirve el fichero .py; si el cliente acepta gzip se
+    envía el blob guardado tal cual, sin descomprimir. El ETag es el
+    digest del artefacto, así que If-None-Match responde 304 sin leer el blob.
+    """
+    wrapper = (await db.execute(
+        select(WrapperConfig.wrapper_type, WrapperConfig.artifact_digest).where(WrapperConfig.id == wrapper_id)
+    )).first()
+    if not wrapper:
         raise HTTPException(status_code=404, detail="Wrapper no encontrado")
     
-    # Re-generar el wrapper (en una implementación real, se guardaría el código)
-    wrapper_service = APIWrapperService()
+    gzipped = raw and "gzip" in request.headers.get("accept-encoding", "")
+    if_none_match = request.headers.get("if-none-match")
+    if wrapper.artifact_digest:
+        etag = artifact_etag(wrapper.artifact_digest, gzipped)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag, "Vary": "Accept-Encoding"})
     
-    if wrapper_config.wrapper_type == "rest":
-        # Obtener endpoints para regenerar el wrapper
-        endpoints = db.query(APIEndpoint).filter(APIEndpoint.is_active == True).all()
-        endpoint_data = [
-            {
-                "url": endpoint.url,
-                "method": endpoint.method,
-                "description": endpoint.description or ""
-            }
-            for endpoint in endpoints
-        ]
-        
-        base_url = wrapper_config.config.get("base_url", "https://api.example.com")
-        result = wrapper_service.create_rest_wrapper(base_url, endpoint_data)
-        code = result["wrapper_code"]
+    artifact = await wrapper_artifact(db, wrapper_id, wrapper.artifact_digest)
+    if artifact is None:
+        # Borrado entre la consulta y la generación del artefacto
+        raise HTTPException(status_code=404, detail="Wrapper no encontrado")
+    digest, content = artifact
+    headers = {"ETag": artifact_etag(digest, gzipped), "Vary": "Accept-Encoding"}
+    filename = f"api_wrapper_{wrapper_id}.py"
     
-    else:
-        endpoint_url = wrapper_config.config.get("endpoint_url", "https://api.example.com/graphql")
-        result = wrapper_service.create_graphql_wrapper(endpoint_url)
-        code = result["wrapper_code"]
+    if raw:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+        if gzipped:
+            headers["Content-Encoding"] = "gzip"
+            return Response(content, media_type="text/x-python", headers=headers)
+        return Response(decompress_code(content), media_type="text/x-python", headers=headers)
     
+    return JSONResponse({
+        "filename": filename,
+        "content": decompress_code(content),
+        "wrapper_type": wrapper.wrapper_type,
+        "digest": digest
+    }, headers=headers)
+
+def endpoints_count_column(dialect: str):
+    """len(config["endpoints"]) calculado en la BD, sin traer el JSON completo"""
+    if dialect == "sqlite":
+        return func.coalesce(func.json_array_length(WrapperConfig.config, "$.endpoints"), 0)
+    if dialect == "postgresql":
+        return func.coalesce(func.json_array_length(WrapperConfig.config["endpoints"]), 0)
+    return None
+
+def serialize_wrapper(row) -> dict:
+    if "endpoints_count" in row._fields:
+        endpoints_count = row.endpoints_count
+    else:
+        endpoints_count = len(row.config.get("endpoints", [])) if row.config else 0
     return {
-        "filename": f"api_wrapper_{wrapper_id}.py",
-        "content": code,
-        "wrapper_type": wrapper_config.wrapper_type
+        "id": row.id,
+        "name": row.name,
+        "wrapper_type": row.wrapper_type,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "endpoints_count": endpoints_count
     }
 
 @router.get("/")
-async def list_wrappers(db: Session = Depends(get_db)):
-    """Lista todos los wrappers generados"""
-    wrappers = db.query(WrapperConfig).filter(WrapperConfig.is_active == True).all()
+async def list_wrappers(
+    after_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Lista los wrappers generados, paginados por id (`after_id`) o exportados completos en NDJSON"""
+    count_column = endpoints_count_column(db.bind.dialect.name)
+    columns = [WrapperConfig.id, WrapperConfig.name, WrapperConfig.wrapper_type, WrapperConfig.created_at]
+    columns.append(WrapperConfig.config if count_column is None else count_column.label("endpoints_count"))
+    stmt = select(*columns).where(WrapperConfig.is_active == True)
+    
+    if format == "ndjson":
+        return StreamingResponse(
+            ndjson_export(AsyncSessionLocal, stmt, WrapperConfig.id, serialize_wrapper),
+            media_type="application/x-ndjson"
+        )
     
+    rows, next_after_id = await keyset_page(db, stmt, WrapperConfig.id, after_id, limit)
     return {
-        "wrappers": [
-            {
-                "id": wrapper.id,
-                "name": wrapper.name,
-                "wrapper_type": wrapper.wrapper_type,
-                "created_at": wrapper.created_at.isoformat() if wrapper.created_at else None,
-                "endpoints_count": len(wrapper.config.get("endpoints", [])) if wrapper.config else 0
-            }
-            for wrapper in wrappers
-        ]
+        "wrappers": [serialize_wrapper(row) for row in rows],
+        "next_after_id": next_after_id
     }
 
 @router.post("/test/{wrapper_id}")
-async def test_wrapper(wrapper_id: int, method: str, endpoint: str, db: Session = Depends(get_db)):
+async def test_wrapper(wrapper_id: int, method: str, endpoint: str, db: AsyncSession = Depends(get_async_db)):
     """Prueba un wrapper específico"""
     # En una implementación completa, aquí se ejecutaría el código del wrapper
     # Por ahora, simulamos una respuesta
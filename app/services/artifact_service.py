@@ -0,0 +1,195 @@
+import gzip
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models import SessionLocal, APIEndpoint, WrapperArtifact, WrapperConfig
+from app.services.persistence_service import endpoints_under, relative_endpoint
+from app.services.wrapper_service import DEFAULT_FLAVOR, GENERATOR_VERSION, APIWrapperService
+
+# Nivel de gzip: el código generado es texto muy repetitivo, a partir de 6
+# apenas se gana tamaño y la compresión se hace una sola vez por artefacto
+GZIP_LEVEL = 6
+
+
+def canonical_endpoints(endpoints: List[Dict]) -> List[Dict[str, str]]:
+    """Endpoints sin duplicados y en orden estable: el mismo conjunto da el mismo código"""
+    unique = {
+        (endpoint['method'].upper(), endpoint['url'], endpoint.get('description') or '')
+        for endpoint in endpoints
+    }
+    return [
+        {"url": url, "method": method, "description": description}
+        for method, url, description in sorted(unique, key=lambda item: (item[1], item[0], item[2]))
+    ]
+
+
+def artifact_digest(wrapper_type: str, base_url: str, endpoints: List[Dict], flavor: str = DEFAULT_FLAVOR) -> str:
+    """sha256 de (tipo, variante, base_url, conjunto de endpoints, versión del generador)"""
+    payload = json.dumps(
+        [GENERATOR_VERSION, wrapper_type, flavor, base_url, canonical_endpoints(endpoints)],
+        ensure_ascii=False, separators=(',', ':')
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def artifact_etag(digest: str, gzipped: bool = False) -> str:
+    """ETag fuerte de un artefacto; la representación gzip lleva su propia etiqueta"""
+    return f'"{digest}.gz"' if gzipped else f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil de If-None-Match (RFC 9110): lista de etiquetas o '*'"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    tags = (tag.strip() for tag in if_none_match.split(','))
+    return etag in (tag[2:] if tag.startswith('W/') else tag for tag in tags)
+
+
+def compress_code(code: str) -> bytes:
+    # mtime=0: la misma entrada produce exactamente los mismos bytes
+    return gzip.compress(code.encode('utf-8'), compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def decompress_code(content: bytes) -> str:
+    return gzip.decompress(content).decode('utf-8')
+
+
+def wrapper_source_url(wrapper_type: str, config: Optional[Dict]) -> str:
+    """URL a partir de la que se generó un wrapper (base_url REST o endpoint GraphQL)"""
+    config = config or {}
+    if wrapper_type == "graphql":
+        return config.get("endpoint_url", "https://api.example.com/graphql")
+    return config.get("base_url", "https://api.example.com")
+
+
+class ArtifactService:
+    """Almacén de código generado direccionado por contenido (WrapperArtifact)"""
+
+    def __init__(self, wrapper_service: APIWrapperService = None):
+        self.wrapper_service = wrapper_service or APIWrapperService()
+
+    def load_endpoints(self, db: Session, base_url: str) -> List[Dict[str, str]]:
+        """Endpoints activos bajo la base URL, con la ruta relativa que usa el generador"""
+        rows = db.execute(
+            select(APIEndpoint.url, APIEndpoint.method, APIEndpoint.description)
+            .where(*endpoints_under(base_url), APIEndpoint.is_active == True)
+        ).all()
+        return canonical_endpoints([
+            {
+                "url": relative_endpoint(row.url, base_url),
+                "method": row.method or "GET",
+                "description": row.description or ""
+            }
+            for row in rows
+        ])
+
+    def get_or_create(
+        self, db: Session, wrapper_type: str, base_url: str, endpoints: List[Dict] = (), flavor: str = DEFAULT_FLAVOR
+    ) -> WrapperArtifact:
+        """Devuelve el artefacto de esta entrada, generándolo solo si aún no existe.
+
+        No hace commit; eso queda en manos del llamador. Si otro proceso
+        inserta el mismo digest a la vez, se reutiliza su fila.
+        """
+        endpoints = canonical_endpoints(endpoints)
+        digest = artifact_digest(wrapper_type, base_url, endpoints, flavor)
+        artifact = self.get(db, digest)
+        if artifact is not None:
+            return artifact
+
+        result = self._generate(wrapper_type, base_url, endpoints, flavor)
+        code = result["wrapper_code"]
+        content = compress_code(code)
+        artifact = WrapperArtifact(
+            digest=digest,
+            wrapper_type=wrapper_type,
+            flavor=flavor,
+            base_url=base_url,
+            generator_version=GENERATOR_VERSION,
+            endpoints_count=len(endpoints),
+            config=result["config"],
+            content=content,
+            size=len(code.encode('utf-8')),
+            compressed_size=len(content)
+        )
+        try:
+            with db.begin_nested():
+                db.add(artifact)
+        except IntegrityError:
+            artifact = self.get(db, digest)
+        return artifact
+
+    def get(self, db: Session, digest: str) -> Optional[WrapperArtifact]:
+        return db.scalar(select(WrapperArtifact).where(WrapperArtifact.digest == digest))
+
+    def for_wrapper(self, db: Session, wrapper_config: WrapperConfig) -> WrapperArtifact:
+        """Artefacto de un wrapper; los anteriores al almacén se generan una vez y se enlazan"""
+        if wrapper_config.artifact_digest:
+            artifact = self.get(db, wrapper_config.artifact_digest)
+            if artifact is not None:
+                return artifact
+
+        wrapper_type = wrapper_config.wrapper_type or "rest"
+        source_url = wrapper_source_url(wrapper_type, wrapper_config.config)
+        flavor = (wrapper_config.config or {}).get("flavor", DEFAULT_FLAVOR)
+        endpoints = self.load_endpoints(db, source_url) if wrapper_type == "rest" else []
+        artifact = self.get_or_create(db, wrapper_type, source_url, endpoints, flavor)
+        wrapper_config.artifact_digest = artifact.digest
+        return artifact
+
+    def code_for(self, db: Session, wrapper_config: WrapperConfig) -> str:
+        return decompress_code(self.for_wrapper(db, wrapper_config).content)
+
+    def _generate(self, wrapper_type: str, base_url: str, endpoints: List[Dict], flavor: str) -> Dict[str, Any]:
+        if wrapper_type == "rest":
+            return self.wrapper_service.create_rest_wrapper(base_url, endpoints, flavor)
+        if wrapper_type == "graphql":
+            return self.wrapper_service.create_graphql_wrapper(base_url, flavor=flavor)
+        raise ValueError("Tipo de wrapper no soportado")
+
+
+def materialize_wrapper_artifact(wrapper_id: int) -> Optional[Tuple[str, bytes]]:
+    """Enlaza un wrapper con su artefacto en su propia sesión; devuelve (digest, contenido gzip)"""
+    db = SessionLocal()
+    try:
+        wrapper_config = db.get(WrapperConfig, wrapper_id)
+        if wrapper_config is None:
+            return None
+        artifact = ArtifactService().for_wrapper(db, wrapper_config)
+        # Leídos antes del commit, que expira los atributos
+        digest, content = artifact.digest, artifact.content
+        db.commit()
+        return digest, content
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def read_artifact(db: AsyncSession, digest: Optional[str]) -> Optional[bytes]:
+    """Contenido comprimido de un artefacto: una lectura de blob por clave única"""
+    if not digest:
+        return None
+    return await db.scalar(select(WrapperArtifact.content).where(WrapperArtifact.digest == digest))
+
+
+async def wrapper_artifact(db: AsyncSession, wrapper_id: int, digest: Optional[str]) -> Optional[Tuple[str, bytes]]:
+    """(digest, contenido gzip) de un wrapper, o None si el wrapper ya no existe.
+
+    Los wrappers anteriores al almacén no tienen artefacto: se generan una
+    sola vez, fuera del event loop y en su propia sesión, y quedan enlazados.
+    """
+    content = await read_artifact(db, digest)
+    if content is None:
+        return await run_in_threadpool(materialize_wrapper_artifact, wrapper_id)
+    return digest, content
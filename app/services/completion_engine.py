@@ -0,0 +1,317 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, as_completed
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import httpx
+
+# Límites del proveedor de chat completions (configurables por entorno)
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://api.deepseek.com/v1")
+LLM_MODEL = os.getenv("LLM_MODEL", "deepseek-coder")
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "16"))
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "60"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "200000"))
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "120"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+# Estimación de tokens del prompt antes de conocer el `usage` real
+CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class CompletionRequest:
+    """Una petición de chat completion; key identifica el resultado (p.ej. id de la oportunidad).
+
+    Con `stream_stop` la respuesta se pide en streaming (SSE): es una
+    fábrica que crea, en cada intento, un detector al que se pasa cada
+    delta de texto; cuando devuelve True se corta el stream.
+    """
+    key: Any
+    messages: List[Dict[str, str]]
+    max_tokens: int = 4000
+    temperature: float = 0.3
+    stream_stop: Optional[Callable[[], Callable[[str], bool]]] = None
+
+    def prompt_tokens(self) -> int:
+        return sum(len(message.get("content") or "") for message in self.messages) // CHARS_PER_TOKEN
+
+    def estimated_tokens(self) -> int:
+        return self.prompt_tokens() + self.max_tokens
+
+
+@dataclass
+class CompletionResult:
+    key: Any
+    content: Optional[str] = None
+    error: Optional[str] = None
+    tokens: int = 0
+    attempts: int = 0
+    latency: float = 0.0
+    first_token_latency: Optional[float] = None
+    stopped_early: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class MinuteBudget:
+    """Presupuesto por minuto (peticiones o tokens) como token bucket asíncrono.
+
+    Se rellena de forma continua a capacity/60 por segundo. Los consumos
+    estimados se corrigen después con `adjust()` cuando se conoce el real.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = max(1, per_minute)
+        self.rate = self.capacity / 60.0
+        self._available = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount: int = 1):
+        # Una petición mayor que el presupuesto entero espera a tenerlo completo
+        amount = min(amount, self.capacity)
+        # El lock da orden FIFO: una petición grande no se queda sin turno
+        async with self._lock:
+            while True:
+                now = self._refill()
+                if now >= self._paused_until and self._available >= amount:
+                    self._available -= amount
+                    return
+                await asyncio.sleep(max(self._paused_until - now, (amount - self._available) / self.rate))
+
+    def adjust(self, delta: int):
+        """Devuelve (delta < 0) o cobra (delta > 0) la diferencia con lo estimado"""
+        self._refill()
+        self._available = min(self.capacity, self._available - delta)
+
+    def pause_until(self, monotonic_deadline: float):
+        self._paused_until = max(self._paused_until, monotonic_deadline)
+
+    def _refill(self) -> float:
+        now = time.monotonic()
+        self._available = min(self.capacity, self._available + (now - self._updated) * self.rate)
+        self._updated = now
+        return now
+
+
+class CompletionEngine:
+    """Motor asíncrono de chat completions con concurrencia acotada.
+
+    Corre en su propio event loop en un hilo de fondo, con un único cliente
+    httpx, así que todas las llamadas del proceso comparten la concurrencia
+    máxima y los presupuestos de peticiones y tokens por minuto. El código
+    síncrono (scripts, workers del pipeline) entrega peticiones con
+    `submit()` o `map_unordered()`.
+
+    Cada petición tiene un deadline que cubre la espera de presupuesto, los
+    reintentos (429/5xx, respetando Retry-After) y la respuesta.
+    """
+
+    def __init__(
+        self,
+        base_url: str = None,
+        api_key: str = None,
+        model: str = None,
+        concurrency: int = None,
+        requests_per_minute: int = None,
+        tokens_per_minute: int = None,
+        deadline: float = None,
+        max_retries: int = None,
+        transport: httpx.AsyncBaseTransport = None,
+    ):
+        self.base_url = (base_url or LLM_BASE_URL).rstrip('/')
+        self.api_key = api_key if api_key is not None else os.getenv("DEEPSEEK_API_KEY")
+        self.model = model or LLM_MODEL
+        self.concurrency = max(1, concurrency or LLM_CONCURRENCY)
+        self.requests_per_minute = requests_per_minute or LLM_REQUESTS_PER_MINUTE
+        self.tokens_per_minute = tokens_per_minute or LLM_TOKENS_PER_MINUTE
+        self.deadline = deadline or LLM_DEADLINE
+        self.max_retries = LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.transport = transport
+        self.metrics = {"requests": 0, "completed": 0, "failed": 0, "throttled": 0, "timeouts": 0, "tokens": 0, "stopped_early": 0}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, request: CompletionRequest) -> "Future[CompletionResult]":
+        """Encola una petición; el resultado llega en el Future (nunca lanza: ver result.error)"""
+        self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(self._complete(request), self._loop)
+
+    def complete(self, request: CompletionRequest) -> CompletionResult:
+        return self.submit(request).result()
+
+    def map_unordered(self, requests: Iterable[CompletionRequest]) -> Iterator[CompletionResult]:
+        """Lanza todas las peticiones y devuelve cada resultado según termina"""
+        futures = [self.submit(request) for request in requests]
+        for future in as_completed(futures):
+            yield future.result()
+
+    def close(self):
+        with self._start_lock:
+            if self._loop is None:
+                return
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = self._thread = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="completion-engine", daemon=True)
+            thread.start()
+            # Las primitivas asyncio y el cliente se crean dentro de su loop
+            asyncio.run_coroutine_threadsafe(self._setup(), loop).result()
+            self._loop, self._thread = loop, thread
+
+    async def _setup(self):
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=headers,
+            transport=self.transport,
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+            timeout=httpx.Timeout(self.deadline),
+        )
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._request_budget = MinuteBudget(self.requests_per_minute)
+        self._token_budget = MinuteBudget(self.tokens_per_minute)
+
+    async def _complete(self, request: CompletionRequest) -> CompletionResult:
+        result = CompletionResult(key=request.key)
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self._attempts(request, result, started), timeout=self.deadline)
+        except asyncio.TimeoutError:
+            result.error = f"deadline de {self.deadline:.0f}s agotado"
+            self.metrics["timeouts"] += 1
+        except Exception as e:
+            result.error = str(e) or type(e).__name__
+        result.latency = time.monotonic() - started
+        self.metrics["completed" if result.ok else "failed"] += 1
+        return result
+
+    async def _attempts(self, request: CompletionRequest, result: CompletionResult, started: float):
+        payload = {
+            "model": self.model,
+            "messages": request.messages,
+            "max_tokens": request.max_tokens,
+            "temperature": request.temperature,
+        }
+        estimated = request.estimated_tokens()
+        while True:
+            await self._request_budget.acquire()
+            await self._token_budget.acquire(estimated)
+            async with self._slots:
+                result.attempts += 1
+                self.metrics["requests"] += 1
+                try:
+                    if request.stream_stop:
+                        response, body = await self._stream(payload, request.stream_stop(), result, started)
+                    else:
+                        response = await self._client.post("/chat/completions", json=payload)
+                        body = None
+                except httpx.TransportError:
+                    self._token_budget.adjust(-estimated)
+                    if result.attempts > self.max_retries:
+                        raise
+                    await self._backoff(result.attempts)
+                    continue
+
+            if response.status_code == 429 or response.status_code >= 500:
+                self._token_budget.adjust(-estimated)
+                if response.status_code == 429:
+                    self.metrics["throttled"] += 1
+                    self._honor_retry_after(response)
+                if result.attempts > self.max_retries:
+                    raise RuntimeError(f"HTTP {response.status_code}")
+                if response.status_code != 429:
+                    await self._backoff(result.attempts)
+                continue
+            if response.status_code != 200:
+                self._token_budget.adjust(-estimated)
+                raise RuntimeError(f"HTTP {response.status_code}")
+
+            body = body or response.json()
+            result.content = body["choices"][0]["message"]["content"]
+            # Sin `usage` (p.ej. stream cortado) se estima con el texto recibido
+            used = (body.get("usage") or {}).get("total_tokens") or (
+                request.prompt_tokens() + len(result.content or "") // CHARS_PER_TOKEN
+            )
+            self._token_budget.adjust(used - estimated)
+            self.metrics["tokens"] += used
+            result.tokens = used
+            if result.stopped_early:
+                self.metrics["stopped_early"] += 1
+            return
+
+    async def _stream(
+        self, payload: Dict[str, Any], stop: Callable[[str], bool], result: CompletionResult, started: float
+    ) -> Tuple[httpx.Response, Optional[Dict[str, Any]]]:
+        """POST en streaming (SSE); cierra la conexión en cuanto `stop` da por buena la respuesta"""
+        async with self._client.stream("POST", "/chat/completions", json={**payload, "stream": True}) as response:
+            if response.status_code != 200:
+                await response.aread()
+                return response, None
+            parts: List[str] = []
+            usage = None
+            result.stopped_early = False
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                usage = chunk.get("usage") or usage
+                for choice in chunk.get("choices") or []:
+                    delta = (choice.get("delta") or {}).get("content")
+                    if not delta:
+                        continue
+                    if result.first_token_latency is None:
+                        result.first_token_latency = time.monotonic() - started
+                    parts.append(delta)
+                    if stop(delta):
+                        result.stopped_early = True
+                        break
+                if result.stopped_early:
+                    break
+        return response, {"choices": [{"message": {"content": "".join(parts)}}], "usage": usage}
+
+    async def _backoff(self, attempt: int):
+        await asyncio.sleep(min(0.5 * 2 ** (attempt - 1), 10.0))
+
+    def _honor_retry_after(self, response: httpx.Response):
+        """Pausa el presupuesto de peticiones lo que indique Retry-After (segundos o fecha)"""
+        value = response.headers.get("Retry-After")
+        pause = 1.0
+        if value:
+            try:
+                pause = float(value)
+            except ValueError:
+                try:
+                    pause = parsedate_to_datetime(value).timestamp() - time.time()
+                except (TypeError, ValueError):
+                    pass
+        self._request_budget.pause_until(time.monotonic() + max(0.0, min(pause, self.deadline)))
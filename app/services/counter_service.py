@@ -0,0 +1,246 @@
+import os
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, event, func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models import APIEndpoint, DashboardCounter, WrapperConfig, SOURCE_DISCOVERED
+from app.services.stats_service import BASE_METHODS, StatsService
+from app.utils.ttl_cache import TTLCache
+
+# Métricas materializadas
+ENDPOINTS = "endpoints"
+DISCOVERED = "endpoints.discovered"
+METHOD_PREFIX = "endpoints.method."
+WRAPPERS = "wrappers"
+ACTIVE_WRAPPERS = "wrappers.active"
+SERVICES = "services"
+DEPLOYMENTS = "deployments"
+
+# Estados de DeploymentService que cuentan como despliegue hecho
+DEPLOYED_STATUSES = ("deployed", "ready")
+
+# Métricas con desglose diario para las métricas de crecimiento
+DAILY_METRICS = (ENDPOINTS, WRAPPERS, DEPLOYMENTS)
+TOTAL = "total"
+GROWTH_WINDOW_DAYS = 14
+
+# Segundos que se sirve el snapshot desde memoria si nadie lo invalida
+# (escrituras desde otros procesos, p.ej. workers de Celery)
+DASHBOARD_CACHE_TTL = float(os.getenv("DASHBOARD_CACHE_TTL", "30"))
+
+dashboard_cache = TTLCache(DASHBOARD_CACHE_TTL)
+
+# Marca en Session.info: la transacción tocó contadores
+_DIRTY = "dashboard_counters_dirty"
+# Clave del advisory lock de PostgreSQL que serializa las reconstrucciones
+_REBUILD_LOCK_KEY = 0x64617368
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop(_DIRTY, False):
+        dashboard_cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop(_DIRTY, None)
+
+
+def endpoint_deltas(method: str, source: Optional[str]) -> Dict[str, int]:
+    """Incrementos por un endpoint nuevo"""
+    deltas = {ENDPOINTS: 1, METHOD_PREFIX + (method or "GET").upper(): 1}
+    if source == SOURCE_DISCOVERED:
+        deltas[DISCOVERED] = 1
+    return deltas
+
+
+def today() -> str:
+    return datetime.utcnow().date().isoformat()
+
+
+class CounterService:
+    """Contadores del dashboard mantenidos de forma incremental.
+
+    Quien inserta o desactiva filas llama a `apply` con los incrementos
+    dentro de su propia transacción (sin commit), así los totales nunca se
+    desvían de las tablas. Las lecturas del dashboard solo leen la tabla
+    de contadores (unas decenas de filas, sin importar el tamaño de las
+    tablas base) y se sirven desde una caché TTL que se invalida al
+    confirmarse cualquier transacción que los haya cambiado.
+    """
+
+    def apply(self, db: Session, deltas: Dict[str, int], day: Optional[str] = None):
+        """Suma los incrementos a los totales y, para las métricas diarias, al día indicado"""
+        day = day or today()
+        rows = []
+        for metric, delta in deltas.items():
+            if not delta:
+                continue
+            rows.append({'metric': metric, 'bucket': TOTAL, 'value': delta})
+            if metric in DAILY_METRICS:
+                rows.append({'metric': metric, 'bucket': day, 'value': delta})
+        if not rows:
+            return
+
+        dialect = db.get_bind().dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+            stmt = dialect_insert(DashboardCounter).values(rows)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[DashboardCounter.metric, DashboardCounter.bucket],
+                set_={'value': DashboardCounter.value + stmt.excluded.value, 'updated_at': func.now()}
+            ))
+        else:
+            for row in rows:
+                result = db.execute(
+                    update(DashboardCounter)
+                    .where(DashboardCounter.metric == row['metric'], DashboardCounter.bucket == row['bucket'])
+                    .values(value=DashboardCounter.value + row['value'], updated_at=func.now())
+                )
+                if result.rowcount == 0:
+                    db.execute(insert(DashboardCounter).values(**row))
+
+        db.info[_DIRTY] = True
+
+    async def apply_async(self, db: AsyncSession, deltas: Dict[str, int], day: Optional[str] = None):
+        await db.run_sync(lambda session: self.apply(session, deltas, day))
+
+    def rebuild(self, db: Session) -> int:
+        """Recalcula todos los contadores desde las tablas base (arranque o corrección de derivas).
+        
+        Escribe valores absolutos (borra y reinserta) bajo un lock de la
+        transacción: dos reconstrucciones simultáneas no se suman.
+        """
+        self._lock_rebuild(db)
+        stats_service = StatsService()
+        counts: Counter = Counter()
+
+        for method, source, total in db.execute(stats_service.endpoint_breakdown_query()):
+            counts[(ENDPOINTS, TOTAL)] += total
+            counts[(METHOD_PREFIX + method, TOTAL)] += total
+            if source == SOURCE_DISCOVERED:
+                counts[(DISCOVERED, TOTAL)] += total
+
+        totals = db.execute(stats_service.totals_query()).one()
+        counts[(WRAPPERS, TOTAL)] = totals.wrappers
+        counts[(ACTIVE_WRAPPERS, TOTAL)] = totals.active_wrappers
+        counts[(SERVICES, TOTAL)] = totals.services
+
+        for metric, model in ((ENDPOINTS, APIEndpoint), (WRAPPERS, WrapperConfig)):
+            day = self._utc_date(db, model.created_at)
+            for bucket, total in db.execute(select(day, func.count()).where(day.isnot(None)).group_by(day)):
+                counts[(metric, str(bucket))] += total
+
+        # Los despliegues solo constan en el JSON de cada wrapper
+        for (config,) in db.execute(select(WrapperConfig.config)):
+            for deployment in (config or {}).get("deployments", []):
+                if deployment.get("status") not in DEPLOYED_STATUSES:
+                    continue
+                counts[(DEPLOYMENTS, TOTAL)] += 1
+                timestamp = deployment.get("timestamp")
+                if timestamp:
+                    counts[(DEPLOYMENTS, timestamp[:10])] += 1
+
+        db.execute(delete(DashboardCounter))
+        rows = [
+            {'metric': metric, 'bucket': bucket, 'value': value}
+            for (metric, bucket), value in counts.items() if value
+        ]
+        if rows:
+            db.execute(insert(DashboardCounter), rows)
+        db.info[_DIRTY] = True
+        return len(rows)
+
+    def _lock_rebuild(self, db: Session):
+        """Lock hasta el fin de la transacción (PostgreSQL; en SQLite las escrituras ya van en serie)"""
+        if db.get_bind().dialect.name == 'postgresql':
+            db.execute(select(func.pg_advisory_xact_lock(_REBUILD_LOCK_KEY)))
+
+    def _utc_date(self, db: Session, column):
+        """Fecha UTC de una columna timestamp, como la de `today()` en `apply`"""
+        if db.get_bind().dialect.name == 'postgresql':
+            # date() a secas usa la zona horaria de la sesión del servidor
+            return func.date(func.timezone('UTC', column))
+        # SQLite guarda CURRENT_TIMESTAMP ya en UTC
+        return func.date(column)
+
+    def ensure_built(self, db: Session) -> bool:
+        """Materializa los contadores si la tabla está vacía (primera ejecución).
+        
+        Con varios workers arrancando a la vez, solo el primero que toma el
+        lock reconstruye; los demás ven la tabla ya llena al obtenerlo.
+        """
+        self._lock_rebuild(db)
+        if db.scalar(select(DashboardCounter.id).limit(1)) is not None:
+            return False
+        self.rebuild(db)
+        return True
+
+    async def dashboard_stats(self, db: AsyncSession) -> Dict[str, Any]:
+        """Snapshot de los contadores del dashboard, desde caché si está vigente"""
+        cached = dashboard_cache.get("dashboard")
+        if cached is None:
+            cutoff = (date.fromisoformat(today()) - timedelta(days=GROWTH_WINDOW_DAYS - 1)).isoformat()
+            rows = await db.execute(
+                select(DashboardCounter.metric, DashboardCounter.bucket, DashboardCounter.value)
+                .where(or_(DashboardCounter.bucket == TOTAL, DashboardCounter.bucket >= cutoff))
+            )
+            cached = self.summarize(rows)
+            dashboard_cache.set("dashboard", cached)
+        return {**cached, "method_distribution": dict(cached["method_distribution"])}
+
+    def summarize(self, rows: Iterable) -> Dict[str, Any]:
+        """Reduce las filas (métrica, bucket, valor) al formato de StatsService más el crecimiento"""
+        totals: Dict[str, int] = {}
+        daily: Dict[str, Dict[str, int]] = {metric: {} for metric in DAILY_METRICS}
+        for metric, bucket, value in rows:
+            if bucket == TOTAL:
+                totals[metric] = value
+            elif metric in daily:
+                daily[metric][bucket] = value
+
+        methods = dict.fromkeys(BASE_METHODS, 0)
+        for metric, value in totals.items():
+            if metric.startswith(METHOD_PREFIX):
+                methods[metric[len(METHOD_PREFIX):]] = value
+
+        total_endpoints = totals.get(ENDPOINTS, 0)
+        discovered = totals.get(DISCOVERED, 0)
+        return {
+            "total_endpoints": total_endpoints,
+            "discovered_endpoints": discovered,
+            "manual_endpoints": total_endpoints - discovered,
+            "method_distribution": dict(sorted(methods.items(), key=lambda item: (-item[1], item[0]))),
+            "wrappers_count": totals.get(WRAPPERS, 0),
+            "active_deployments": totals.get(ACTIVE_WRAPPERS, 0),
+            "total_services": totals.get(SERVICES, 0),
+            "total_deployments": totals.get(DEPLOYMENTS, 0),
+            "growth": {metric: self._growth(days) for metric, days in daily.items()},
+        }
+
+    def _growth(self, days: Dict[str, int]) -> Dict[str, Any]:
+        """Últimos 7 días frente a los 7 anteriores, más la serie diaria"""
+        end = date.fromisoformat(today())
+        series: List[Dict[str, Any]] = []
+        for offset in range(GROWTH_WINDOW_DAYS - 1, -1, -1):
+            day = (end - timedelta(days=offset)).isoformat()
+            series.append({"date": day, "count": days.get(day, 0)})
+
+        last_week = sum(point["count"] for point in series[:7])
+        this_week = sum(point["count"] for point in series[7:])
+        change = round((this_week - last_week) / last_week * 100, 1) if last_week else None
+        return {
+            "this_week": this_week,
+            "last_week": last_week,
+            "change_pct": change,
+            "daily": series,
+        }
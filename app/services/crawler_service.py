@@ -0,0 +1,226 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.services.discovery_service import EXTRACTOR_VERSION, APIDiscoveryService
+from app.utils.html_stream import charset_from_content_type
+from app.utils.http_cache import HTTPCache, get_http_cache
+from app.utils.url_frontier import URLFrontier, origin_of
+
+_DONE = object()
+
+# Tope de workers (y de conexiones del cliente) por crawl, venga de donde venga el valor
+MAX_CRAWL_CONCURRENCY = int(os.getenv("CRAWLER_MAX_CONCURRENCY", "200"))
+# Tope de peticiones simultáneas al mismo host
+MAX_PER_HOST_LIMIT = int(os.getenv("CRAWLER_MAX_PER_HOST", "20"))
+# Bytes que se acumulan antes de pasarlos al parser en un hilo: tokenizar HTML
+# y buscar en bundles JS de varios MB no debe bloquear el event loop
+PARSE_BATCH_BYTES = 256 * 1024
+
+
+class AsyncCrawlerService:
+    """Crawler asíncrono de descubrimiento sobre múltiples URLs semilla.
+
+    Limita la concurrencia global (número de workers y conexiones del
+    cliente httpx) y la concurrencia por host, con una pausa mínima
+    opcional entre peticiones al mismo host.
+
+    Con max_depth > 0 sigue los enlaces /api/, /docs, /v1/... del mismo
+    origen hasta esa profundidad. Una frontera compartida garantiza que
+    ninguna URL se descarga ni se parsea dos veces y aplica el presupuesto
+    de páginas por dominio.
+
+    Las páginas se revalidan contra la caché HTTP en disco: si el servidor
+    responde 304 se reutilizan los endpoints y enlaces ya extraídos.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 50,
+        per_host_limit: int = 2,
+        per_host_delay: float = 0.0,
+        timeout: float = 10.0,
+        transport: httpx.AsyncBaseTransport = None,
+        max_depth: int = 0,
+        max_pages_per_domain: Optional[int] = 50,
+        use_bloom: bool = False,
+        cache: Optional[HTTPCache] = None,
+        use_cache: bool = True,
+    ):
+        self.max_concurrency = min(max(1, max_concurrency), MAX_CRAWL_CONCURRENCY)
+        self.per_host_limit = min(max(1, per_host_limit), MAX_PER_HOST_LIMIT)
+        self.per_host_delay = per_host_delay
+        self.timeout = timeout
+        self.transport = transport
+        self.max_depth = max(0, max_depth)
+        self.max_pages_per_domain = max_pages_per_domain
+        self.use_bloom = use_bloom
+        self.cache = (cache or get_http_cache()) if use_cache else None
+        self.parser = APIDiscoveryService(use_cache=False)
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self._host_last_request: Dict[str, float] = {}
+        self._host_locks: Dict[str, asyncio.Lock] = {}
+
+    async def crawl(self, seed_urls: Iterable[str]) -> AsyncIterator[Dict]:
+        """Recorre las URLs semilla y emite cada endpoint en cuanto se descubre"""
+        url_queue: asyncio.Queue = asyncio.Queue()
+        results: asyncio.Queue = asyncio.Queue()
+        frontier = URLFrontier(self.max_pages_per_domain, use_bloom=self.use_bloom)
+
+        for url in seed_urls:
+            admitted = frontier.admit(url)
+            if admitted:
+                url_queue.put_nowait((admitted, 0))
+
+        if url_queue.empty():
+            return
+
+        limits = httpx.Limits(
+            max_connections=self.max_concurrency,
+            max_keepalive_connections=self.max_concurrency,
+        )
+        headers = {'User-Agent': 'Mozilla/5.0 (compatible; APIFactoryBot/1.0)'}
+
+        async with httpx.AsyncClient(
+            headers=headers, timeout=self.timeout, limits=limits,
+            follow_redirects=True, transport=self.transport
+        ) as client:
+            workers = [
+                asyncio.create_task(self._worker(client, frontier, url_queue, results))
+                for _ in range(self.max_concurrency)
+            ]
+            watcher = asyncio.create_task(self._signal_when_done(url_queue, results))
+
+            try:
+                while True:
+                    item = await results.get()
+                    if item is _DONE:
+                        break
+                    yield item
+            finally:
+                for task in workers + [watcher]:
+                    task.cancel()
+                await asyncio.gather(*workers, watcher, return_exceptions=True)
+
+    async def discover(self, seed_urls: Iterable[str]) -> List[Dict]:
+        """Versión no streaming de crawl(): devuelve todos los endpoints"""
+        return [endpoint async for endpoint in self.crawl(seed_urls)]
+
+    async def _signal_when_done(self, url_queue: asyncio.Queue, results: asyncio.Queue):
+        await url_queue.join()
+        await results.put(_DONE)
+
+    async def _worker(
+        self,
+        client: httpx.AsyncClient,
+        frontier: URLFrontier,
+        url_queue: asyncio.Queue,
+        results: asyncio.Queue,
+    ):
+        while True:
+            url, depth = await url_queue.get()
+            try:
+                endpoints, links = await self._process(client, frontier, url)
+                for endpoint in endpoints:
+                    await results.put(endpoint)
+
+                if depth < self.max_depth:
+                    origin = origin_of(url)
+                    for link in links:
+                        if origin_of(link) != origin:
+                            continue
+                        admitted = frontier.admit(link)
+                        if admitted:
+                            url_queue.put_nowait((admitted, depth + 1))
+            except Exception as e:
+                print(f"Error descubriendo APIs en {url}: {e}")
+            finally:
+                url_queue.task_done()
+
+    async def _process(
+        self, client: httpx.AsyncClient, frontier: URLFrontier, url: str
+    ) -> Tuple[List[Dict], List[str]]:
+        """Descarga una página respetando los límites del host y extrae endpoints y enlaces"""
+        headers = self.cache.conditional_headers(url, EXTRACTOR_VERSION) if self.cache else {}
+        async with self._stream(client, url, headers) as response:
+            if self.cache:
+                cached = self.cache.not_modified_payload(url, response.status_code, EXTRACTOR_VERSION)
+                if cached is not None:
+                    return self._with_page_url(cached['endpoints'], url), cached['links']
+            if response.status_code != 304:
+                return await self._parse_stream(frontier, url, response)
+
+        # 304 pero la copia ya no está en caché: descargar sin validadores
+        async with self._stream(client, url, {}) as response:
+            return await self._parse_stream(frontier, url, response)
+
+    async def _parse_stream(
+        self, frontier: URLFrontier, url: str, response: httpx.Response
+    ) -> Tuple[List[Dict], List[str]]:
+        """Parsea el cuerpo a medida que llegan los bytes, sin construir el DOM"""
+        final_url = str(response.url)
+        if final_url != url:
+            frontier.mark_seen(final_url)
+
+        extractor, endpoints, links = self.parser.page_extractor(
+            final_url, charset_from_content_type(response.headers.get('Content-Type'))
+        )
+        buffer = bytearray()
+        async for chunk in response.aiter_bytes():
+            buffer += chunk
+            if len(buffer) >= PARSE_BATCH_BYTES:
+                await asyncio.to_thread(extractor.feed, bytes(buffer))
+                buffer.clear()
+        await asyncio.to_thread(self._feed_last, extractor, bytes(buffer))
+
+        if self.cache and response.status_code == 200:
+            self.cache.store(url, response.headers, {'endpoints': endpoints, 'links': links}, EXTRACTOR_VERSION)
+        return self._with_page_url(endpoints, url), links
+
+    @staticmethod
+    def _feed_last(extractor, data: bytes):
+        if data:
+            extractor.feed(data)
+        extractor.close()
+
+    def _with_page_url(self, endpoints: List[Dict], url: str) -> List[Dict]:
+        return [dict(endpoint, page_url=url) for endpoint in endpoints]
+
+    @asynccontextmanager
+    async def _stream(self, client: httpx.AsyncClient, url: str, headers: Dict[str, str]):
+        host = urlsplit(url).netloc.lower()
+        async with self._host_slot(host):
+            await self._respect_host_delay(host)
+            async with client.stream('GET', url, headers=headers) as response:
+                yield response
+
+    def _host_slot(self, host: str) -> asyncio.Semaphore:
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_slots[host]
+
+    async def _respect_host_delay(self, host: str):
+        if self.per_host_delay <= 0:
+            return
+        lock = self._host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            elapsed = time.monotonic() - self._host_last_request.get(host, 0.0)
+            if elapsed < self.per_host_delay:
+                await asyncio.sleep(self.per_host_delay - elapsed)
+            self._host_last_request[host] = time.monotonic()
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    async def _demo():
+        crawler = AsyncCrawlerService(max_concurrency=20, per_host_limit=2)
+        seeds = ["https://jsonplaceholder.typicode.com", "https://httpbin.org"]
+        async for endpoint in crawler.crawl(seeds):
+            print(f"- {endpoint['method']} {endpoint['url']} ({endpoint['page_url']})")
+
+    asyncio.run(_demo())
@@ -1,4 +1,5 @@
 import os
+import re
 import json
 import requests
 import tempfile
@@ -86,34 +87,9 @@ class DeploymentService:
     
     def _create_vercel_project(self, wrapper_code: str, project_name: str) -> Dict[str, str]:
         """Crea la estructura de proyecto para Vercel"""
-        api_code = f'''
-from {project_name}_wrapper import APIWrapper
-from fastapi import FastAPI
-import os
-
-app = FastAPI(title="{project_name} API", version="1.0.0")
-wrapper = APIWrapper()
-
-# Auto-generar endpoints basados en los métodos del wrapper
-import inspect
-
-methods = [method for method in dir(wrapper) if not method.startswith('_') and callable(getattr(wrapper, method))]
-
-for method_name in methods:
-    if method_name.startswith('get_'):
-        @app.get("/" + method_name[4:])
-        async def {method_name}_endpoint():
-            return getattr(wrapper, method_name)()
-    
-    elif method_name.startswith('create_'):
-        @app.post("/" + method_name[7:])
-        async def {method_name}_endpoint(data: dict):
-            return getattr(wrapper, method_name)(data=data)
-'''
         return {
-            "api/index.py": api_code,
-            f"{project_name}_wrapper.py": wrapper_code,
-            "requirements.txt": "fastapi==0.104.1\nuvicorn==0.24.0\nrequests==2.31.0",
+            "api/index.py": self._wrap_in_fastapi(wrapper_code, project_name),
+            "requirements.txt": self._generate_requirements(),
             "vercel.json": json.dumps({
                 "version": 2,
                 "builds": [{"src": "api/index.py", "use": "@vercel/python"}],
@@ -129,33 +105,88 @@ for method_name in methods:
             "railway.toml": self._generate_railway_config(project_name)
         }
     
+    def _wrapper_class_name(self, wrapper_code: str) -> str:
+        # El módulo generado también define clases auxiliares (backends de caché)
+        match = (re.search(r'^class (\w*Wrapper)\b', wrapper_code, re.MULTILINE)
+                 or re.search(r'^class (\w+)', wrapper_code, re.MULTILINE))
+        return match.group(1) if match else "APIWrapper"
+    
     def _wrap_in_fastapi(self, wrapper_code: str, project_name: str) -> str:
-        """Envuelve el wrapper en una app FastAPI"""
+        """Envuelve el wrapper en una app FastAPI que sirve sus métodos.
+        
+        Una única instancia del wrapper por proceso (un solo pool de
+        conexiones), cerrada al apagar la app. Los métodos async (wrappers httpx) se esperan en el event
+        loop; los síncronos (requests) van al threadpool para no bloquearlo.
+        """
         return f'''
 {wrapper_code}
 
-from fastapi import FastAPI
+import inspect
+import os
+from contextlib import asynccontextmanager
+
+from fastapi import Body, FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 import uvicorn
 
-app = FastAPI(title="{project_name} API", version="1.0.0")
+wrapper = {self._wrapper_class_name(wrapper_code)}(api_key=os.getenv("API_KEY"))
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    # Cierra el pool de conexiones del cliente compartido
+    close = getattr(wrapper, "aclose", None)
+    if close is not None:
+        await close()
+
+
+app = FastAPI(title={project_name!r} + " API", version="1.0.0", lifespan=lifespan)
 
-# Instanciar el wrapper
-wrapper = APIWrapper()
 
-# Endpoints automáticos
 @app.get("/")
 async def root():
-    return {{"message": "{project_name} API - Generated by API Factory", "status": "active"}}
+    return {{"message": {project_name!r} + " API - Generated by API Factory", "status": "active"}}
+
 
 @app.get("/health")
 async def health():
     return {{"status": "healthy"}}
 
-# Aquí se inyectarían los endpoints específicos del wrapper
-# basados en los métodos disponibles
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Aciertos de la caché de respuestas del wrapper"""
+    stats = getattr(wrapper, "cache_stats", None)
+    return stats() if stats is not None else {{"backend": None}}
+
+
+@app.get("/methods")
+async def methods():
+    """Métodos del wrapper disponibles en /call/<método>"""
+    return {{
+        "methods": [
+            name for name, member in inspect.getmembers(wrapper, callable)
+            if not name.startswith("_") and name != "aclose"
+        ]
+    }}
+
+
+@app.post("/call/{{method_name}}")
+async def call(method_name: str, arguments: dict = Body(default={{}})):
+    """Invoca un método del wrapper con los argumentos del cuerpo JSON"""
+    method = getattr(wrapper, method_name, None)
+    if method_name.startswith("_") or method_name == "aclose" or not callable(method):
+        raise HTTPException(status_code=404, detail=f"Método {{method_name}} no encontrado")
+    try:
+        if inspect.iscoroutinefunction(method):
+            return await method(**arguments)
+        return await run_in_threadpool(method, **arguments)
+    except TypeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
 
 if __name__ == "__main__":
-    import os
     port = int(os.getenv("PORT", 8000))
     uvicorn.run(app, host="0.0.0.0", port=port)
 '''
@@ -164,7 +195,9 @@ if __name__ == "__main__":
         """Genera requirements.txt para el despliegue"""
         return """fastapi==0.104.1
 uvicorn==0.24.0
+httpx[http2]==0.25.2
 requests==2.31.0
+redis==5.0.1
 python-dotenv==1.0.0"""
     
     def _generate_railway_config(self, project_name: str) -> str:
@@ -187,10 +220,42 @@ PORT = "8000"
     
     def _extract_endpoints_from_code(self, wrapper_code: str) -> List[str]:
         """Extrae los nombres de métodos/endpoints del código del wrapper"""
-        import re
-        methods = re.findall(r'def\s+(\w+)\s*\(', wrapper_code)
-        # Filtrar métodos mágicos y privados
-        return [method for method in methods if not method.startswith('_') and method not in ['_make_request']]
+        # Solo los métodos de la clase del wrapper, no los de las clases auxiliares
+        start = re.search(rf'^class {self._wrapper_class_name(wrapper_code)}\b', wrapper_code, re.MULTILINE)
+        body = wrapper_code[start.start():] if start else wrapper_code
+        end = re.search(r'^class ', body[1:], re.MULTILINE)
+        methods = re.findall(r'def\s+(\w+)\s*\(', body[:end.start() + 1] if end else body)
+        # Filtrar métodos mágicos, privados y de infraestructura (cierre del cliente, caché)
+        return [method for method in methods if not method.startswith('_') and method not in ('aclose', 'cache_stats', 'client')]
+
+def deployment_next_steps(platform: str, result: dict) -> list:
+    """Genera pasos siguientes basados en la plataforma"""
+    base_steps = [
+        "Guarda las URLs y credenciales proporcionadas",
+        "Prueba los endpoints desplegados",
+        "Configura monitoring y alertas"
+    ]
+    
+    if platform == "vercel":
+        return [
+            "Tu API está disponible en: " + result.get("url", "N/A"),
+            "Puedes configurar un dominio personalizado en Vercel",
+            "Revisa los logs en el dashboard de Vercel"
+        ] + base_steps
+    
+    elif platform == "railway":
+        return [
+            "Tu app está desplegada en Railway",
+            "Puedes conectar una base de datos desde el dashboard",
+            "Revisa las variables de entorno en Railway"
+        ] + base_steps
+    
+    else:  # fastapi
+        return [
+            "Descarga el paquete generado",
+            "Sigue las instrucciones de despliegue",
+            "Personaliza la app según tus necesidades"
+        ] + base_steps
 
 # Ejemplo de uso
 if __name__ == "__main__":
@@ -1,93 +1,104 @@
 import requests
-from bs4 import BeautifulSoup
-import re
 import json
-from typing import List, Dict
+from typing import List, Dict, Iterable, Tuple
+from urllib.parse import urljoin
+from app.utils import endpoint_matcher
+from app.utils.html_stream import StreamingHTMLExtractor, charset_from_content_type
+from app.utils.http_cache import HTTPCache, get_http_cache
+
+# Versión del extractor de endpoints/enlaces: va en la caché HTTP con el
+# resultado parseado. Cambiarla al modificar la extracción invalida lo guardado
+EXTRACTOR_VERSION = "2"
 
 class APIDiscoveryService:
-    def __init__(self):
+    def __init__(self, cache: HTTPCache = None, use_cache: bool = True):
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (compatible; APIFactoryBot/1.0)'
         })
+        self.cache = (cache or get_http_cache()) if use_cache else None
     
     def discover_from_webpage(self, url: str) -> List[Dict]:
         """Descubre endpoints API desde una página web"""
         try:
-            response = self.session.get(url, timeout=10)
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            endpoints = []
+            headers = self.cache.conditional_headers(url, EXTRACTOR_VERSION) if self.cache else {}
+            response = self.session.get(url, headers=headers, timeout=10, stream=True)
             
-            # Buscar enlaces que puedan ser endpoints API
-            for link in soup.find_all('a', href=True):
-                href = link['href']
-                if self._looks_like_api_endpoint(href):
-                    endpoints.append({
-                        'url': href,
-                        'method': self._guess_method(href),
-                        'source': 'webpage_link'
-                    })
-            
-            # Buscar en scripts JavaScript
-            for script in soup.find_all('script'):
-                if script.string:
-                    endpoints.extend(self._find_in_javascript(script.string))
+            if self.cache:
+                cached = self.cache.not_modified_payload(url, response.status_code, EXTRACTOR_VERSION)
+                if cached is not None:
+                    response.close()
+                    return cached['endpoints']
+                if response.status_code == 304:
+                    response.close()
+                    response = self.session.get(url, timeout=10, stream=True)
             
+            with response:
+                endpoints, links = self.extract_page_stream(
+                    response.iter_content(chunk_size=64 * 1024),
+                    base_url=url,
+                    encoding=charset_from_content_type(response.headers.get('Content-Type'))
+                )
+            if self.cache and response.status_code == 200:
+                self.cache.store(url, response.headers, {'endpoints': endpoints, 'links': links}, EXTRACTOR_VERSION)
             return endpoints
             
         except Exception as e:
             print(f"Error descubriendo APIs: {e}")
             return []
     
+    def extract_endpoints(self, html, base_url: str = None) -> List[Dict]:
+        """Extrae endpoints API de un documento HTML ya descargado"""
+        return self.extract_page(html, base_url)[0]
+    
+    def extract_page(self, html, base_url: str = None) -> Tuple[List[Dict], List[str]]:
+        """Extrae endpoints API y enlaces a seguir (/api/, /docs, /v1/...) en una sola pasada"""
+        return self.extract_page_stream([html], base_url)
+    
+    def extract_page_stream(self, chunks: Iterable, base_url: str = None, encoding: str = None) -> Tuple[List[Dict], List[str]]:
+        """Igual que extract_page() pero consumiendo el documento por fragmentos, sin construir el DOM"""
+        extractor, endpoints, links = self.page_extractor(base_url, encoding)
+        extractor.feed_all(chunks)
+        return endpoints, links
+    
+    def page_extractor(self, base_url: str = None, encoding: str = None):
+        """Crea un extractor incremental y las listas donde irá dejando endpoints y enlaces"""
+        endpoints = []
+        links = []
+        
+        # Enlaces que puedan ser endpoints API o páginas a seguir
+        def on_link(raw_href):
+            # Se clasifica el enlace tal cual: resuelto, los patrones (rest, /v1/...)
+            # coincidirían con el host y la ruta de la página, no con el enlace
+            href = urljoin(base_url, raw_href) if base_url else raw_href
+            method = endpoint_matcher.classify_url(raw_href)
+            if method:
+                endpoints.append({
+                    'url': href,
+                    'method': method,
+                    'source': 'webpage_link'
+                })
+            if endpoint_matcher.looks_like_crawlable_page(href):
+                links.append(href)
+        
+        # Scripts JavaScript inline
+        def on_script(js_code):
+            endpoints.extend(self._find_in_javascript(js_code, base_url))
+        
+        extractor = StreamingHTMLExtractor(on_link=on_link, on_script=on_script, encoding=encoding)
+        return extractor, endpoints, links
+    
     def _looks_like_api_endpoint(self, url: str) -> bool:
         """Determina si una URL parece ser un endpoint API"""
-        api_patterns = [
-            r'/api/',
-            r'/v[0-9]+/',
-            r'\.json$',
-            r'\.xml$',
-            r'graphql',
-            r'rest',
-        ]
-        return any(re.search(pattern, url, re.IGNORECASE) for pattern in api_patterns)
+        return endpoint_matcher.looks_like_api_endpoint(url)
     
     def _guess_method(self, url: str) -> str:
         """Intenta adivinar el método HTTP basado en la URL"""
-        if re.search(r'(get|fetch|query)', url, re.IGNORECASE):
-            return 'GET'
-        elif re.search(r'(post|create|submit)', url, re.IGNORECASE):
-            return 'POST'
-        elif re.search(r'(put|update)', url, re.IGNORECASE):
-            return 'PUT'
-        elif re.search(r'(delete|remove)', url, re.IGNORECASE):
-            return 'DELETE'
-        else:
-            return 'GET'
+        return endpoint_matcher.guess_method(url)
     
-    def _find_in_javascript(self, js_code: str) -> List[Dict]:
+    def _find_in_javascript(self, js_code: str, base_url: str = None) -> List[Dict]:
         """Busca endpoints API en código JavaScript"""
-        endpoints = []
-        
-        # Patrones comunes en JavaScript
-        patterns = [
-            r'fetch\(["\']([^"\']+)["\']',
-            r'axios\.(get|post|put|delete)\(["\']([^"\']+)["\']',
-            r'\.ajax\([^)]*url:\s*["\']([^"\']+)["\']',
-        ]
-        
-        for pattern in patterns:
-            matches = re.finditer(pattern, js_code)
-            for match in matches:
-                url = match.group(1) if len(match.groups()) > 1 else match.group(0)
-                if self._looks_like_api_endpoint(url):
-                    endpoints.append({
-                        'url': url,
-                        'method': self._guess_method(url),
-                        'source': 'javascript'
-                    })
-        
-        return endpoints
+        return endpoint_matcher.find_in_javascript(js_code, base_url)
 
 # Ejemplo de uso
 if __name__ == "__main__":
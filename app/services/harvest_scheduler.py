@@ -0,0 +1,297 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import requests
+
+from app.utils.http_cache import HTTPCache, get_http_cache
+
+
+@dataclass
+class HarvestRequest:
+    """Una petición de una fuente; context viaja hasta parse() (subreddit, cursor...)"""
+    url: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    context: Dict[str, Any] = field(default_factory=dict)
+    attempt: int = 0
+
+
+@dataclass
+class HarvestPage:
+    """Resultado de parsear una respuesta: items y peticiones siguientes (paginación)"""
+    items: List[Dict] = field(default_factory=list)
+    next_requests: List[HarvestRequest] = field(default_factory=list)
+
+
+class HarvestSource:
+    """Plugin de fuente de oportunidades.
+
+    Cada fuente declara su ritmo (token bucket), su deadline por petición,
+    las peticiones iniciales y cómo parsear cada respuesta.
+    """
+    name = "source"
+    rate_per_second = 1.0
+    burst = 1
+    deadline = 20.0
+    cacheable = True
+    # Versión de parse(): cambiarla invalida las páginas ya parseadas en la caché
+    parser_version = "1"
+    max_retries = 2
+
+    def initial_requests(self) -> List[HarvestRequest]:
+        raise NotImplementedError
+
+    def parse(self, request: HarvestRequest, response: requests.Response) -> HarvestPage:
+        raise NotImplementedError
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class TokenBucket:
+    """Token bucket thread-safe que además puede pausarse (Retry-After / X-RateLimit-*)"""
+
+    def __init__(self, rate_per_second: float, burst: int = 1):
+        self.rate = max(rate_per_second, 1e-6)
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Espera a tener un token; devuelve False si se agota el timeout"""
+        give_up_at = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait_for = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            if give_up_at is not None and time.monotonic() + wait_for > give_up_at:
+                return False
+            time.sleep(min(wait_for, 1.0))
+
+    def pause_until(self, monotonic_deadline: float):
+        with self._lock:
+            self._paused_until = max(self._paused_until, monotonic_deadline)
+            self._tokens = 0.0
+
+
+class SourceMetrics:
+    """Contadores de latencia y errores por fuente"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.items = 0
+        self.throttled = 0
+        self.cache_hits = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, items: int = 0, error: bool = False, cache_hit: bool = False):
+        with self._lock:
+            self.requests += 1
+            self.items += items
+            self.errors += int(error)
+            self.cache_hits += int(cache_hit)
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def record_throttle(self):
+        with self._lock:
+            self.throttled += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "items": self.items,
+                "throttled": self.throttled,
+                "cache_hits": self.cache_hits,
+                "avg_latency_ms": round(self.total_latency / self.requests * 1000, 1) if self.requests else 0.0,
+                "max_latency_ms": round(self.max_latency * 1000, 1),
+            }
+
+
+class HarvestScheduler:
+    """Lanza todas las fuentes a la vez sobre un pool de hilos.
+
+    Cada fuente tiene su token bucket; las cabeceras Retry-After y
+    X-RateLimit-* pausan el bucket de la fuente que las recibe. Cada
+    petición tiene un deadline propio y el barrido entero uno global,
+    así que una petición colgada no bloquea el ciclo.
+    """
+
+    def __init__(
+        self,
+        sources: Iterable[HarvestSource],
+        max_workers: int = 16,
+        sweep_deadline: float = 120.0,
+        session: Optional[requests.Session] = None,
+        cache: Optional[HTTPCache] = None,
+    ):
+        self.sources = list(sources)
+        self.max_workers = max_workers
+        self.sweep_deadline = sweep_deadline
+        self.session = session or requests.Session()
+        self.cache = cache or get_http_cache()
+        self.buckets = {s.name: TokenBucket(s.rate_per_second, s.burst) for s in self.sources}
+        self.metrics = {s.name: SourceMetrics() for s in self.sources}
+
+    def run(self) -> Dict[str, List[Dict]]:
+        """Ejecuta el barrido y devuelve los items encontrados por fuente"""
+        results: Dict[str, List[Dict]] = {s.name: [] for s in self.sources}
+        sweep_ends_at = time.monotonic() + self.sweep_deadline
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="harvest")
+        pending = {}
+        try:
+            for source in self.sources:
+                for request in source.initial_requests():
+                    pending[executor.submit(self._execute, source, request, sweep_ends_at)] = source
+
+            while pending:
+                remaining = sweep_ends_at - time.monotonic()
+                if remaining <= 0:
+                    print(f"⏱️ Deadline del barrido alcanzado, {len(pending)} peticiones abandonadas")
+                    break
+                done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    source = pending.pop(future)
+                    page = future.result()
+                    results[source.name].extend(page.items)
+                    for request in page.next_requests:
+                        pending[executor.submit(self._execute, source, request, sweep_ends_at)] = source
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return results
+
+    def metrics_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {name: metrics.snapshot() for name, metrics in self.metrics.items()}
+
+    def _execute(self, source: HarvestSource, request: HarvestRequest, sweep_ends_at: float) -> HarvestPage:
+        metrics = self.metrics[source.name]
+        bucket = self.buckets[source.name]
+
+        if not bucket.acquire(timeout=max(0.0, sweep_ends_at - time.monotonic())):
+            metrics.record_throttle()
+            return HarvestPage()
+
+        started = time.monotonic()
+        deadline_at = min(started + source.deadline, sweep_ends_at)
+        try:
+            page, cache_hit, response = self._fetch_page(source, request, deadline_at)
+            if response is not None and self._honor_rate_limit(bucket, response):
+                metrics.record_throttle()
+                if response.status_code in (429, 503) and request.attempt < source.max_retries:
+                    request.attempt += 1
+                    metrics.record(time.monotonic() - started, error=True)
+                    return HarvestPage(next_requests=[request])
+            metrics.record(time.monotonic() - started, items=len(page.items), cache_hit=cache_hit)
+            return page
+        except Exception as e:
+            metrics.record(time.monotonic() - started, error=True)
+            print(f"❌ [{source.name}] Error en {request.url}: {e}")
+            return HarvestPage()
+
+    def _fetch_page(self, source: HarvestSource, request: HarvestRequest, deadline_at: float):
+        """GET condicional con deadline; devuelve (página, hit de caché, respuesta)"""
+        use_cache = source.cacheable
+        headers = dict(request.headers)
+        if use_cache:
+            headers.update(self.cache.conditional_headers(request.url, source.parser_version))
+
+        response = self._get(request.url, headers, deadline_at)
+        if use_cache:
+            cached = self.cache.not_modified_payload(request.url, response.status_code, source.parser_version)
+            if isinstance(cached, dict) and "items" in cached:
+                response.close()
+                page = HarvestPage(
+                    items=cached["items"],
+                    next_requests=[HarvestRequest(**r) for r in cached["next_requests"]],
+                )
+                return page, True, response
+            if response.status_code == 304:
+                # Sin entrada utilizable en la caché: se repite sin validadores
+                response.close()
+                response = self._get(request.url, dict(request.headers), deadline_at)
+
+        with response:
+            if response.status_code in (429, 503):
+                return HarvestPage(), False, response
+            page = source.parse(request, response)
+
+        if use_cache and response.status_code == 200:
+            self.cache.store(request.url, response.headers, {
+                "items": page.items,
+                "next_requests": [asdict(r) for r in page.next_requests],
+            }, source.parser_version)
+        return page, False, response
+
+    def _get(self, url: str, headers: Dict[str, str], deadline_at: float) -> requests.Response:
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded(url)
+        response = self.session.get(url, headers=headers, timeout=(min(5.0, remaining), remaining), stream=True)
+        _enforce_deadline(response, deadline_at)
+        return response
+
+    def _honor_rate_limit(self, bucket: TokenBucket, response: requests.Response) -> bool:
+        """Pausa el bucket según Retry-After / X-RateLimit-*; True si hubo que frenar"""
+        pause = _retry_after_seconds(response.headers.get("Retry-After"))
+
+        remaining = response.headers.get("X-RateLimit-Remaining") or response.headers.get("X-Ratelimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset") or response.headers.get("X-Ratelimit-Reset")
+        if pause is None and remaining is not None and reset is not None:
+            try:
+                if float(remaining) < 1:
+                    reset_value = float(reset)
+                    # GitHub envía un epoch; Reddit, segundos hasta el reset
+                    pause = reset_value - time.time() if reset_value > 1e9 else reset_value
+            except ValueError:
+                pass
+
+        if pause is None and response.status_code == 429:
+            pause = 60.0
+        if pause is None or pause <= 0:
+            return False
+        bucket.pause_until(time.monotonic() + pause)
+        return True
+
+
+def _retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+
+
+def _enforce_deadline(response: requests.Response, deadline_at: float):
+    """Hace que la lectura del cuerpo (iter_content, .content, .json()) respete el deadline"""
+    iter_content = response.iter_content
+
+    def iter_content_with_deadline(*args, **kwargs):
+        for chunk in iter_content(*args, **kwargs):
+            if time.monotonic() > deadline_at:
+                response.close()
+                raise DeadlineExceeded(response.url)
+            yield chunk
+
+    response.iter_content = iter_content_with_deadline
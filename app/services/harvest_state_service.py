@@ -0,0 +1,73 @@
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models.harvest_state import HarvestCursor, SeenItem
+from app.services.persistence_service import BATCH_SIZE, _batches
+
+
+class HarvestStateService:
+    """Cursores y conjuntos de vistos por fuente para el harvesting incremental.
+
+    Nada de aquí hace commit: el estado se guarda en la misma transacción
+    que las oportunidades, así un fallo al guardarlas no avanza el cursor.
+    """
+
+    def load_cursors(self, db: Session, source: str) -> Dict[str, Tuple[Optional[str], Optional[float]]]:
+        """Devuelve {stream: (last_seen_id, last_seen_created)} de una fuente"""
+        rows = db.execute(
+            select(HarvestCursor.stream, HarvestCursor.last_seen_id, HarvestCursor.last_seen_created)
+            .where(HarvestCursor.source == source)
+        )
+        return {stream: (last_id, created) for stream, last_id, created in rows}
+
+    def save_cursor(self, db: Session, source: str, stream: str, last_seen_id: str, last_seen_created: float):
+        values = {'last_seen_id': last_seen_id, 'last_seen_created': last_seen_created}
+        result = db.execute(
+            update(HarvestCursor)
+            .where(HarvestCursor.source == source, HarvestCursor.stream == stream)
+            .values(**values, updated_at=func.now())
+        )
+        if result.rowcount == 0:
+            db.execute(insert(HarvestCursor).values(source=source, stream=stream, **values))
+
+    def unseen_keys(self, db: Session, source: str, keys: Iterable[str]) -> Set[str]:
+        """Filtra las claves que la fuente aún no había visto nunca"""
+        pending = set(keys)
+        for batch in _batches(list(pending), BATCH_SIZE):
+            seen = db.execute(
+                select(SeenItem.item_key)
+                .where(SeenItem.source == source, SeenItem.item_key.in_(batch))
+            ).scalars()
+            pending.difference_update(seen)
+        return pending
+
+    def mark_seen(self, db: Session, source: str, keys: Iterable[str]):
+        """Registra (o refresca last_seen_at de) las claves vistas en esta pasada"""
+        rows = [{'source': source, 'item_key': key} for key in set(keys)]
+        dialect = db.get_bind().dialect.name
+
+        for batch in _batches(rows, BATCH_SIZE):
+            if dialect in ('postgresql', 'sqlite'):
+                if dialect == 'postgresql':
+                    from sqlalchemy.dialects.postgresql import insert as dialect_insert
+                else:
+                    from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+                stmt = dialect_insert(SeenItem).values(batch)
+                db.execute(stmt.on_conflict_do_update(
+                    index_elements=[SeenItem.source, SeenItem.item_key],
+                    set_={'last_seen_at': func.now()}
+                ))
+                continue
+
+            keys_in_batch = [row['item_key'] for row in batch]
+            new_keys = self.unseen_keys(db, source, keys_in_batch)
+            db.execute(
+                update(SeenItem)
+                .where(SeenItem.source == source, SeenItem.item_key.in_(set(keys_in_batch) - new_keys))
+                .values(last_seen_at=func.now())
+            )
+            if new_keys:
+                db.execute(insert(SeenItem), [{'source': source, 'item_key': key} for key in new_keys])
@@ -0,0 +1,219 @@
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+# Broker de Celery (p.ej. redis://localhost:6379/0). Sin él, los jobs se
+# ejecutan en un pool de hilos dentro del propio proceso.
+JOB_BROKER_URL = os.getenv("JOB_BROKER_URL") or os.getenv("CELERY_BROKER_URL")
+JOB_RESULT_BACKEND = os.getenv("JOB_RESULT_BACKEND") or JOB_BROKER_URL
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# Tiempo que se conservan los jobs terminados en el backend en proceso
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "3600"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# Registro de jobs: nombre -> función(progress, **kwargs) -> resultado serializable
+_JOBS: Dict[str, Callable[..., Any]] = {}
+
+
+def job(name: str):
+    """Registra una función como job encolable.
+
+    La función recibe como primer argumento `progress(fraction, message)`,
+    que publica el avance del job (fraction entre 0 y 1, o None si no se
+    conoce el total).
+    """
+    def decorator(fn):
+        _JOBS[name] = fn
+        return fn
+    return decorator
+
+
+@dataclass
+class JobRecord:
+    id: str
+    name: str
+    status: str = QUEUED
+    progress: Optional[float] = None
+    message: str = ""
+    result: Any = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
+class InProcessJobQueue:
+    """Cola de jobs en proceso: sustituto del broker para desarrollo y pruebas"""
+
+    def __init__(self, max_workers: int = JOB_WORKERS, ttl_seconds: int = JOB_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: Dict[str, JobRecord] = {}
+        self._lock = threading.Lock()
+
+    def enqueue(self, name: str, **kwargs) -> str:
+        if name not in _JOBS:
+            raise KeyError(f"Job desconocido: {name}")
+        record = JobRecord(id=uuid.uuid4().hex, name=name)
+        with self._lock:
+            self._evict_expired()
+            self._jobs[record.id] = record
+        self._executor.submit(self._run, record, kwargs)
+        return record.id
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._jobs.get(job_id)
+            return asdict(record) if record else None
+
+    def wait(self, job_id: str, timeout: float = 30.0) -> Optional[Dict[str, Any]]:
+        """Espera a que termine un job (útil en pruebas y scripts)"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            status = self.status(job_id)
+            if status is None or status["status"] in (SUCCEEDED, FAILED):
+                return status
+            time.sleep(0.05)
+        return self.status(job_id)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, record: JobRecord, kwargs: Dict[str, Any]):
+        def progress(fraction: Optional[float] = None, message: str = ""):
+            with self._lock:
+                record.progress = fraction
+                record.message = message
+
+        with self._lock:
+            record.status = RUNNING
+            record.started_at = time.time()
+        try:
+            result = _JOBS[record.name](progress, **kwargs)
+            with self._lock:
+                record.result = result
+                record.progress = 1.0
+                record.status = SUCCEEDED
+        except Exception as e:
+            traceback.print_exc()
+            with self._lock:
+                record.error = str(e)
+                record.status = FAILED
+        finally:
+            with self._lock:
+                record.finished_at = time.time()
+
+    def _evict_expired(self):
+        limit = time.time() - self.ttl_seconds
+        expired = [
+            job_id for job_id, record in self._jobs.items()
+            if record.finished_at is not None and record.finished_at < limit
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+class CeleryJobQueue:
+    """Cola de jobs sobre Celery + Redis; los workers se lanzan con
+    `celery -A app.services.job_queue:celery_app worker`"""
+
+    _STATES = {
+        "PENDING": QUEUED,
+        "RECEIVED": QUEUED,
+        "STARTED": RUNNING,
+        "PROGRESS": RUNNING,
+        "RETRY": RUNNING,
+        "SUCCESS": SUCCEEDED,
+        "FAILURE": FAILED,
+        "REVOKED": FAILED,
+    }
+
+    def __init__(self, app):
+        self.app = app
+
+    def enqueue(self, name: str, **kwargs) -> str:
+        if name not in _JOBS:
+            raise KeyError(f"Job desconocido: {name}")
+        job_id = uuid.uuid4().hex
+        # Celery da PENDING también a los ids que no existen: se deja constancia
+        # del job en el backend (con el mismo result_expires) antes de enviarlo
+        self.app.backend.store_result(job_id, {"name": name}, "PENDING")
+        run_job.apply_async(args=(name,), kwargs=kwargs, task_id=job_id)
+        return job_id
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        result = self.app.AsyncResult(job_id)
+        if result.state == "PENDING":
+            meta = self.app.backend.get_task_meta(job_id)
+            if "task_id" not in meta:
+                return None  # nunca encolado (o ya expirado)
+            name = (meta.get("result") or {}).get("name")
+        else:
+            name = result.args[0] if result.args else result.name
+        status = {
+            "id": job_id,
+            "name": name,
+            "status": self._STATES.get(result.state, result.state.lower()),
+            "progress": None,
+            "message": "",
+            "result": None,
+            "error": None,
+        }
+        if result.state == "PROGRESS" and isinstance(result.info, dict):
+            status["progress"] = result.info.get("progress")
+            status["message"] = result.info.get("message", "")
+        elif result.state == "SUCCESS":
+            status["progress"] = 1.0
+            status["result"] = result.result
+        elif result.state in ("FAILURE", "REVOKED"):
+            status["error"] = str(result.info)
+        return status
+
+
+celery_app = None
+run_job = None
+
+if JOB_BROKER_URL:
+    from celery import Celery
+
+    celery_app = Celery("api_factory", broker=JOB_BROKER_URL, backend=JOB_RESULT_BACKEND)
+    celery_app.conf.update(
+        task_track_started=True,
+        result_extended=True,
+        result_expires=JOB_TTL_SECONDS,
+        task_serializer="json",
+        result_serializer="json",
+        accept_content=["json"],
+        imports=["app.services.job_tasks"],
+    )
+
+    @celery_app.task(bind=True, name="api_factory.run_job")
+    def run_job(self, name: str, **kwargs):
+        def progress(fraction: Optional[float] = None, message: str = ""):
+            self.update_state(state="PROGRESS", meta={"progress": fraction, "message": message})
+
+        return _JOBS[name](progress, **kwargs)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Cola de jobs del proceso: Celery si hay broker configurado, si no en proceso"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            # Registra los jobs de la aplicación
+            import app.services.job_tasks  # noqa: F401
+            _queue = CeleryJobQueue(celery_app) if celery_app is not None else InProcessJobQueue()
+        return _queue
@@ -0,0 +1,165 @@
+import asyncio
+from datetime import datetime
+from typing import Callable, Optional
+
+from app.models import SessionLocal, WrapperConfig
+from app.services.artifact_service import ArtifactService, decompress_code
+from app.services.counter_service import ACTIVE_WRAPPERS, DEPLOYED_STATUSES, DEPLOYMENTS, WRAPPERS, CounterService
+from app.services.crawler_service import AsyncCrawlerService
+from app.services.deployment_service import DeploymentService, deployment_next_steps
+from app.services.job_queue import job
+from app.services.persistence_service import PersistenceService
+from app.services.wrapper_service import DEFAULT_FLAVOR
+
+Progress = Callable[[Optional[float], str], None]
+
+
+@job("discovery.discover")
+def discover_job(progress: Progress, url: str, max_depth: int = 2, max_pages: int = 50):
+    """Crawl de una URL y guardado de los endpoints descubiertos"""
+    crawler = AsyncCrawlerService(max_depth=max_depth, max_pages_per_domain=max_pages)
+
+    async def collect():
+        found = []
+        async for endpoint in crawler.crawl([url]):
+            found.append(endpoint)
+            progress(None, f"{len(found)} endpoints encontrados")
+        return found
+
+    progress(0.0, f"Rastreando {url}")
+    discovered_endpoints = asyncio.run(collect())
+
+    progress(0.9, "Guardando endpoints")
+    db = SessionLocal()
+    try:
+        counts = PersistenceService().bulk_upsert_endpoints(db, discovered_endpoints, source_url=url)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    saved_count = counts["inserted"] + counts["updated"]
+    return {
+        "message": f"Descubiertos {len(discovered_endpoints)} endpoints, guardados {saved_count}",
+        "discovered": discovered_endpoints,
+        "saved_count": saved_count,
+        **counts
+    }
+
+
+@job("wrappers.generate")
+def generate_wrapper_job(progress: Progress, base_url: str, wrapper_type: str = "rest", flavor: str = DEFAULT_FLAVOR):
+    """Genera el wrapper de una API a partir de sus endpoints guardados"""
+    db = SessionLocal()
+    try:
+        artifacts = ArtifactService()
+        endpoint_data = []
+        if wrapper_type == "rest":
+            progress(0.1, "Cargando endpoints")
+            endpoint_data = artifacts.load_endpoints(db, base_url)
+            if not endpoint_data:
+                raise ValueError(f"No se encontraron endpoints para {base_url}. Ejecuta /discovery/discover primero.")
+        elif wrapper_type != "graphql":
+            raise ValueError("Tipo de wrapper no soportado")
+
+        # Solo se genera si no hay ya un artefacto para esta misma entrada
+        progress(0.4, f"Generando wrapper {wrapper_type} ({len(endpoint_data)} endpoints)")
+        artifact = artifacts.get_or_create(db, wrapper_type, base_url, endpoint_data, flavor)
+
+        progress(0.8, "Guardando configuración")
+        name = f"wrapper_{base_url.replace('https://', '').replace('/', '_')}"
+        if flavor != DEFAULT_FLAVOR:
+            name = f"{name}_{flavor}"
+        wrapper_config = db.query(WrapperConfig).filter(WrapperConfig.name == name).first()
+        regenerated = wrapper_config is not None
+        if regenerated:
+            # Regenerar actualiza el wrapper existente conservando su historial de despliegues
+            config = dict(artifact.config or {})
+            if wrapper_config.config and "deployments" in wrapper_config.config:
+                config["deployments"] = wrapper_config.config["deployments"]
+            if not wrapper_config.is_active:
+                CounterService().apply(db, {ACTIVE_WRAPPERS: 1})
+            wrapper_config.wrapper_type = wrapper_type
+            wrapper_config.config = config
+            wrapper_config.artifact_digest = artifact.digest
+            wrapper_config.is_active = True
+        else:
+            wrapper_config = WrapperConfig(
+                name=name,
+                target_api_id=None,
+                wrapper_type=wrapper_type,
+                config=dict(artifact.config or {}),
+                artifact_digest=artifact.digest
+            )
+            db.add(wrapper_config)
+            CounterService().apply(db, {WRAPPERS: 1, ACTIVE_WRAPPERS: 1})
+        db.commit()
+
+        code = decompress_code(artifact.content)
+        return {
+            "message": f"Wrapper {wrapper_type} {'regenerado' if regenerated else 'generado'} exitosamente",
+            "wrapper_config_id": wrapper_config.id,
+            "regenerated": regenerated,
+            "endpoints_wrapped": len(endpoint_data),
+            "artifact_digest": artifact.digest,
+            "wrapper_code_preview": code[:500] + "..." if len(code) > 500 else code,
+            "download_url": f"/wrappers/{wrapper_config.id}/download"
+        }
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+@job("deployment.deploy")
+def deploy_job(progress: Progress, wrapper_id: int, platform: str = "fastapi", project_name: str = None):
+    """Despliega un wrapper generado en la plataforma indicada"""
+    db = SessionLocal()
+    try:
+        wrapper_config = db.query(WrapperConfig).filter(WrapperConfig.id == wrapper_id).first()
+        if not wrapper_config:
+            raise ValueError("Wrapper no encontrado")
+
+        deployment_service = DeploymentService()
+        wrapper_code = ArtifactService().code_for(db, wrapper_config)
+        project_name = project_name or f"api-wrapper-{wrapper_id}"
+
+        progress(0.2, f"Desplegando {project_name} en {platform}")
+        if platform == "vercel":
+            result = deployment_service.deploy_to_vercel(wrapper_code, project_name)
+        elif platform == "railway":
+            result = deployment_service.deploy_to_railway(wrapper_code, project_name)
+        elif platform == "fastapi":
+            result = deployment_service.deploy_as_fastapi(wrapper_code, project_name)
+        else:
+            raise ValueError("Plataforma no soportada")
+
+        progress(0.9, "Registrando despliegue")
+        config = dict(wrapper_config.config or {})
+        config["deployments"] = list(config.get("deployments", [])) + [{
+            "platform": platform,
+            "project_name": project_name,
+            "status": result.get("status"),
+            "timestamp": datetime.utcnow().isoformat()
+        }]
+        wrapper_config.config = config
+        # deploy_to_* no lanzan excepción: un fallo llega como status "failed"
+        deployed = result.get("status") in DEPLOYED_STATUSES
+        if deployed:
+            CounterService().apply(db, {DEPLOYMENTS: 1})
+        db.commit()
+
+        return {
+            "message": f"Wrapper desplegado en {platform}" if deployed else f"Falló el despliegue en {platform}",
+            "wrapper_id": wrapper_id,
+            "deployment_info": result,
+            "next_steps": deployment_next_steps(platform, result)
+        }
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
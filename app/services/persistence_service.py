@@ -0,0 +1,215 @@
+from collections import Counter
+from typing import Any, Dict, Iterable, List
+from urllib.parse import urlsplit
+
+from sqlalchemy import case, func, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.models import APIEndpoint, SOURCE_DISCOVERED, SOURCE_MANUAL
+from app.models.api_opportunity import ApiOpportunity
+from app.services.counter_service import CounterService, endpoint_deltas
+from app.utils.url_frontier import endpoint_key, split_url
+
+# Filas por sentencia: mantiene cada INSERT multi-fila por debajo del límite
+# de parámetros de PostgreSQL (65535) y de SQLite (32766)
+BATCH_SIZE = 500
+
+
+def endpoint_url_columns(url: str, origin: str = None) -> Dict[str, Any]:
+    """Columnas scheme/host/path de un endpoint (las URLs relativas se resuelven contra `origin`)"""
+    scheme, host, path = split_url(url, origin)
+    return {'scheme': scheme, 'host': host, 'path': path[:500]}
+
+
+def _absolute(base_url: str) -> str:
+    base_url = base_url.strip()
+    return base_url if '://' in base_url else f"https://{base_url}"
+
+
+def endpoints_under(base_url: str) -> List:
+    """Criterios para "todos los endpoints de esta base URL" sobre el índice (host, path).
+
+    Igualdad en host más un rango en la ruta: la ruta base exacta o
+    cualquier ruta bajo "base/" ('/' + 1 es '0', así "/v1" no casa con
+    "/v10"). A diferencia de LIKE '%base%' no recorre la tabla ni casa
+    hosts que solo contienen la cadena.
+    """
+    _, host, path = split_url(_absolute(base_url))
+    if not host:
+        raise ValueError(f"URL base no válida: {base_url}")
+    criteria = [APIEndpoint.host == host]
+    if path != '/':
+        criteria += [
+            # Rango contiguo en el índice...
+            APIEndpoint.path >= path,
+            APIEndpoint.path < path + '0',
+            # ...descartando hermanos como "/v1-beta" o "/v1.json", que ordenan entre "/v1" y "/v1/"
+            or_(APIEndpoint.path == path, APIEndpoint.path >= path + '/'),
+        ]
+    return criteria
+
+
+def relative_endpoint(url: str, base_url: str) -> str:
+    """Ruta del endpoint relativa a la base URL (lo que el wrapper concatena a su base_url)"""
+    _, _, base_path = split_url(_absolute(base_url))
+    parts = urlsplit(url.strip())
+    path = parts.path or '/'
+    if base_path != '/' and (path == base_path or path.startswith(base_path + '/')):
+        path = path[len(base_path):]
+    return f"{path}?{parts.query}" if parts.query else path
+
+
+class PersistenceService:
+    """Persistencia por lotes de endpoints descubiertos y oportunidades"""
+
+    def bulk_upsert_endpoints(
+        self, db: Session, endpoints: Iterable[Dict], source_url: str = None
+    ) -> Dict[str, int]:
+        """Inserta o actualiza endpoints con un INSERT ... ON CONFLICT multi-fila por lote.
+
+        Deduplica por (url normalizada, método): volver a lanzar un crawl es
+        idempotente. Los endpoints dados de alta a mano conservan su
+        descripción, origen y estado; solo se refrescan las columnas de la
+        URL. No hace commit; eso queda en manos del llamador.
+        """
+        rows: Dict[str, Dict[str, Any]] = {}
+        skipped = 0
+
+        for endpoint in endpoints:
+            url = (endpoint.get('url') or '').strip()
+            method = (endpoint.get('method') or 'GET').upper()
+            if not url or len(url) > 500:
+                skipped += 1
+                continue
+
+            key = endpoint_key(url, method)
+            if key in rows:
+                skipped += 1
+                continue
+
+            origin = source_url or endpoint.get('page_url') or url
+            rows[key] = {
+                'name': f"discovered_{method}_{key[:12]}",
+                'url': url,
+                'method': method,
+                'dedup_key': key,
+                'description': f"Descubierto automáticamente desde {origin}",
+                'source': SOURCE_DISCOVERED,
+                'is_active': True,
+                **endpoint_url_columns(url, origin),
+            }
+
+        updated = 0
+        deltas: Counter = Counter()
+        for batch in _batches(list(rows.values()), BATCH_SIZE):
+            keys = [row['dedup_key'] for row in batch]
+            existing = dict(db.execute(
+                select(APIEndpoint.dedup_key, APIEndpoint.source).where(APIEndpoint.dedup_key.in_(keys))
+            ).all())
+            updated += len(existing)
+            self._upsert_batch(db, batch, existing)
+
+            for row in batch:
+                if row['dedup_key'] not in existing:
+                    deltas.update(endpoint_deltas(row['method'], row['source']))
+
+        # Contadores del dashboard en la misma transacción que los endpoints
+        CounterService().apply(db, deltas)
+
+        return {
+            'inserted': len(rows) - updated,
+            'updated': updated,
+            'skipped': skipped,
+        }
+
+    def bulk_insert_opportunities(self, db: Session, opportunities: Iterable[Dict]) -> Dict[str, int]:
+        """Inserta oportunidades por lotes omitiendo las que ya existen.
+
+        Los duplicados dentro del lote se descartan aquí; los que ya están en
+        la tabla, por el índice único de source_url (ON CONFLICT DO NOTHING).
+        """
+        rows = {}
+        received = 0
+        for opportunity in opportunities:
+            received += 1
+            key = opportunity.get('source_url') or opportunity.get('name')
+            rows.setdefault(key, opportunity)
+
+        inserted = 0
+        for batch in _batches(list(rows.values()), BATCH_SIZE):
+            inserted += self._insert_new_opportunities(db, batch)
+
+        return {'inserted': inserted, 'skipped': received - inserted}
+
+    def _insert_new_opportunities(self, db: Session, batch: List[Dict]) -> int:
+        """INSERT de las oportunidades cuya source_url no está en la tabla; devuelve cuántas entraron"""
+        dialect = db.get_bind().dialect.name
+
+        if dialect in ('postgresql', 'sqlite'):
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+            stmt = dialect_insert(ApiOpportunity).values(batch).on_conflict_do_nothing(
+                index_elements=[ApiOpportunity.source_url]
+            )
+            return db.execute(stmt).rowcount
+
+        # Otros motores: se filtran antes las URLs que ya existen
+        urls = [row['source_url'] for row in batch if row.get('source_url')]
+        existing = set(db.scalars(
+            select(ApiOpportunity.source_url).where(ApiOpportunity.source_url.in_(urls))
+        )) if urls else set()
+        new_rows = [row for row in batch if row.get('source_url') not in existing]
+        if new_rows:
+            db.execute(insert(ApiOpportunity), new_rows)
+        return len(new_rows)
+
+    def _upsert_batch(self, db: Session, batch: List[Dict], existing: Dict[str, str]):
+        """existing: dedup_key -> source de las filas que ya están en la tabla"""
+        dialect = db.get_bind().dialect.name
+
+        if dialect in ('postgresql', 'sqlite'):
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+            stmt = dialect_insert(APIEndpoint).values(batch)
+            # En el UPDATE, APIEndpoint.<columna> es la fila existente
+            manual = APIEndpoint.source == SOURCE_MANUAL
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[APIEndpoint.dedup_key],
+                set_={
+                    'description': case((manual, APIEndpoint.description), else_=stmt.excluded.description),
+                    'source': case((manual, APIEndpoint.source), else_=stmt.excluded.source),
+                    'scheme': stmt.excluded.scheme,
+                    'host': stmt.excluded.host,
+                    'path': stmt.excluded.path,
+                    'is_active': case((manual, APIEndpoint.is_active), else_=True),
+                    'updated_at': func.now(),
+                }
+            )
+            db.execute(stmt)
+            return
+
+        # Otros motores: INSERT de las nuevas y UPDATE por clave de las existentes
+        new_rows = [row for row in batch if row['dedup_key'] not in existing]
+        if new_rows:
+            db.execute(insert(APIEndpoint), new_rows)
+        for row in batch:
+            if row['dedup_key'] in existing:
+                values = {'scheme': row['scheme'], 'host': row['host'], 'path': row['path']}
+                if existing[row['dedup_key']] != SOURCE_MANUAL:
+                    values.update(description=row['description'], source=row['source'], is_active=True)
+                db.execute(
+                    update(APIEndpoint)
+                    .where(APIEndpoint.dedup_key == row['dedup_key'])
+                    .values(**values)
+                )
+
+
+def _batches(items: List, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
@@ -0,0 +1,260 @@
+import queue
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Estados finales de una etapa
+DONE = "done"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+
+@dataclass
+class StageResult:
+    """Salida de una etapa: cuántos items nuevos produjo y los datos para las siguientes"""
+    new_items: int = 0
+    output: Any = None
+
+
+@dataclass
+class Stage:
+    """Etapa del pipeline.
+
+    run(inputs) recibe {nombre_etapa: StageResult} de sus dependencias y
+    devuelve un StageResult (o un int con el número de items nuevos).
+    """
+    name: str
+    run: Callable[[Dict[str, StageResult]], Any]
+    depends_on: List[str] = field(default_factory=list)
+    # Si todas sus dependencias terminan sin nada nuevo, la etapa se salta
+    skip_if_no_new_input: bool = True
+
+
+@dataclass
+class StageReport:
+    name: str
+    status: str
+    new_items: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+
+class Pipeline:
+    """Orquestador DAG en proceso.
+
+    Cada etapa arranca en cuanto terminan sus dependencias (las
+    independientes corren a la vez) dentro del mismo proceso, sin
+    relanzar el intérprete ni esperas fijas entre etapas. Una etapa cuyo
+    upstream no produjo nada nuevo se salta, y el salto se propaga.
+    """
+
+    def __init__(self, stages: List[Stage], max_workers: int = 4):
+        self.stages = {stage.name: stage for stage in stages}
+        self.max_workers = max_workers
+        self._validate()
+
+    def run(self) -> Dict[str, StageReport]:
+        """Ejecuta un ciclo completo y devuelve el informe por etapa"""
+        started = time.monotonic()
+        results: Dict[str, StageResult] = {}
+        reports: Dict[str, StageReport] = {}
+        pending = dict(self.stages)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="stage") as executor:
+            while pending or running:
+                for name, stage in list(pending.items()):
+                    if not all(dep in reports for dep in stage.depends_on):
+                        continue
+                    del pending[name]
+
+                    upstream = [reports[dep] for dep in stage.depends_on]
+                    if any(report.status == FAILED for report in upstream):
+                        reports[name] = StageReport(name, SKIPPED, error="dependencia fallida")
+                        print(f"⏭️ [{name}] Saltada: falló una dependencia")
+                        continue
+                    if stage.depends_on and stage.skip_if_no_new_input and not any(r.new_items for r in upstream):
+                        reports[name] = StageReport(name, SKIPPED)
+                        print(f"⏭️ [{name}] Saltada: nada nuevo de {', '.join(stage.depends_on)}")
+                        continue
+
+                    inputs = {dep: results[dep] for dep in stage.depends_on}
+                    print(f"▶️ [{name}] Iniciando")
+                    running[executor.submit(self._run_stage, stage, inputs)] = name
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    report, result = future.result()
+                    reports[name] = report
+                    if result is not None:
+                        results[name] = result
+
+        print(f"🏁 Ciclo completado en {time.monotonic() - started:.1f}s: " + ", ".join(
+            f"{r.name}={r.status}({r.new_items})" for r in reports.values()
+        ))
+        return reports
+
+    def _run_stage(self, stage: Stage, inputs: Dict[str, StageResult]):
+        started = time.monotonic()
+        try:
+            result = stage.run(inputs)
+            if not isinstance(result, StageResult):
+                result = StageResult(new_items=int(result or 0))
+            seconds = time.monotonic() - started
+            print(f"✅ [{stage.name}] {result.new_items} nuevos en {seconds:.1f}s")
+            return StageReport(stage.name, DONE, result.new_items, seconds), result
+        except Exception as e:
+            traceback.print_exc()
+            seconds = time.monotonic() - started
+            print(f"❌ [{stage.name}] Error tras {seconds:.1f}s: {e}")
+            return StageReport(stage.name, FAILED, seconds=seconds, error=str(e)), None
+
+    def _validate(self):
+        for stage in self.stages.values():
+            for dep in stage.depends_on:
+                if dep not in self.stages:
+                    raise ValueError(f"La etapa {stage.name} depende de una etapa inexistente: {dep}")
+
+        # Detectar ciclos (DFS)
+        visiting, visited = set(), set()
+
+        def visit(name):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Ciclo de dependencias en la etapa {name}")
+            visiting.add(name)
+            for dep in self.stages[name].depends_on:
+                visit(dep)
+            visiting.discard(name)
+            visited.add(name)
+
+        for name in self.stages:
+            visit(name)
+
+
+# Marca de fin de cola para los workers de una etapa en streaming
+_END = object()
+
+
+@dataclass
+class StreamStage:
+    """Etapa de un pipeline en streaming.
+
+    handler(item) procesa un item y devuelve None, un item o una lista de
+    items para la etapa siguiente. Cada etapa tiene `workers` hilos y una
+    cola de entrada acotada a `queue_size`: si la etapa se retrasa, la
+    anterior se bloquea al encolar (back-pressure) en lugar de acumular
+    trabajo en memoria.
+    """
+    name: str
+    handler: Callable[[Any], Any]
+    workers: int = 1
+    queue_size: int = 8
+
+
+class StreamingPipeline:
+    """Cadena productor/consumidor: cada item pasa a la etapa siguiente en cuanto
+    termina la anterior, sin esperar a que se complete el lote.
+
+    El checkpoint lo hacen los propios handlers (p.ej. marcando filas en la
+    BD), de modo que tras un fallo se puede reanudar sembrando cada etapa
+    con lo que quedó pendiente (`seeds`).
+    """
+
+    def __init__(self, stages: List[StreamStage]):
+        if not stages:
+            raise ValueError("El pipeline necesita al menos una etapa")
+        self.stages = stages
+
+    def run(self, source: Iterable[Any] = (), seeds: Optional[Dict[str, Iterable[Any]]] = None) -> Dict[str, Dict[str, int]]:
+        """Procesa los items de `source` (y los de `seeds` por etapa) y devuelve contadores por etapa"""
+        seeds = seeds or {}
+        names = [stage.name for stage in self.stages]
+        unknown = set(seeds) - set(names)
+        if unknown:
+            raise ValueError(f"Etapas desconocidas en seeds: {', '.join(sorted(unknown))}")
+
+        started = time.monotonic()
+        queues = [queue.Queue(maxsize=max(1, stage.queue_size)) for stage in self.stages]
+        stats = {name: {"processed": 0, "failed": 0, "emitted": 0} for name in names}
+        lock = threading.Lock()
+
+        # Productores pendientes por etapa: workers de la etapa anterior + alimentadores
+        feeds = [(0, source)] + [(names.index(name), items) for name, items in seeds.items()]
+        producers = [0] * len(self.stages)
+        for index in range(1, len(self.stages)):
+            producers[index] += max(1, self.stages[index - 1].workers)
+        for index, _ in feeds:
+            producers[index] += 1
+
+        def producer_done(index: int):
+            with lock:
+                producers[index] -= 1
+                finished = producers[index] == 0
+            if finished:
+                for _ in range(max(1, self.stages[index].workers)):
+                    queues[index].put(_END)
+
+        def feed(index: int, items: Iterable[Any]):
+            try:
+                for item in items:
+                    queues[index].put(item)
+            except Exception as e:
+                traceback.print_exc()
+                print(f"❌ [{names[index]}] Error alimentando la etapa: {e}")
+            finally:
+                producer_done(index)
+
+        def work(index: int):
+            stage = self.stages[index]
+            downstream = queues[index + 1] if index + 1 < len(self.stages) else None
+            try:
+                while True:
+                    item = queues[index].get()
+                    if item is _END:
+                        break
+                    try:
+                        output = stage.handler(item)
+                    except Exception as e:
+                        traceback.print_exc()
+                        print(f"❌ [{stage.name}] Error procesando {item!r}: {e}")
+                        with lock:
+                            stats[stage.name]["failed"] += 1
+                        continue
+
+                    outputs = [] if output is None else output if isinstance(output, list) else [output]
+                    with lock:
+                        stats[stage.name]["processed"] += 1
+                        stats[stage.name]["emitted"] += len(outputs)
+                    if downstream is not None:
+                        for out in outputs:
+                            downstream.put(out)
+            finally:
+                if downstream is not None:
+                    producer_done(index + 1)
+
+        threads = [
+            threading.Thread(target=work, args=(index,), name=f"{stage.name}-{n}", daemon=True)
+            for index, stage in enumerate(self.stages)
+            for n in range(max(1, stage.workers))
+        ]
+        threads += [
+            threading.Thread(target=feed, args=(index, items), name=f"feed-{names[index]}", daemon=True)
+            for index, items in feeds
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        print(f"🏁 Streaming completado en {time.monotonic() - started:.1f}s: " + ", ".join(
+            f"{name}={s['processed']} ok/{s['failed']} err" for name, s in stats.items()
+        ))
+        return stats
@@ -0,0 +1,173 @@
+import copy
+import json
+import os
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.models.api_opportunity import ApiOpportunity
+
+# Pesos por defecto: reproducen las heurísticas originales de basic_discovery.py.
+# Se pueden sobrescribir con un JSON (mismo formato) en SCORING_WEIGHTS_FILE.
+DEFAULT_WEIGHTS = {
+    'viability': {
+        'base': 5.0,
+        'keywords': {
+            'easy': 0.5, 'simple': 0.5, 'documented': 0.5, 'popular': 0.5, 'free': 0.5, 'open source': 0.5,
+            'complex': -0.5, 'difficult': -0.5, 'paid': -0.5, 'enterprise': -0.5, 'complicated': -0.5,
+        },
+    },
+    'demand': {
+        'base': 5.0,
+        'keywords': {'popular': 1.0, 'trending': 1.0, 'hot': 1.0, 'most used': 1.0, 'essential': 1.0},
+    },
+    'relevance': {
+        'keywords': ['api', 'rest', 'graphql', 'wrapper', 'client'],
+    },
+    # Combinación lineal usada para ordenar oportunidades
+    'ranking': {
+        'viability_score': 0.5,
+        'demand_metric': 0.4,
+        'implementation_complexity': -0.1,
+    },
+}
+
+SCORE_MIN = 1.0
+SCORE_MAX = 10.0
+
+
+def load_weights(path: Optional[str] = None) -> Dict:
+    """Pesos por defecto combinados con los del fichero JSON indicado (o SCORING_WEIGHTS_FILE)"""
+    weights = copy.deepcopy(DEFAULT_WEIGHTS)
+    path = path or os.getenv("SCORING_WEIGHTS_FILE")
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            overrides = json.load(f)
+        for section, values in overrides.items():
+            if isinstance(values, dict) and isinstance(weights.get(section), dict):
+                weights[section].update(values)
+            else:
+                weights[section] = values
+    return weights
+
+
+class KeywordMatcher:
+    """Busca un conjunto de keywords con peso en un lote entero de textos.
+
+    Replica la semántica de `keyword in text.lower()`: cuenta la presencia
+    (no las repeticiones) de cada keyword, sin límites de palabra y aunque
+    se solapen entre sí.
+
+    Todos los textos se pasan a minúsculas una sola vez y se concatenan en
+    un único bloque; cada keyword se busca sobre el bloque con la búsqueda
+    de subcadenas de C y las posiciones se traducen a filas con
+    searchsorted. En CPython esto es bastante más rápido que una regex con
+    alternativas, que el motor `re` prueba una a una en cada carácter.
+    """
+
+    # Separador entre textos: no aparece en ninguna keyword, así que una
+    # coincidencia nunca cruza de un texto al siguiente
+    SEPARATOR = '\0'
+
+    def __init__(self, weights: Dict[str, float]):
+        self.weights = {keyword.lower(): float(weight) for keyword, weight in weights.items() if keyword}
+        self.keywords = list(self.weights)
+        self.weight_vector = np.array([self.weights[k] for k in self.keywords], dtype=float)
+
+    def presence(self, texts: pd.Series) -> np.ndarray:
+        """Matriz booleana (textos x keywords) con las keywords presentes en cada texto"""
+        lowered = texts.fillna('').astype(str).str.lower().tolist()
+        found = np.zeros((len(lowered), len(self.keywords)), dtype=bool)
+        if not lowered or not self.keywords:
+            return found
+
+        blob = self.SEPARATOR.join(lowered)
+        lengths = np.fromiter(map(len, lowered), dtype=np.int64, count=len(lowered))
+        starts = np.cumsum(lengths + len(self.SEPARATOR)) - (lengths + len(self.SEPARATOR))
+
+        for column, keyword in enumerate(self.keywords):
+            positions = []
+            position = blob.find(keyword)
+            while position != -1:
+                positions.append(position)
+                position = blob.find(keyword, position + 1)
+            if positions:
+                rows = np.searchsorted(starts, positions, side='right') - 1
+                found[rows, column] = True
+        return found
+
+    def score(self, texts: pd.Series) -> pd.Series:
+        """Suma de los pesos de las keywords presentes en cada texto"""
+        return pd.Series(self.presence(texts) @ self.weight_vector, index=texts.index)
+
+    def matches_any(self, texts: pd.Series) -> pd.Series:
+        """True para los textos que contienen al menos una keyword"""
+        return pd.Series(self.presence(texts).any(axis=1), index=texts.index)
+
+
+class ScoringService:
+    """Puntúa, filtra y ordena lotes de oportunidades de forma vectorizada"""
+
+    def __init__(self, weights: Optional[Dict] = None):
+        self.weights = weights or load_weights()
+        self.viability_matcher = KeywordMatcher(self.weights['viability']['keywords'])
+        self.demand_matcher = KeywordMatcher(self.weights['demand']['keywords'])
+        self.relevance_matcher = KeywordMatcher({k: 1.0 for k in self.weights['relevance']['keywords']})
+
+    def viability_scores(self, descriptions: pd.Series) -> pd.Series:
+        base = self.weights['viability']['base']
+        return (base + self.viability_matcher.score(descriptions)).clip(SCORE_MIN, SCORE_MAX)
+
+    def demand_scores(self, titles: pd.Series) -> pd.Series:
+        base = self.weights['demand']['base']
+        return (base + self.demand_matcher.score(titles)).clip(SCORE_MIN, SCORE_MAX)
+
+    def relevant(self, frame: pd.DataFrame, title: str = 'name', description: str = 'description') -> pd.Series:
+        """Máscara de filas cuyo título o descripción contiene alguna keyword de relevancia"""
+        # El separador evita coincidencias que crucen de un campo al otro
+        texts = (frame[title].fillna('').astype(str) + KeywordMatcher.SEPARATOR
+                 + frame[description].fillna('').astype(str))
+        return self.relevance_matcher.matches_any(texts)
+
+    def score(self, frame: pd.DataFrame, title: str = 'name', description: str = 'description') -> pd.DataFrame:
+        """Devuelve una copia con viability_score y demand_metric calculados"""
+        scored = frame.copy()
+        scored['viability_score'] = self.viability_scores(frame[description])
+        scored['demand_metric'] = self.demand_scores(frame[title])
+        return scored
+
+    def rank(self, frame: pd.DataFrame, top_k: Optional[int] = None) -> pd.DataFrame:
+        """Ordena por la combinación lineal de 'ranking'; con top_k devuelve solo las mejores"""
+        rank_score = np.zeros(len(frame))
+        for column, weight in self.weights['ranking'].items():
+            if column in frame:
+                rank_score += weight * frame[column].fillna(0).to_numpy(dtype=float)
+        ranked = frame.assign(rank_score=rank_score)
+        if top_k is not None:
+            return ranked.nlargest(top_k, 'rank_score')
+        return ranked.sort_values('rank_score', ascending=False)
+
+    def rescore_table(
+        self, db: Session, categories: Iterable[str] = ('github_trending',), unprocessed_only: bool = False
+    ) -> int:
+        """Recalcula viability_score y demand_metric de api_opportunities tras cambiar pesos.
+
+        Una lectura, una pasada vectorizada y un UPDATE por lotes a partir de
+        la clave primaria. No hace commit.
+        """
+        query = select(ApiOpportunity.id, ApiOpportunity.name, ApiOpportunity.description)
+        if categories:
+            query = query.where(ApiOpportunity.category.in_(list(categories)))
+        if unprocessed_only:
+            query = query.where(ApiOpportunity.is_processed == False)
+        frame = pd.read_sql(query, db.connection())
+        if frame.empty:
+            return 0
+
+        scored = self.score(frame)
+        rows = scored[['id', 'viability_score', 'demand_metric']].to_dict('records')
+        db.execute(update(ApiOpportunity), rows)
+        return len(rows)
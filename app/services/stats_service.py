@@ -0,0 +1,34 @@
+from sqlalchemy import case, func, select, true
+
+from app.models import APIEndpoint, APIService, WrapperConfig
+
+# Métodos que el dashboard muestra siempre, aunque no haya endpoints
+BASE_METHODS = ("GET", "POST", "PUT", "DELETE")
+
+
+class StatsService:
+    """Consultas agregadas con las que CounterService.rebuild() recalcula los contadores.
+
+    Los endpoints se cuentan con un único GROUP BY (método, origen) sobre
+    la columna indexada `source`; wrappers y servicios con una segunda
+    consulta de una sola fila.
+    """
+
+    def endpoint_breakdown_query(self):
+        method = func.upper(func.coalesce(APIEndpoint.method, "GET")).label("method")
+        return (
+            select(method, APIEndpoint.source, func.count().label("total"))
+            .group_by(method, APIEndpoint.source)
+        )
+
+    def totals_query(self):
+        wrappers = select(
+            func.count().label("wrappers"),
+            func.count(case((WrapperConfig.is_active == True, 1))).label("active_wrappers"),
+        ).subquery()
+        services = select(func.count().label("services")).select_from(APIService).subquery()
+        # Dos subconsultas de una fila: el producto cruzado es la fila de totales
+        return (
+            select(wrappers.c.wrappers, wrappers.c.active_wrappers, services.c.services)
+            .select_from(wrappers.join(services, true()))
+        )
@@ -1,8 +1,507 @@
 import requests
+import keyword
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple
+from jinja2 import DictLoader, Environment, StrictUndefined
+
+# Versión del generador: entra en el digest de los artefactos, así un cambio
+# en el código generado no reutiliza artefactos de la versión anterior
+GENERATOR_VERSION = "5"
+
+# Nombres que ya usa la clase generada
+_RESERVED_METHODS = ("__init__", "_make_request", "_cached", "_cache_store", "cache_stats")
+_RESERVED_PARAMS = ("self", "endpoint", "query_params", "data")
+
+_PATH_PARAM = re.compile(r'\{([^{}/]+)\}')
+_NON_IDENTIFIER = re.compile(r'[^0-9a-zA-Z_]+')
+
+
+@dataclass(frozen=True)
+class PathParam:
+    raw: str  # nombre en la URL ({user-id})
+    name: str  # identificador Python (user_id)
+
+
+@dataclass(frozen=True)
+class EndpointSpec:
+    """Representación intermedia de un endpoint: todo lo que necesita la plantilla, ya calculado.
+    
+    Los literales (path_expr, doc) ya vienen como expresiones Python
+    válidas, así que la plantilla no escapa nada.
+    """
+    name: str
+    url: str
+    http_method: str
+    path_expr: str
+    path_params: Tuple[PathParam, ...]
+    doc: str
+    has_query: bool
+    has_body: bool
+
+
+def _identifier(text: str, fallback: str = "endpoint") -> str:
+    """Identificador Python ASCII válido a partir de un texto arbitrario"""
+    name = _NON_IDENTIFIER.sub('_', text).strip('_') or fallback
+    if name[0].isdigit():
+        name = f"{fallback}_{name}"
+    return f"{name}_" if keyword.iskeyword(name) else name
+
+
+def _http_method(method: str) -> str:
+    return re.sub(r'[^A-Z]', '', (method or 'GET').upper()) or 'GET'
+
+
+def _path_expression(url: str) -> Tuple[Tuple[PathParam, ...], str]:
+    """Parámetros de ruta y la expresión Python (literal o f-string) que construye la ruta"""
+    params: List[PathParam] = []
+    names = set(_RESERVED_PARAMS)
+    template = []
+    position = 0
+    for match in _PATH_PARAM.finditer(url):
+        template.append(url[position:match.start()].replace('{', '{{').replace('}', '}}'))
+        base = _identifier(match.group(1), "param")
+        name, suffix = base, 1
+        while name in names:
+            suffix += 1
+            name = f"{base}_{suffix}"
+        names.add(name)
+        params.append(PathParam(raw=match.group(1), name=name))
+        template.append(f"{{{name}}}")
+        position = match.end()
+    if not params:
+        return (), repr(url)
+    template.append(url[position:].replace('{', '{{').replace('}', '}}'))
+    return tuple(params), 'f' + repr(''.join(template))
+
+
+# Variantes del código generado: "async" (httpx.AsyncClient compartido, para
+# servirlo desde apps asíncronas) o "sync" (requests.Session, para scripts)
+WRAPPER_FLAVORS = ("async", "sync")
+DEFAULT_FLAVOR = "async"
+
+_ASYNC_POOL = """try:
+    import h2  # noqa: F401  (httpx[http2])
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Pool del cliente compartido, ajustable por entorno
+MAX_CONNECTIONS = int(os.getenv("WRAPPER_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("WRAPPER_MAX_KEEPALIVE", "20"))
+KEEPALIVE_EXPIRY = float(os.getenv("WRAPPER_KEEPALIVE_EXPIRY", "30"))
+TIMEOUT = float(os.getenv("WRAPPER_TIMEOUT", "30"))
+HTTP2 = HTTP2_AVAILABLE and os.getenv("WRAPPER_HTTP2", "true").lower() in ("1", "true", "yes")
+"""
+
+# Caché de respuestas GET del wrapper REST. Las APIs envueltas sirven sobre
+# todo datos públicos que cambian poco: la mayoría de llamadas se responden
+# sin salir del proceso o con un 304 sin cuerpo
+_RESPONSE_CACHE = """try:
+    {{ "import redis.asyncio as redis" if is_async else "import redis" }}
+    from redis.exceptions import RedisError
+except ImportError:
+    redis = None
+
+# Caché de respuestas: en memoria (TTL + LRU) por defecto, Redis si hay WRAPPER_CACHE_URL
+CACHE_ENABLED = os.getenv("WRAPPER_CACHE", "true").lower() in ("1", "true", "yes")
+CACHE_URL = os.getenv("WRAPPER_CACHE_URL")
+# Frescura cuando la API no envía Cache-Control max-age
+CACHE_TTL = float(os.getenv("WRAPPER_CACHE_TTL", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("WRAPPER_CACHE_MAX_ENTRIES", "1024"))
+# Tiempo extra que se guardan las respuestas con ETag/Last-Modified para revalidarlas
+CACHE_REVALIDATE_WINDOW = float(os.getenv("WRAPPER_CACHE_REVALIDATE_WINDOW", "3600"))
+
+
+class MemoryCache:
+    \"\"\"Caché TTL + LRU en memoria del proceso\"\"\"
+    shared = False
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    {{ async_ }}def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires, raw = item
+            if expires <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        # Se guarda serializado: quien llama puede modificar el resultado sin tocar la caché
+        return json.loads(raw)
+
+    {{ async_ }}def set(self, key, entry, ttl):
+        raw = json.dumps(entry)
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, raw)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class RedisCache:
+    \"\"\"Caché en Redis, compartida entre procesos e instancias\"\"\"
+    shared = True
+
+    def __init__(self, url=CACHE_URL):
+        self.client = redis.from_url(url)
+
+    {{ async_ }}def get(self, key):
+        try:
+            raw = {{ await_ }}self.client.get(key)
+        except RedisError as e:
+            print(f"Cache error: {e}")
+            return None
+        return json.loads(raw) if raw else None
+
+    {{ async_ }}def set(self, key, entry, ttl):
+        try:
+            {{ await_ }}self.client.set(key, json.dumps(entry), ex=max(1, int(ttl)))
+        except RedisError as e:
+            print(f"Cache error: {e}")
+
+
+def default_cache():
+    \"\"\"Redis si WRAPPER_CACHE_URL está configurada; si no, memoria. None si está desactivada\"\"\"
+    if not CACHE_ENABLED:
+        return None
+    if CACHE_URL and redis is not None:
+        return RedisCache(CACHE_URL)
+    if CACHE_URL:
+        print("redis no está instalado: se usa la caché en memoria")
+    return MemoryCache()
+
+
+def _cache_key(method, base_url, endpoint, params, authorization):
+    # La credencial entra en la clave: cada api_key tiene sus propias entradas
+    credential = hashlib.sha256(authorization.encode("utf-8")).hexdigest() if authorization else ""
+    raw = json.dumps([method, base_url + endpoint, sorted(dict(params or {}).items()), credential], default=str)
+    return "wrapper:" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _vary(headers):
+    return [name.strip().lower() for name in headers.get("Vary", "").split(",") if name.strip()]
+
+
+def _vary_matches(entry, request_headers):
+    \"\"\"La entrada se obtuvo con las mismas cabeceras de petición que nombra su Vary\"\"\"
+    return all(request_headers.get(name) == value for name, value in (entry.get("vary") or {}).items())
+
+
+def _freshness(headers, shared, authenticated):
+    \"\"\"Segundos que la respuesta es fresca según Cache-Control/Age, o None si no se puede guardar\"\"\"
+    directives = {}
+    for part in headers.get("Cache-Control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"')
+    if "no-store" in directives or (shared and "private" in directives) or "*" in _vary(headers):
+        return None
+    # RFC 9111 §3.5: una caché compartida solo guarda respuestas a peticiones
+    # con Authorization si la API lo permite explícitamente
+    if shared and authenticated and not {"public", "s-maxage", "must-revalidate"} & directives.keys():
+        return None
+    if "no-cache" in directives:
+        return 0.0
+    age = headers.get("Age", "")
+    age = int(age) if age.isdigit() else 0
+    for name in ("s-maxage", "max-age") if shared else ("max-age",):
+        if directives.get(name, "").isdigit():
+            return max(0.0, float(directives[name]) - age)
+    return CACHE_TTL
+
+
+def _conditional_headers(entry):
+    \"\"\"If-None-Match / If-Modified-Since para revalidar una respuesta guardada\"\"\"
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+"""
+
+# Parte común a ambas variantes de la clase REST: estadísticas y guardado
+_CACHED_METHODS = """
+    def cache_stats(self):
+        \"\"\"Aciertos de la caché de respuestas (revalidated: la API contestó 304, sin cuerpo)\"\"\"
+        total = self.cache_hits + self.cache_revalidated + self.cache_misses
+        return {
+            "backend": type(self.cache).__name__ if self.cache else None,
+            "hits": self.cache_hits,
+            "revalidated": self.cache_revalidated,
+            "misses": self.cache_misses,
+            "hit_ratio": (self.cache_hits + self.cache_revalidated) / total if total else 0.0,
+        }
+
+    {{ async_ }}def _cache_store(self, key, headers, payload, previous=None):
+        request_headers = {{ "self.client.headers" if is_async else "self.session.headers" }}
+        fresh = _freshness(headers, self.cache.shared, bool(request_headers.get("Authorization")))
+        if fresh is None:
+            return
+        previous = previous or {}
+        entry = {
+            "payload": payload,
+            "vary": {name: request_headers.get(name) for name in _vary(headers)} if headers.get("Vary") else previous.get("vary"),
+            "etag": headers.get("ETag") or previous.get("etag"),
+            "last_modified": headers.get("Last-Modified") or previous.get("last_modified"),
+            "fresh_until": time.time() + fresh,
+        }
+        # Con validadores la entrada sigue sirviendo caducada: se revalida con un GET condicional
+        keep = fresh + (CACHE_REVALIDATE_WINDOW if entry["etag"] or entry["last_modified"] else 0)
+        if keep > 0:
+            {{ await_ }}self.cache.set(key, entry, keep)
+
+    {{ async_ }}def _cached(self, method, endpoint, params):
+        \"\"\"(clave, entrada guardada, si es fresca) de una petición cacheable\"\"\"
+        if method != 'GET' or self.cache is None:
+            return None, None, False
+        request_headers = {{ "self.client.headers" if is_async else "self.session.headers" }}
+        key = _cache_key(method, self.base_url, endpoint, params, request_headers.get("Authorization"))
+        entry = {{ await_ }}self.cache.get(key)
+        if entry is not None and not _vary_matches(entry, request_headers):
+            entry = None
+        if entry is not None and entry["fresh_until"] > time.time():
+            self.cache_hits += 1
+            return key, entry, True
+        return key, entry, False
+"""
+
+# Cliente asíncrono común a los wrappers REST y GraphQL: se crea al primer
+# uso (vale también sin lifespan, p.ej. en serverless) y se cierra con aclose()
+_ASYNC_CLIENT = """    def __init__(self, {{ url_arg }}={{ url }}, api_key=None, client=None, http2=None{{ ", cache=None" if with_cache else "" }}):
+        self.{{ url_arg }} = {{ url_arg }}{{ ".rstrip('/')" if url_arg == "base_url" else "" }}
+        self.headers = {'Authorization': f'Bearer {api_key}'} if api_key else {}
+        self.http2 = HTTP2 if http2 is None else http2
+        self._client = client
+        self._owns_client = client is None
+{% if with_cache %}
+        self.cache = (default_cache() if cache is None else cache) or None
+        self.cache_hits = self.cache_revalidated = self.cache_misses = 0
+{% endif %}
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+{% if url_arg == "base_url" %}
+                base_url=self.base_url,
+{% endif %}
+                headers=self.headers,
+                http2=self.http2,
+                timeout=TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=KEEPALIVE_EXPIRY
+                )
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None and self._owns_client:
+            await self._client.aclose()
+        self._client = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+"""
+
+_REST_TEMPLATE = """{% set async_ = "async " if is_async else "" %}
+{% set await_ = "await " if is_async else "" %}
+import hashlib
 import json
-import inspect
-from typing import Dict, Any, List
-from fastapi import HTTPException
+import os
+import threading
+import time
+from collections import OrderedDict
+
+{% if is_async %}
+import httpx
+
+{% include "async_pool" %}
+{% else %}
+import requests
+{% endif %}
+
+{% include "response_cache" %}
+
+
+{% if is_async %}
+class APIWrapper:
+    \"\"\"Cliente asíncrono con un único httpx.AsyncClient (pool y keep-alive compartidos).
+
+    Úsalo con `async with APIWrapper() as api:` o llama a `aclose()` al terminar.
+    Las respuestas GET se guardan en `cache` (ver cache_stats()).
+    \"\"\"
+
+{% with url_arg="base_url", url=base_url, with_cache=True %}{% include "async_client" %}{% endwith %}
+{% else %}
+class APIWrapper:
+    \"\"\"Cliente síncrono; las respuestas GET se guardan en `cache` (ver cache_stats())\"\"\"
+
+    def __init__(self, base_url={{ base_url }}, api_key=None, cache=None):
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+        if api_key:
+            self.session.headers.update({'Authorization': f'Bearer {api_key}'})
+        self.cache = (default_cache() if cache is None else cache) or None
+        self.cache_hits = self.cache_revalidated = self.cache_misses = 0
+{% endif %}
+{% for m in specs %}
+
+    {{ async_ }}def {{ m.name }}(self{% for p in m.path_params %}, {{ p.name }}{% endfor %}{% if m.has_query %}, query_params=None{% endif %}{% if m.has_body %}, data=None{% endif %}):
+        {{ m.doc }}
+        endpoint = {{ m.path_expr }}
+        return {{ await_ }}self._make_request({{ m.http_method | pyrepr }}, endpoint{% if m.has_query %}, params=query_params{% endif %}{% if m.has_body %}, data=data{% endif %})
+{% endfor %}
+{% include "cached_methods" %}
+
+{% if is_async %}
+    async def _make_request(self, method, endpoint, params=None, data=None):
+        key, entry, fresh = await self._cached(method, endpoint, params)
+        if fresh:
+            return entry["payload"]
+        try:
+            response = await self.client.request(
+                method, endpoint, params=params, json=data, headers=_conditional_headers(entry)
+            )
+            if response.status_code == 304 and entry is not None:
+                self.cache_revalidated += 1
+                await self._cache_store(key, response.headers, entry["payload"], entry)
+                return entry["payload"]
+            response.raise_for_status()
+            payload = response.json()
+        except httpx.HTTPError as e:
+            print(f"Error calling {self.base_url}{endpoint}: {e}")
+            raise
+{% else %}
+    def _make_request(self, method, endpoint, params=None, data=None):
+        key, entry, fresh = self._cached(method, endpoint, params)
+        if fresh:
+            return entry["payload"]
+        url = f"{self.base_url}{endpoint}"
+        try:
+            response = self.session.request(
+                method=method,
+                url=url,
+                params=params,
+                json=data,
+                headers=_conditional_headers(entry),
+                timeout=30
+            )
+            if response.status_code == 304 and entry is not None:
+                self.cache_revalidated += 1
+                self._cache_store(key, response.headers, entry["payload"], entry)
+                return entry["payload"]
+            response.raise_for_status()
+            payload = response.json()
+        except requests.exceptions.RequestException as e:
+            print(f"Error calling {url}: {e}")
+            raise
+{% endif %}
+        if key is not None:
+            self.cache_misses += 1
+            if response.status_code == 200:
+                {{ await_ }}self._cache_store(key, response.headers, payload)
+        return payload
+"""
+
+_GRAPHQL_TEMPLATE = """{% if is_async %}
+import os
+
+import httpx
+
+{% include "async_pool" %}
+
+
+class GraphQLWrapper:
+    \"\"\"Cliente GraphQL asíncrono con un único httpx.AsyncClient\"\"\"
+
+{% with url_arg="endpoint_url", url=endpoint_url, with_cache=False %}{% include "async_client" %}{% endwith %}
+
+    async def query(self, query_string, variables=None):
+        \"\"\"Ejecuta una query GraphQL\"\"\"
+        payload = {"query": query_string, "variables": variables or {}}
+        try:
+            response = await self.client.post(self.endpoint_url, json=payload)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError as e:
+            print(f"GraphQL query error: {e}")
+            raise
+
+    async def mutation(self, mutation_string, variables=None):
+        \"\"\"Ejecuta una mutation GraphQL\"\"\"
+        return await self.query(mutation_string, variables)
+{% else %}
+import requests
+
+
+class GraphQLWrapper:
+    def __init__(self, endpoint_url={{ endpoint_url }}, api_key=None):
+        self.endpoint_url = endpoint_url
+        self.session = requests.Session()
+        if api_key:
+            self.session.headers.update({'Authorization': f'Bearer {api_key}'})
+
+    def query(self, query_string, variables=None):
+        \"\"\"Ejecuta una query GraphQL\"\"\"
+        payload = {"query": query_string, "variables": variables or {}}
+        try:
+            response = self.session.post(self.endpoint_url, json=payload, timeout=30)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            print(f"GraphQL query error: {e}")
+            raise
+
+    def mutation(self, mutation_string, variables=None):
+        \"\"\"Ejecuta una mutation GraphQL\"\"\"
+        return self.query(mutation_string, variables)
+{% endif %}
+"""
+
+# Plantillas compiladas una vez por proceso
+_templates = Environment(
+    loader=DictLoader({
+        "async_pool": _ASYNC_POOL,
+        "async_client": _ASYNC_CLIENT,
+        "response_cache": _RESPONSE_CACHE,
+        "cached_methods": _CACHED_METHODS,
+    }),
+    autoescape=False, trim_blocks=True, lstrip_blocks=True, keep_trailing_newline=True, undefined=StrictUndefined
+)
+_templates.filters["pyrepr"] = repr
+_rest_template = _templates.from_string(_REST_TEMPLATE)
+_graphql_template = _templates.from_string(_GRAPHQL_TEMPLATE)
+
+
+def _check_flavor(flavor: str) -> bool:
+    """True si la variante es asíncrona"""
+    if flavor not in WRAPPER_FLAVORS:
+        raise ValueError(f"Variante de wrapper no soportada: {flavor}")
+    return flavor == "async"
+
+
+@lru_cache(maxsize=64)
+def render_rest_wrapper(base_url: str, specs: Tuple[EndpointSpec, ...], flavor: str = DEFAULT_FLAVOR) -> str:
+    """Código del wrapper REST; cacheado por IR (base_url + especificaciones + variante)"""
+    return _rest_template.render(base_url=repr(base_url), specs=specs, is_async=_check_flavor(flavor))
+
+
+def render_graphql_wrapper(endpoint_url: str, flavor: str = DEFAULT_FLAVOR) -> str:
+    return _graphql_template.render(endpoint_url=repr(endpoint_url), is_async=_check_flavor(flavor))
+
 
 class APIWrapperService:
     def __init__(self):
@@ -12,10 +511,13 @@ class APIWrapperService:
             'Content-Type': 'application/json'
         })
     
-    def create_rest_wrapper(self, base_url: str, endpoints: List[Dict]) -> Dict[str, Any]:
+    def create_rest_wrapper(self, base_url: str, endpoints: List[Dict], flavor: str = DEFAULT_FLAVOR) -> Dict[str, Any]:
         """Crea un wrapper REST para una API"""
-        wrapper_code = self._generate_rest_wrapper_code(base_url, endpoints)
-        config = self._generate_wrapper_config(base_url, endpoints, 'rest')
+        # Cada endpoint se analiza una sola vez; código y configuración salen de la misma IR
+        specs = self._parse_endpoints(endpoints)
+        wrapper_code = render_rest_wrapper(base_url, specs, flavor)
+        config = self._generate_wrapper_config(base_url, specs, 'rest')
+        config["flavor"] = flavor
         
         return {
             "wrapper_type": "rest",
@@ -25,10 +527,11 @@ class APIWrapperService:
             "config": config
         }
     
-    def create_graphql_wrapper(self, endpoint_url: str, schema: Dict = None) -> Dict[str, Any]:
+    def create_graphql_wrapper(self, endpoint_url: str, schema: Dict = None, flavor: str = DEFAULT_FLAVOR) -> Dict[str, Any]:
         """Crea un wrapper GraphQL"""
-        wrapper_code = self._generate_graphql_wrapper_code(endpoint_url)
+        wrapper_code = render_graphql_wrapper(endpoint_url, flavor)
         config = self._generate_graphql_config(endpoint_url, schema)
+        config["flavor"] = flavor
         
         return {
             "wrapper_type": "graphql",
@@ -37,43 +540,6 @@ class APIWrapperService:
             "config": config
         }
     
-    def _generate_rest_wrapper_code(self, base_url: str, endpoints: List[Dict]) -> str:
-        """Genera código Python para wrapper REST"""
-        methods = []
-        
-        for endpoint in endpoints:
-            method_name = self._generate_method_name(endpoint['url'], endpoint['method'])
-            method_code = self._generate_method_code(endpoint, base_url)
-            methods.append(method_code)
-        
-        wrapper_class = f'''
-class APIWrapper:
-    def __init__(self, base_url="{base_url}", api_key=None):
-        self.base_url = base_url.rstrip('/')
-        self.session = requests.Session()
-        if api_key:
-            self.session.headers.update({{'Authorization': f'Bearer {{api_key}}'}})
-    
-    {"".join(methods)}
-    
-    def _make_request(self, method, endpoint, params=None, data=None):
-        url = f"{{self.base_url}}{{endpoint}}"
-        try:
-            response = self.session.request(
-                method=method,
-                url=url,
-                params=params,
-                json=data,
-                timeout=30
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Error calling {{url}}: {{e}}")
-            raise
-'''
-        return f"import requests\n\n{wrapper_class}"
-    
     def _generate_method_name(self, url: str, method: str) -> str:
         """Genera un nombre de método legible a partir de la URL"""
         # Extraer partes significativas de la URL
@@ -100,56 +566,51 @@ class APIWrapper:
         
         return f"{method_prefix}{base_name}"
     
-    def _generate_method_code(self, endpoint: Dict, base_url: str) -> str:
-        """Genera código para un método específico"""
-        method_name = self._generate_method_name(endpoint['url'], endpoint['method'])
-        
-        # Extraer parámetros de la URL
-        url_parts = endpoint['url'].split('/')
-        path_params = [part[1:-1] for part in url_parts if part.startswith('{') and part.endswith('}')]
-        
-        param_list = ["self"]
-        if path_params:
-            param_list.extend(path_params)
-        
-        # Añadir parámetros de query para GET
-        if endpoint['method'].upper() == 'GET':
-            param_list.append("query_params=None")
-        
-        # Añadir data para POST/PUT
-        if endpoint['method'].upper() in ['POST', 'PUT', 'PATCH']:
-            param_list.append("data=None")
-        
-        params_str = ", ".join(param_list)
-        
-        # Construir la URL
-        endpoint_url = endpoint['url']
-        if path_params:
-            url_builder = f'endpoint = f"{endpoint_url}"'
-        else:
-            url_builder = f'endpoint = "{endpoint_url}"'
+    def _parse_endpoints(self, endpoints: List[Dict]) -> Tuple[EndpointSpec, ...]:
+        """IR de los endpoints: una pasada, en orden (ruta, método) y con nombres únicos.
         
-        method_code = f'''
-    def {method_name}({params_str}):
-        """{endpoint.get('description', 'Auto-generated endpoint')}"""
-        {url_builder}
-        return self._make_request("{endpoint['method']}", endpoint{', params=query_params' if 'query_params' in param_list else ''}{', data=data' if 'data' in param_list else ''})
-'''
-        return method_code
+        Las colisiones de nombre se resuelven con sufijos _2, _3... en ese
+        orden, así la misma entrada produce siempre los mismos nombres.
+        """
+        parsed = sorted(
+            {(endpoint['url'], _http_method(endpoint.get('method'))): endpoint for endpoint in endpoints}.items()
+        )
+        taken = set(_RESERVED_METHODS)
+        next_suffix: Dict[str, int] = {}
+        specs = []
+        for (url, http_method), endpoint in parsed:
+            base = _identifier(self._generate_method_name(url, http_method))
+            name = base
+            while name in taken:
+                next_suffix[base] = next_suffix.get(base, 1) + 1
+                name = f"{base}_{next_suffix[base]}"
+            taken.add(name)
+            path_params, path_expr = _path_expression(url)
+            specs.append(EndpointSpec(
+                name=name,
+                url=url,
+                http_method=http_method,
+                path_expr=path_expr,
+                path_params=path_params,
+                doc=repr(endpoint.get('description') or 'Auto-generated endpoint'),
+                has_query=http_method == 'GET',
+                has_body=http_method in ('POST', 'PUT', 'PATCH')
+            ))
+        return tuple(specs)
     
-    def _generate_wrapper_config(self, base_url: str, endpoints: List[Dict], wrapper_type: str) -> Dict:
+    def _generate_wrapper_config(self, base_url: str, specs: Tuple[EndpointSpec, ...], wrapper_type: str) -> Dict:
         """Genera configuración para el wrapper"""
         return {
             "base_url": base_url,
             "wrapper_type": wrapper_type,
             "endpoints": [
                 {
-                    "url": endpoint['url'],
-                    "method": endpoint['method'],
-                    "wrapper_method": self._generate_method_name(endpoint['url'], endpoint['method']),
-                    "parameters": self._extract_parameters(endpoint['url'])
+                    "url": spec.url,
+                    "method": spec.http_method,
+                    "wrapper_method": spec.name,
+                    "parameters": [param.raw for param in spec.path_params]
                 }
-                for endpoint in endpoints
+                for spec in specs
             ],
             "authentication": {
                 "type": "api_key",
@@ -157,47 +618,6 @@ class APIWrapper:
             }
         }
     
-    def _extract_parameters(self, url: str) -> List[str]:
-        """Extrae parámetros de la URL"""
-        import re
-        return re.findall(r'\{(\w+)\}', url)
-    
-    def _generate_graphql_wrapper_code(self, endpoint_url: str) -> str:
-        """Genera código para wrapper GraphQL"""
-        return f'''
-import requests
-
-class GraphQLWrapper:
-    def __init__(self, endpoint_url="{endpoint_url}", api_key=None):
-        self.endpoint_url = endpoint_url
-        self.session = requests.Session()
-        if api_key:
-            self.session.headers.update({{'Authorization': f'Bearer {{api_key}}'}})
-    
-    def query(self, query_string, variables=None):
-        """Ejecuta una query GraphQL"""
-        payload = {{
-            "query": query_string,
-            "variables": variables or {{}}
-        }}
-        
-        try:
-            response = self.session.post(
-                self.endpoint_url,
-                json=payload,
-                timeout=30
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"GraphQL query error: {{e}}")
-            raise
-    
-    def mutation(self, mutation_string, variables=None):
-        """Ejecuta una mutation GraphQL"""
-        return self.query(mutation_string, variables)
-'''
-    
     def _generate_graphql_config(self, endpoint_url: str, schema: Dict = None) -> Dict:
         """Genera configuración para wrapper GraphQL"""
         return {
@@ -0,0 +1,67 @@
+import ast
+import re
+from typing import List, Optional
+
+_OPEN_FENCE = re.compile(r"```(?:python|py|python3)[ \t]*\r?\n", re.IGNORECASE)
+_CLOSE_FENCE = "\n```"
+# Lo que hay que volver a mirar de lo ya recibido: una valla puede partirse entre deltas
+_LOOKBEHIND = 16
+
+
+class FencedCodeWatcher:
+    """Detecta en un stream de texto el cierre del primer bloque ```python.
+
+    Se alimenta con cada delta (`watcher(delta)`) y devuelve True en cuanto
+    el bloque está completo, para cortar el stream ahí. Los deltas se
+    acumulan en una lista y solo se busca en el delta nuevo más los
+    últimos _LOOKBEHIND caracteres ya recibidos, así que el coste total es
+    lineal en el tamaño de la respuesta.
+    """
+
+    def __init__(self):
+        self.code_start: Optional[int] = None
+        self.code_end: Optional[int] = None
+        self._parts: List[str] = []
+        self._length = 0
+        self._tail = ""
+
+    def __call__(self, delta: str) -> bool:
+        window = self._tail + delta
+        offset = self._length - len(self._tail)  # posición de window[0] en el texto completo
+        self._parts.append(delta)
+        self._length += len(delta)
+        self._tail = window[-_LOOKBEHIND:]
+        if self.code_start is None:
+            match = _OPEN_FENCE.search(window)
+            if not match:
+                return False
+            self.code_start = offset + match.end()
+        # El cierre puede coincidir con el salto de línea final de la valla de apertura
+        end = window.find(_CLOSE_FENCE, max(0, self.code_start - 1 - offset))
+        if end == -1:
+            return False
+        self.code_end = max(offset + end, self.code_start)
+        return True
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    @property
+    def code(self) -> Optional[str]:
+        if self.code_end is None:
+            return None
+        return self.text[self.code_start:self.code_end]
+
+
+def validate_python(code: str) -> Optional[str]:
+    """None si el código compila; si no, el error de sintaxis legible para el prompt de reparación"""
+    if not code or not code.strip():
+        return "la respuesta no contiene código"
+    try:
+        compile(ast.parse(code), "<wrapper>", "exec")
+    except SyntaxError as e:
+        return f"{e.msg} (línea {e.lineno}): {(e.text or '').strip()}"
+    except (ValueError, RecursionError) as e:
+        return str(e)
+    return None
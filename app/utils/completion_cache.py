@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.utils.disk_lru import DiskLRUStore
+from app.utils.url_frontier import normalize_url
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_input(value: Any) -> str:
+    """Texto de entrada normalizado: sin espacios sobrantes; las URLs http(s) canónicas"""
+    text = _WHITESPACE.sub(" ", str(value or "")).strip()
+    if text.lower().startswith(("http://", "https://")):
+        try:
+            text = normalize_url(text)
+        except ValueError:
+            pass
+    return text
+
+
+class CompletionCache:
+    """Caché persistente en disco de respuestas del LLM ya procesadas.
+
+    La clave es el sha256 de (modelo, versión de la plantilla de prompt,
+    entradas normalizadas, temperatura): la misma petición no vuelve a
+    pagarse ni a esperarse. Se guarda el resultado ya extraído (el código),
+    no la respuesta cruda. Igual que HTTPCache, el tamaño total se limita
+    expulsando las entradas usadas hace más tiempo (DiskLRUStore).
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None):
+        directory = directory or os.getenv("LLM_CACHE_DIR", ".cache/llm")
+        if max_bytes is None:
+            max_bytes = int(os.getenv("LLM_CACHE_MAX_MB", "64")) * 1024 * 1024
+        self.disk = DiskLRUStore(directory, max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model: str, template_version: str, inputs: Dict[str, Any], temperature: float) -> str:
+        normalized = {name: normalize_input(value) for name, value in sorted(inputs.items())}
+        raw = json.dumps([model, template_version, normalized, round(float(temperature), 4)],
+                         ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Resultado guardado para la clave, o None (cuenta acierto/fallo y marca el uso)"""
+        entry = self.disk.read(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.tokens_saved += entry.get("tokens", 0)
+        self.disk.touch(key)
+        return entry["content"]
+
+    def store(self, key: str, content: str, tokens: int = 0, meta: Optional[Dict[str, Any]] = None):
+        self.disk.write(key, {
+            "key": key,
+            "stored_at": time.time(),
+            "tokens": tokens,
+            "meta": meta or {},
+            "content": content,
+        })
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas de la caché"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / total) if total else 0.0,
+            "tokens_saved": self.tokens_saved,
+            "evictions": self.disk.evictions,
+            "size_bytes": self.disk.size(),
+            "max_bytes": self.disk.max_bytes,
+        }
+
+
+_default_cache: Optional[CompletionCache] = None
+
+
+def get_completion_cache() -> CompletionCache:
+    """Caché compartida del proceso, configurada por entorno"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = CompletionCache()
+    return _default_cache
@@ -0,0 +1,96 @@
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, Optional
+
+
+class DiskLRUStore:
+    """Entradas JSON en disco con tamaño total acotado y expulsión LRU.
+
+    Cada clave (hexadecimal) es un fichero `<dir>/<2 primeros>/<clave>.json`
+    escrito de forma atómica. El mtime marca el último uso: al superar
+    max_bytes se expulsan las entradas usadas hace más tiempo hasta quedar
+    al 90% del límite. Base de HTTPCache y CompletionCache.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+
+    def read(self, key: str) -> Optional[Dict]:
+        """Entrada guardada para la clave, o None si no existe o está corrupta"""
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def write(self, key: str, entry: Dict):
+        """Guarda la entrada y expulsa las menos usadas si se supera el límite"""
+        data = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+        path = self._path(key)
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._total_bytes = self._current_size() + len(data) - previous
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def touch(self, key: str) -> bool:
+        """Marca la entrada como recién usada; False si ya no existe (expulsada)"""
+        try:
+            os.utime(self._path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def size(self) -> int:
+        """Bytes ocupados por todas las entradas"""
+        with self._lock:
+            return self._current_size()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _files(self):
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(".json"):
+                    yield os.path.join(root, name)
+
+    def _current_size(self) -> int:
+        if self._total_bytes is None:
+            self._total_bytes = sum(os.path.getsize(p) for p in self._files())
+        return self._total_bytes
+
+    def _evict(self):
+        """Expulsa las entradas menos usadas hasta quedar al 90% del límite"""
+        target = int(self.max_bytes * 0.9)
+        entries = []
+        for path in self._files():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                self.evictions += 1
+            except OSError:
+                pass
+        self._total_bytes = total
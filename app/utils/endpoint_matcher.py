@@ -0,0 +1,89 @@
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional
+from urllib.parse import urljoin
+
+# Un único patrón por URL: marcadores de API y verbos que sugieren el método HTTP.
+# Los grupos con nombre permiten clasificar la URL en una sola pasada.
+_URL_TOKENS = re.compile(
+    r'(?P<api>/api/|/v[0-9]+/|\.json$|\.xml$|graphql|rest)'
+    r'|(?P<GET>get|fetch|query)'
+    r'|(?P<POST>post|create|submit)'
+    r'|(?P<PUT>put|update)'
+    r'|(?P<DELETE>delete|remove)',
+    re.IGNORECASE,
+)
+
+# Prioridad de los verbos cuando aparecen varios (mismo orden que la heurística original)
+_METHOD_PRIORITY = ('GET', 'POST', 'PUT', 'DELETE')
+
+# Llamadas HTTP típicas en JavaScript, combinadas en un solo autómata. Se ancla en
+# "(" y se comprueba con lookbehinds de ancho fijo qué función precede: así el motor
+# solo trabaja en los paréntesis precedidos de h/x/t/e en lugar de intentar las tres
+# alternativas en cada carácter del bundle.
+_JS_CALLS = re.compile(
+    r'\((?<=[hxte]\()(?:'
+    r'(?<=fetch\()\s*["\'](?P<fetch_url>[^"\']+)["\']'
+    r'|(?<=\.ajax\()[^)]*?url:\s*["\'](?P<ajax_url>[^"\']+)["\']'
+    r'|(?:(?<=axios\.get\()|(?<=axios\.put\()|(?<=axios\.post\()|(?<=axios\.patch\()|(?<=axios\.delete\())'
+    r'\s*["\'](?P<axios_url>[^"\']+)["\']'
+    r')'
+)
+
+_CRAWLABLE_PAGE = re.compile(r'/(api|docs?|reference|developers?|v[0-9]+)(/|$|\?|#)', re.IGNORECASE)
+
+
+@lru_cache(maxsize=4096)
+def classify_url(url: str) -> Optional[str]:
+    """Devuelve el método HTTP probable si la URL parece un endpoint API, o None"""
+    is_api = False
+    verbs = set()
+    for match in _URL_TOKENS.finditer(url):
+        if match.lastgroup == 'api':
+            is_api = True
+        else:
+            verbs.add(match.lastgroup)
+    if not is_api:
+        return None
+    return _pick_method(verbs)
+
+
+def looks_like_api_endpoint(url: str) -> bool:
+    """Determina si una URL parece ser un endpoint API"""
+    return classify_url(url) is not None
+
+
+def guess_method(url: str) -> str:
+    """Intenta adivinar el método HTTP basado en la URL"""
+    return _pick_method({m.lastgroup for m in _URL_TOKENS.finditer(url) if m.lastgroup != 'api'})
+
+
+def looks_like_crawlable_page(url: str) -> bool:
+    """Determina si un enlace merece seguirse en un crawl recursivo"""
+    return _CRAWLABLE_PAGE.search(url) is not None
+
+
+def find_in_javascript(js_code: str, base_url: str = None) -> List[Dict]:
+    """Busca endpoints API en código JavaScript con una sola pasada sobre el texto"""
+    endpoints = []
+    for match in _JS_CALLS.finditer(js_code):
+        url = match.group('fetch_url') or match.group('axios_url') or match.group('ajax_url')
+        method = classify_url(url)
+        if method is None:
+            continue
+        if match.group('axios_url'):
+            # axios.<método>( : el método es lo que hay entre el último "." y el "("
+            method = js_code[js_code.rfind('.', 0, match.start()) + 1:match.start()].upper()
+        endpoints.append({
+            'url': urljoin(base_url, url) if base_url else url,
+            'method': method,
+            'source': 'javascript'
+        })
+    return endpoints
+
+
+def _pick_method(verbs) -> str:
+    for method in _METHOD_PRIORITY:
+        if method in verbs:
+            return method
+    return 'GET'
@@ -0,0 +1,207 @@
+import codecs
+import re
+from html.parser import HTMLParser
+from typing import Callable, Dict, Iterable, List, Optional
+
+try:
+    from lxml import etree as _lxml_etree
+except ImportError:  # lxml es opcional
+    _lxml_etree = None
+
+_CHARSET = re.compile(r'charset=["\']?([\w.:-]+)', re.IGNORECASE)
+
+
+def charset_from_content_type(content_type: Optional[str]) -> Optional[str]:
+    """Extrae el charset de una cabecera Content-Type, si viene declarado"""
+    match = _CHARSET.search(content_type or '')
+    if not match:
+        return None
+    try:
+        return codecs.lookup(match.group(1)).name
+    except LookupError:
+        return None
+
+
+def default_backend() -> str:
+    """Backend más rápido disponible: lxml si está instalado, si no html.parser"""
+    return 'lxml' if _lxml_etree is not None else 'html.parser'
+
+
+class StreamingHTMLExtractor:
+    """Extrae enlaces, scripts y repos de GitHub a medida que llegan los bytes.
+
+    No construye el DOM: cada elemento de interés se entrega a su callback
+    en cuanto se cierra y después se descarta, así que la memoria por
+    página se mantiene aproximadamente constante (salvo el script inline
+    más grande, que hay que tener entero para analizarlo).
+
+    Callbacks:
+        on_link(href)                       por cada <a href>
+        on_script(text)                     por cada <script> inline
+        on_box_row({'title', 'description'}) por cada article.Box-row
+    """
+
+    def __init__(
+        self,
+        on_link: Optional[Callable[[str], None]] = None,
+        on_script: Optional[Callable[[str], None]] = None,
+        on_box_row: Optional[Callable[[Dict[str, str]], None]] = None,
+        encoding: Optional[str] = None,
+        backend: Optional[str] = None,
+    ):
+        self.on_link = on_link
+        self.on_script = on_script
+        self.on_box_row = on_box_row
+        self.backend = backend or default_backend()
+
+        self._script: Optional[List[str]] = None
+        self._row: Optional[Dict[str, str]] = None
+        self._row_articles = 0
+        self._row_capture: Optional[str] = None
+        self._row_text: List[str] = []
+
+        if self.backend == 'lxml':
+            if _lxml_etree is None:
+                raise ImportError("El backend 'lxml' requiere tener lxml instalado")
+            self._parser = _lxml_etree.HTMLPullParser(
+                events=('start', 'end'), encoding=encoding or 'utf-8', huge_tree=True
+            )
+        else:
+            self._parser = _SinkHTMLParser(self)
+            self._decoder = codecs.getincrementaldecoder(encoding or 'utf-8')(errors='replace')
+
+    def feed(self, chunk) -> None:
+        """Procesa un fragmento del documento (bytes o str)"""
+        if self.backend == 'lxml':
+            self._parser.feed(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+            self._drain_lxml_events()
+        else:
+            text = chunk if isinstance(chunk, str) else self._decoder.decode(chunk)
+            self._parser.feed(text)
+
+    def feed_all(self, chunks: Iterable) -> None:
+        """Procesa un iterable de fragmentos y cierra el documento"""
+        for chunk in chunks:
+            self.feed(chunk)
+        self.close()
+
+    def close(self) -> None:
+        if self.backend == 'lxml':
+            self._parser.close()
+            self._drain_lxml_events()
+        else:
+            self._parser.feed(self._decoder.decode(b'', final=True))
+            self._parser.close()
+
+    # Eventos comunes a ambos backends
+
+    def _start(self, tag: str, attrs: Dict[str, Optional[str]]) -> None:
+        if tag == 'a' and attrs.get('href') and self.on_link:
+            self.on_link(attrs['href'])
+        elif tag == 'script' and self.on_script and not attrs.get('src'):
+            self._script = []
+
+        if self._row is not None:
+            if tag == 'article':
+                self._row_articles += 1
+            elif self._row_capture is None and (
+                (tag == 'h2' and 'title' not in self._row) or (tag == 'p' and 'description' not in self._row)
+            ):
+                self._row_capture = tag
+                self._row_text = []
+        elif tag == 'article' and self.on_box_row and 'Box-row' in (attrs.get('class') or '').split():
+            self._row = {}
+            self._row_articles = 1
+
+    def _data(self, text: str) -> None:
+        if self._script is not None:
+            self._script.append(text)
+        if self._row_capture is not None:
+            self._row_text.append(text)
+
+    def _end(self, tag: str, text: Optional[str] = None) -> None:
+        if tag == 'script' and self._script is not None:
+            self.on_script(text if text is not None else ''.join(self._script))
+            self._script = None
+
+        if self._row is None:
+            return
+        if tag == self._row_capture:
+            pieces = [text] if text is not None else self._row_text
+            value = ''.join(piece.strip() for piece in pieces)
+            if tag == 'h2':
+                self._row['title'] = re.sub(r'\s+', '', value)
+            else:
+                self._row['description'] = value
+            self._row_capture = None
+        if tag == 'article':
+            self._row_articles -= 1
+        if self._row_articles == 0:
+            if 'title' in self._row:
+                self.on_box_row({'title': self._row['title'], 'description': self._row.get('description', '')})
+            self._row = None
+
+    def _drain_lxml_events(self) -> None:
+        for event, element in self._parser.read_events():
+            tag = element.tag
+            if not isinstance(tag, str):
+                continue  # comentarios / instrucciones de procesado
+            if event == 'start':
+                self._start(tag, dict(element.attrib))
+                continue
+
+            text = None
+            if tag == 'script':
+                text = element.text or ''
+            elif tag == self._row_capture:
+                text = ''.join(piece.strip() for piece in element.itertext())
+            self._end(tag, text)
+
+            if self._row_capture is not None:
+                continue  # el texto del h2/p en curso aún se necesita
+
+            # Liberar lo ya procesado para no acumular el árbol
+            element.clear()
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+
+
+class _SinkHTMLParser(HTMLParser):
+    """Adaptador de html.parser hacia StreamingHTMLExtractor.
+
+    html.parser puede partir un mismo nodo de texto entre dos feed(); los
+    trozos se agrupan hasta la siguiente etiqueta para que el extractor
+    reciba cada nodo de texto entero.
+    """
+
+    def __init__(self, sink: StreamingHTMLExtractor):
+        super().__init__(convert_charrefs=True)
+        self._sink = sink
+        self._pending: List[str] = []
+
+    def _flush(self):
+        if self._pending:
+            self._sink._data(''.join(self._pending))
+            self._pending = []
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        self._sink._start(tag, dict(attrs))
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush()
+        self._sink._start(tag, dict(attrs))
+        self._sink._end(tag)
+
+    def handle_data(self, data):
+        self._pending.append(data)
+
+    def handle_endtag(self, tag):
+        self._flush()
+        self._sink._end(tag)
+
+    def close(self):
+        super().close()
+        self._flush()
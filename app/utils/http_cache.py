@@ -0,0 +1,103 @@
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.utils.disk_lru import DiskLRUStore
+
+
+class HTTPCache:
+    """Caché HTTP persistente en disco basada en GET condicional.
+
+    Por cada URL guarda los validadores (ETag / Last-Modified) y el
+    resultado ya parseado de la respuesta. En la siguiente descarga se
+    envían If-None-Match / If-Modified-Since y, si el servidor contesta
+    304, se reutiliza el resultado sin volver a parsear. El tamaño total
+    se limita expulsando las entradas usadas hace más tiempo (DiskLRUStore).
+
+    Cada entrada guarda la versión del parser que produjo el resultado:
+    con otra versión no se envían validadores y la entrada cuenta como
+    fallo, así un cambio en el parser no sigue sirviendo resultados viejos.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None):
+        directory = directory or os.getenv("HTTP_CACHE_DIR", ".cache/http")
+        if max_bytes is None:
+            max_bytes = int(os.getenv("HTTP_CACHE_MAX_MB", "256")) * 1024 * 1024
+        self.disk = DiskLRUStore(directory, max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def conditional_headers(self, url: str, version: Optional[str] = None) -> Dict[str, str]:
+        """Cabeceras para revalidar la URL contra la copia guardada"""
+        entry = self.disk.read(self._key(url))
+        if not entry or entry.get("version") != version:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def not_modified_payload(self, url: str, status_code: int, version: Optional[str] = None) -> Optional[Any]:
+        """Si la respuesta es 304 devuelve el resultado guardado; si no, None"""
+        entry = None
+        if status_code == 304:
+            key = self._key(url)
+            entry = self.disk.read(key)
+            # La entrada pudo expulsarse (o reescribirse con otro parser) entre la
+            # petición y la respuesta, incluso justo después de leerla
+            if entry is not None and (entry.get("version") != version or not self.disk.touch(key)):
+                entry = None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return entry["payload"]
+
+    def store(self, url: str, headers, payload: Any, version: Optional[str] = None) -> bool:
+        """Guarda el resultado parseado si la respuesta trae validadores"""
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return False
+
+        self.disk.write(self._key(url), {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "version": version,
+            "stored_at": time.time(),
+            "payload": payload,
+        })
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas de la caché"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / total) if total else 0.0,
+            "size_bytes": self.disk.size(),
+            "max_bytes": self.disk.max_bytes,
+        }
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+_default_cache: Optional[HTTPCache] = None
+
+
+def get_http_cache() -> HTTPCache:
+    """Caché compartida del proceso, configurada por entorno"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = HTTPCache()
+    return _default_cache
@@ -0,0 +1,49 @@
+import json
+from typing import Any, AsyncIterator, Callable, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Tamaño de página por defecto / máximo de los listados
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Filas por consulta al exportar un listado completo en NDJSON
+EXPORT_BATCH_SIZE = 1000
+
+
+async def keyset_page(db: AsyncSession, stmt, id_column, after_id: Optional[int], limit: int) -> Tuple[List[Any], Optional[int]]:
+    """Una página de `stmt` ordenada por id a partir de `after_id` (paginación por clave).
+
+    A diferencia de OFFSET, el coste no crece con la profundidad de la
+    página: cada consulta arranca en el índice de la clave primaria. La
+    proyección de `stmt` debe incluir `id_column`. Devuelve las filas y el
+    `after_id` de la página siguiente (None si no hay más).
+    """
+    if after_id is not None:
+        stmt = stmt.where(id_column > after_id)
+    rows = (await db.execute(stmt.order_by(id_column).limit(limit + 1))).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, getattr(rows[-1], id_column.key)
+
+
+async def ndjson_export(
+    session_factory: Callable[[], AsyncSession],
+    stmt,
+    id_column,
+    serialize: Callable[[Any], dict],
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> AsyncIterator[str]:
+    """Exporta todas las filas de `stmt` como NDJSON, recorriéndolas por lotes de clave.
+
+    Usa su propia sesión (la respuesta se sigue enviando después de que la
+    ruta retorne) y nunca tiene en memoria más de un lote.
+    """
+    async with session_factory() as db:
+        after_id = None
+        while True:
+            rows, after_id = await keyset_page(db, stmt, id_column, after_id, batch_size)
+            for row in rows:
+                yield json.dumps(serialize(row), ensure_ascii=False, default=str) + "\n"
+            if after_id is None:
+                break
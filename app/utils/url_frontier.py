@@ -0,0 +1,135 @@
+import hashlib
+import math
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+_DEFAULT_PORTS = {'http': '80', 'https': '443'}
+
+
+def normalize_url(url: str) -> str:
+    """Normaliza una URL para deduplicar (esquema/host en minúsculas, sin fragmento, query ordenada)"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and str(parts.port) != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path or '/'
+    if len(path) > 1:
+        path = path.rstrip('/')
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+def endpoint_key(url: str, method: str) -> str:
+    """Clave de deduplicación de un endpoint: (url normalizada, método)"""
+    if url.lower().startswith(('http://', 'https://')):
+        url = normalize_url(url)
+    return hashlib.sha256(f"{method.upper()} {url}".encode('utf-8')).hexdigest()
+
+
+def origin_of(url: str) -> str:
+    """Devuelve el origen (esquema + host) de una URL normalizada"""
+    parts = urlsplit(normalize_url(url))
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def split_url(url: str, base: Optional[str] = None) -> Tuple[Optional[str], Optional[str], str]:
+    """(esquema, host, ruta) normalizados; las URLs relativas se resuelven contra `base`.
+
+    El host incluye el puerto si no es el de por defecto. Una URL relativa
+    sin `base` devuelve esquema y host None.
+    """
+    url = url.strip()
+    if base:
+        url = urljoin(base, url)
+    parts = urlsplit(normalize_url(url))
+    return parts.scheme or None, parts.netloc or None, parts.path
+
+
+class SeenURLSet:
+    """Conjunto exacto de URLs ya vistas"""
+
+    def __init__(self):
+        self._seen = set()
+
+    def add(self, url: str) -> bool:
+        """Añade la URL; devuelve False si ya estaba"""
+        if url in self._seen:
+            return False
+        self._seen.add(url)
+        return True
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._seen
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+
+class BloomFilter:
+    """Filtro de Bloom para crawls grandes: memoria fija, falsos positivos acotados"""
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self._bits = bytearray((self.size + 7) // 8)
+        self._count = 0
+
+    def _positions(self, url: str):
+        digest = hashlib.blake2b(url.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, url: str) -> bool:
+        """Añade la URL; devuelve False si (probablemente) ya estaba"""
+        is_new = False
+        for pos in self._positions(url):
+            byte, bit = divmod(pos, 8)
+            if not self._bits[byte] & (1 << bit):
+                self._bits[byte] |= 1 << bit
+                is_new = True
+        if is_new:
+            self._count += 1
+        return is_new
+
+    def __contains__(self, url: str) -> bool:
+        return all(self._bits[pos // 8] & (1 << (pos % 8)) for pos in self._positions(url))
+
+    def __len__(self) -> int:
+        return self._count
+
+
+class URLFrontier:
+    """Frontera de crawl: deduplica URLs y aplica presupuesto de páginas por dominio"""
+
+    def __init__(
+        self,
+        max_pages_per_domain: Optional[int] = None,
+        use_bloom: bool = False,
+        bloom_capacity: int = 1_000_000,
+    ):
+        self.max_pages_per_domain = max_pages_per_domain
+        self.seen = BloomFilter(bloom_capacity) if use_bloom else SeenURLSet()
+        self._pages_per_domain: Dict[str, int] = {}
+
+    def admit(self, url: str) -> Optional[str]:
+        """Devuelve la URL normalizada si debe descargarse, o None si se descarta"""
+        if not url.lower().startswith(('http://', 'https://')):
+            return None
+        normalized = normalize_url(url)
+        if normalized in self.seen:
+            return None
+
+        domain = urlsplit(normalized).netloc
+        used = self._pages_per_domain.get(domain, 0)
+        if self.max_pages_per_domain is not None and used >= self.max_pages_per_domain:
+            return None
+
+        self.seen.add(normalized)
+        self._pages_per_domain[domain] = used + 1
+        return normalized
+
+    def mark_seen(self, url: str):
+        """Marca una URL como vista (p. ej. el destino final de una redirección)"""
+        self.seen.add(normalize_url(url))
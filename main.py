@@ -1,11 +1,18 @@
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, HTTPException, Query
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
-from sqlalchemy.orm import Session
+from fastapi.responses import HTMLResponse, StreamingResponse
+from sqlalchemy import or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 import os
 import uvicorn
-from app.models import create_tables, get_db, APIEndpoint, APIService
-from app.routes import discovery, wrappers, deployment, dashboard
+from app.db import dispose_async_engine, get_pool_metrics
+from app.models import create_tables, get_async_db, APIEndpoint, APIService, AsyncSessionLocal, SessionLocal, SOURCE_MANUAL
+from app.routes import discovery, wrappers, deployment, dashboard, jobs
+from app.services.counter_service import CounterService, endpoint_deltas
+from app.services.persistence_service import endpoint_key, endpoint_url_columns
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, keyset_page, ndjson_export
 
 app = FastAPI(
     title="API Factory Automation",
@@ -21,15 +28,24 @@ app.include_router(discovery.router)
 app.include_router(wrappers.router)
 app.include_router(deployment.router)
 app.include_router(dashboard.router)
+app.include_router(jobs.router)
 
 @app.on_event("startup")
 async def startup_event():
     try:
         create_tables()
+        with SessionLocal() as db:
+            if CounterService().ensure_built(db):
+                db.commit()
+                print("📊 Contadores del dashboard materializados")
         print("🚀 API Factory Automation iniciada correctamente")
     except Exception as e:
         print(f"⚠️ Error al crear tablas: {e}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await dispose_async_engine()
+
 @app.get("/", response_class=HTMLResponse)
 async def root():
     try:
@@ -42,22 +58,59 @@ async def root():
 async def health_check():
     return {"status": "healthy", "service": "api-factory-automation"}
 
+@app.get("/health/db")
+async def database_health():
+    """Ocupación y esperas del pool de conexiones compartido"""
+    return get_pool_metrics()
+
+def serialize_endpoint(row) -> dict:
+    return {"id": row.id, "name": row.name, "url": row.url, "method": row.method}
+
 @app.get("/api/endpoints")
-async def list_endpoints(db: Session = Depends(get_db)):
-    endpoints = db.query(APIEndpoint).filter(APIEndpoint.is_active == True).all()
-    return {"endpoints": [{"id": e.id, "name": e.name, "url": e.url, "method": e.method} for e in endpoints]}
+async def list_endpoints(
+    after_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Endpoints activos, paginados por id (`after_id`) o exportados completos en NDJSON"""
+    stmt = select(APIEndpoint.id, APIEndpoint.name, APIEndpoint.url, APIEndpoint.method).where(APIEndpoint.is_active == True)
+    if format == "ndjson":
+        return StreamingResponse(
+            ndjson_export(AsyncSessionLocal, stmt, APIEndpoint.id, serialize_endpoint),
+            media_type="application/x-ndjson"
+        )
+    rows, next_after_id = await keyset_page(db, stmt, APIEndpoint.id, after_id, limit)
+    return {"endpoints": [serialize_endpoint(row) for row in rows], "next_after_id": next_after_id}
 
 @app.post("/api/endpoints")
-async def create_endpoint(name: str, url: str, method: str = "GET", description: str = "", db: Session = Depends(get_db)):
-    endpoint = APIEndpoint(name=name, url=url, method=method, description=description)
+async def create_endpoint(name: str, url: str, method: str = "GET", description: str = "", db: AsyncSession = Depends(get_async_db)):
+    key = endpoint_key(url, method)
+    await _reject_duplicate_endpoint(db, name, key)
+    endpoint = APIEndpoint(name=name, url=url, method=method, dedup_key=key, description=description, source=SOURCE_MANUAL, **endpoint_url_columns(url))
     db.add(endpoint)
-    db.commit()
-    db.refresh(endpoint)
+    await CounterService().apply_async(db, endpoint_deltas(method, SOURCE_MANUAL))
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Otra petición dio de alta el mismo endpoint entre la comprobación y el commit
+        await db.rollback()
+        await _reject_duplicate_endpoint(db, name, key)
+        raise
+    await db.refresh(endpoint)
     return {"message": "Endpoint creado exitosamente", "endpoint": {"id": endpoint.id, "name": endpoint.name}}
 
+async def _reject_duplicate_endpoint(db: AsyncSession, name: str, key: str):
+    """409 con el id existente si ya hay un endpoint con ese nombre o misma (url, método)"""
+    existing_id = await db.scalar(
+        select(APIEndpoint.id).where(or_(APIEndpoint.dedup_key == key, APIEndpoint.name == name)).limit(1)
+    )
+    if existing_id is not None:
+        raise HTTPException(status_code=409, detail={"message": "El endpoint ya existe", "id": existing_id})
+
 @app.get("/api/services")
-async def list_services(db: Session = Depends(get_db)):
-    services = db.query(APIService).filter(APIService.is_active == True).all()
+async def list_services(db: AsyncSession = Depends(get_async_db)):
+    services = await db.scalars(select(APIService).where(APIService.is_active == True))
     return {"services": [{"id": s.id, "name": s.name} for s in services]}
 
 if __name__ == "__main__":
@@ -1,52 +1,123 @@
 #!/usr/bin/env python3
+import os
 import schedule
-import time
-import subprocess
 import sys
-import os
+import time
 
-def run_discovery():
+from app.database import SessionLocal
+from app.models.api_opportunity import ApiOpportunity
+from app.services.completion_engine import LLM_CONCURRENCY
+from app.services.pipeline import Pipeline, Stage, StageResult, StreamStage, StreamingPipeline
+from app.services.scoring_service import ScoringService
+from scripts.deployment import auto_deploy
+from scripts.discovery import basic_discovery
+from scripts.wrapper import auto_wrapper
+
+# Workers por etapa del streaming de wrappers a despliegue. Los de generación
+# solo esperan al motor de completions, que aplica la concurrencia y los
+# presupuestos por minuto reales; por defecto, tantos como su concurrencia
+WRAPPER_WORKERS = int(os.getenv("WRAPPER_WORKERS", str(LLM_CONCURRENCY)))
+DEPLOY_WORKERS = int(os.getenv("DEPLOY_WORKERS", "1"))
+# Categorías que se repuntúan en cada ciclo
+RESCORED_CATEGORIES = ('github_trending',)
+
+def run_discovery(inputs):
     print("🔄 Ejecutando descubrimiento de APIs...")
-    result = subprocess.run([sys.executable, "scripts/discovery/basic_discovery.py"], 
-                          capture_output=True, text=True)
-    print(result.stdout)
-    if result.stderr:
-        print(f"STDERR: {result.stderr}")
-
-def run_wrapper_generation():
-    print("🔄 Generando wrappers...")
-    result = subprocess.run([sys.executable, "scripts/wrapper/auto_wrapper.py"], 
-                          capture_output=True, text=True)
-    print(result.stdout)
-    if result.stderr:
-        print(f"STDERR: {result.stderr}")
-
-def run_deployment():
-    print("🔄 Desplegando APIs...")
-    result = subprocess.run([sys.executable, "scripts/deployment/auto_deploy.py"], 
-                          capture_output=True, text=True)
-    print(result.stdout)
-    if result.stderr:
-        print(f"STDERR: {result.stderr}")
+    return basic_discovery.main()
+
+def has_unscored_opportunities(db):
+    return db.query(ApiOpportunity.id).filter(
+        ApiOpportunity.is_processed == False,
+        ApiOpportunity.viability_score.is_(None),
+        ApiOpportunity.category.in_(RESCORED_CATEGORIES)
+    ).first() is not None
+
+def run_scoring(inputs):
+    """Repuntúa si hay algo que puntuar y calcula el trabajo de la entrega.
+    
+    new_items = candidatos a wrapper + wrappers sin desplegar: si es 0,
+    la etapa de entrega se salta sin arrancar el motor de completions.
+    """
+    db = SessionLocal()
+    try:
+        if inputs["discovery"].new_items or has_unscored_opportunities(db):
+            print("🔄 Puntuando oportunidades pendientes...")
+            ScoringService().rescore_table(db, categories=RESCORED_CATEGORIES, unprocessed_only=True)
+            db.commit()
+        else:
+            print("⏭️ Nada nuevo que puntuar")
+        candidates = auto_wrapper.pending_opportunity_ids(db)
+        pending_deploys = auto_deploy.undeployed_wrappers(db)
+        print(f"📊 {len(candidates)} oportunidades por encima del umbral, "
+              f"{len(pending_deploys)} wrappers pendientes de desplegar")
+        return StageResult(
+            new_items=len(candidates) + len(pending_deploys),
+            output={"candidates": candidates, "deploys": pending_deploys}
+        )
+    finally:
+        db.close()
+
+def run_delivery(inputs):
+    """Generación de wrappers y despliegue encadenados en streaming.
+    
+    Cada oportunidad pasa a generación en cuanto hay un worker libre y
+    cada wrapper terminado pasa directamente a despliegue. Las colas son
+    acotadas, así que si el despliegue se atasca la generación espera.
+    El estado queda en la BD (is_processed / is_deployed): lo que una
+    caída dejó a medias se retoma al sembrar el pipeline.
+    """
+    print("🔄 Generando y desplegando wrappers...")
+    work = inputs["scoring"].output
+    generator = auto_wrapper.AutoWrapperGenerator()
+    deployer = auto_deploy.AutoDeployer()
+    pipeline = StreamingPipeline([
+        StreamStage(
+            "wrappers",
+            lambda opportunity_id: auto_wrapper.generate_for_opportunity(opportunity_id, generator),
+            workers=WRAPPER_WORKERS,
+            queue_size=WRAPPER_WORKERS * 2
+        ),
+        StreamStage(
+            "deployment",
+            lambda item: auto_deploy.deploy_opportunity_wrapper(item, deployer),
+            workers=DEPLOY_WORKERS,
+            queue_size=DEPLOY_WORKERS * 2
+        ),
+    ])
+    try:
+        stats = pipeline.run(source=work["candidates"], seeds={"deployment": work["deploys"]})
+    finally:
+        generator.engine.close()
+    print(f"📊 LLM: {generator.engine.metrics}")
+    return stats["deployment"]["processed"]
+
+def build_pipeline():
+    return Pipeline([
+        Stage("discovery", run_discovery, skip_if_no_new_input=False),
+        # Corre siempre: las oportunidades y despliegues pendientes de ciclos
+        # anteriores también cuentan; solo repuntúa si hay algo nuevo
+        Stage("scoring", run_scoring, depends_on=["discovery"], skip_if_no_new_input=False),
+        # Se salta si no hay candidatos ni wrappers sin desplegar
+        Stage("delivery", run_delivery, depends_on=["scoring"]),
+    ])
 
 def main():
+    # La salida de cada etapa se ve en vivo, línea a línea
+    sys.stdout.reconfigure(line_buffering=True)
+    
     print("🚀 INICIANDO SISTEMA AUTOMATIZADO DE INGRESOS PASIVOS")
     print("=" * 60)
     
+    pipeline = build_pipeline()
+    
     # Ejecutar inmediatamente
-    run_discovery()
-    time.sleep(5)
-    run_wrapper_generation()
-    time.sleep(5)
-    run_deployment()
+    pipeline.run()
     
     print("✅ Ejecución inicial completada!")
     print("📊 El sistema se ejecutará automáticamente cada 6 horas")
     
-    # Programar ejecuciones automáticas
-    schedule.every(6).hours.do(run_discovery)
-    schedule.every(6).hours.do(run_wrapper_generation)
-    schedule.every(12).hours.do(run_deployment)
+    # Un único ciclo encadenado: cada etapa arranca cuando termina la anterior
+    schedule.every(6).hours.do(pipeline.run)
     
     # Mantener el script corriendo
     while True:
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Micro-benchmark de las heurísticas de descubrimiento sobre bundles JS.
+
+Compara la implementación original (varias pasadas de re.finditer/re.search
+por patrón) con el matcher precompilado de app.utils.endpoint_matcher.
+
+Uso:
+    python scripts/benchmarks/bench_endpoint_matcher.py bundles/*.js
+    python scripts/benchmarks/bench_endpoint_matcher.py --url https://cdn.example.com/app.js
+Sin argumentos se usa un corpus sintético de ~5 MB.
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from app.utils import endpoint_matcher  # noqa: E402
+
+
+def legacy_looks_like_api_endpoint(url):
+    api_patterns = [r'/api/', r'/v[0-9]+/', r'\.json$', r'\.xml$', r'graphql', r'rest']
+    return any(re.search(pattern, url, re.IGNORECASE) for pattern in api_patterns)
+
+
+def legacy_guess_method(url):
+    if re.search(r'(get|fetch|query)', url, re.IGNORECASE):
+        return 'GET'
+    elif re.search(r'(post|create|submit)', url, re.IGNORECASE):
+        return 'POST'
+    elif re.search(r'(put|update)', url, re.IGNORECASE):
+        return 'PUT'
+    elif re.search(r'(delete|remove)', url, re.IGNORECASE):
+        return 'DELETE'
+    return 'GET'
+
+
+def legacy_find_in_javascript(js_code):
+    endpoints = []
+    patterns = [
+        r'fetch\(["\']([^"\']+)["\']',
+        r'axios\.(get|post|put|delete)\(["\']([^"\']+)["\']',
+        r'\.ajax\([^)]*url:\s*["\']([^"\']+)["\']',
+    ]
+    for pattern in patterns:
+        for match in re.finditer(pattern, js_code):
+            url = match.group(1) if len(match.groups()) > 1 else match.group(0)
+            if legacy_looks_like_api_endpoint(url):
+                endpoints.append({'url': url, 'method': legacy_guess_method(url), 'source': 'javascript'})
+    return endpoints
+
+
+def synthetic_corpus(size_bytes=5_000_000, seed=42):
+    """Genera JS minificado con llamadas HTTP dispersas entre código de relleno"""
+    rnd = random.Random(seed)
+    filler = [
+        'function a(b,c){return b.map(function(d){return d*c})}',
+        'var e=document.querySelector(".app");e.addEventListener("click",f);',
+        'const g={key:"value",list:[1,2,3],nested:{x:"y"}};',
+        'if(h&&h.length>0){for(var i=0;i<h.length;i++){j(h[i])}}',
+    ]
+    calls = [
+        'fetch("/api/v1/users")',
+        'axios.post("/api/orders/create",k)',
+        'axios.get("https://example.com/v2/items.json")',
+        '$.ajax({type:"GET",url:"/rest/products"})',
+        'fetch("/static/logo.png")',
+    ]
+    parts, total = [], 0
+    while total < size_bytes:
+        chunk = rnd.choice(calls) if rnd.random() < 0.02 else rnd.choice(filler)
+        parts.append(chunk)
+        total += len(chunk)
+    return ''.join(parts)
+
+
+def load_corpus(args):
+    corpus = []
+    for path in args.files:
+        corpus.append((path, Path(path).read_text(encoding='utf-8', errors='ignore')))
+    for url in args.url:
+        import requests
+        corpus.append((url, requests.get(url, timeout=30).text))
+    if not corpus:
+        corpus.append(('synthetic', synthetic_corpus()))
+    return corpus
+
+
+def bench(fn, text, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', nargs='*', help='Ficheros .js del corpus')
+    parser.add_argument('--url', action='append', default=[], help='URL de un bundle JS a descargar')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    total_legacy = total_new = 0.0
+    for name, text in load_corpus(args):
+        legacy_time, legacy_found = bench(legacy_find_in_javascript, text, args.repeat)
+        new_time, new_found = bench(endpoint_matcher.find_in_javascript, text, args.repeat)
+        total_legacy += legacy_time
+        total_new += new_time
+        mb = len(text) / 1_000_000
+        print(f"📦 {name} ({mb:.2f} MB)")
+        print(f"   legacy: {legacy_time * 1000:8.1f} ms  ({mb / legacy_time:6.1f} MB/s, {len(legacy_found)} endpoints)")
+        print(f"   nuevo:  {new_time * 1000:8.1f} ms  ({mb / new_time:6.1f} MB/s, {len(new_found)} endpoints)")
+
+    print(f"🚀 Speedup total: {total_legacy / total_new:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Benchmark de "todos los endpoints de una base URL": LIKE '%base%' vs rango en (host, path).
+
+Siembra una BD SQLite temporal con endpoints repartidos entre muchos hosts
+y mide la consulta original (LIKE con comodín inicial: recorre la tabla)
+contra la búsqueda por índice de persistence_service.endpoints_under,
+a varios tamaños de tabla. La segunda debería mantenerse plana.
+
+Uso:
+    python scripts/benchmarks/bench_host_lookup.py
+    python scripts/benchmarks/bench_host_lookup.py --sizes 100000 500000 --hosts 5000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from sqlalchemy import func, select  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.db import create_db_engine  # noqa: E402
+from app.models import APIEndpoint, Base  # noqa: E402
+from app.services.persistence_service import endpoint_url_columns, endpoints_under  # noqa: E402
+
+
+def seed(db, start, end, hosts, rnd):
+    rows = []
+    for i in range(start, end):
+        host = f"api{rnd.randrange(hosts)}.example.com"
+        url = f"https://{host}/v{rnd.randint(1, 3)}/resource{i % 200}/{i}"
+        rows.append({
+            "name": f"endpoint_{i}",
+            "url": url,
+            "method": "GET",
+            "dedup_key": f"{i:064x}",
+            "is_active": True,
+            **endpoint_url_columns(url),
+        })
+        if len(rows) == 10_000:
+            db.bulk_insert_mappings(APIEndpoint, rows)
+            rows = []
+    if rows:
+        db.bulk_insert_mappings(APIEndpoint, rows)
+    db.commit()
+
+
+def bench(db, criteria, repeat):
+    best, found = float("inf"), 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        found = db.scalar(select(func.count()).select_from(APIEndpoint).where(*criteria, APIEndpoint.is_active == True))
+        best = min(best, time.perf_counter() - started)
+    return best, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50_000, 100_000, 300_000])
+    parser.add_argument("--hosts", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), "bench_host_lookup.db")
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_db_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    rnd = random.Random(42)
+
+    base_url = "https://api7.example.com/v2"
+    seeded = 0
+    for size in sorted(args.sizes):
+        seed(db, seeded, size, args.hosts, rnd)
+        seeded = size
+
+        like_time, like_found = bench(db, [APIEndpoint.url.like(f"%{base_url}%")], args.repeat)
+        range_time, range_found = bench(db, endpoints_under(base_url), args.repeat)
+        print(f"📦 {size:>8} endpoints")
+        print(f"   LIKE:  {like_time * 1000:8.2f} ms  ({like_found} encontrados)")
+        print(f"   rango: {range_time * 1000:8.2f} ms  ({range_found} encontrados)  {like_time / range_time:6.1f}x")
+
+    db.close()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""Benchmark del motor de completions contra un servidor de chat completions local.
+
+Levanta un stub HTTP que imita /chat/completions con una latencia fija
+(y opcionalmente un 429 con Retry-After cada N peticiones) y genera N
+wrappers: una a una, como hacía auto_wrapper, y con CompletionEngine a
+distintas concurrencias, con y sin streaming. En streaming el stub envía
+el bloque de código seguido de prosa que el motor corta al cerrarse el
+bloque, lo que reduce el tiempo al primer wrapper y los tokens.
+
+También sirve de servidor de pruebas: LLM_BASE_URL=http://127.0.0.1:<puerto>
+apunta el resto del sistema a él.
+
+Uso:
+    python scripts/benchmarks/bench_llm_generation.py
+    python scripts/benchmarks/bench_llm_generation.py --requests 300 --latency 2 --concurrency 8 32 64
+    python scripts/benchmarks/bench_llm_generation.py --serve --port 8900
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+import httpx  # noqa: E402
+
+from app.services.completion_engine import CompletionEngine, CompletionRequest  # noqa: E402
+from app.utils.code_extraction import FencedCodeWatcher  # noqa: E402
+
+WRAPPER = "```python\nfrom fastapi import FastAPI\n\napp = FastAPI()\n```"
+# Segundos entre deltas del stream
+CHUNK_DELAY = 0.01
+
+
+def stub_server(port: int, latency: float, throttle_every: int, trailing_chunks: int = 0) -> ThreadingHTTPServer:
+    counter = {"requests": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            with lock:
+                counter["requests"] += 1
+                throttled = throttle_every and counter["requests"] % throttle_every == 0
+            if throttled:
+                self.send_response(429)
+                self.send_header("Retry-After", "1")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if body.get("stream"):
+                self._stream(latency, trailing_chunks)
+                return
+            time.sleep(latency + trailing_chunks * CHUNK_DELAY)
+            payload = json.dumps({
+                "choices": [{"message": {"role": "assistant", "content": WRAPPER}}],
+                "usage": {"total_tokens": len(json.dumps(body.get("messages", []))) // 4 + (len(WRAPPER) + trailing_chunks * 12) // 4},
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _stream(self, latency, trailing):
+            """SSE como la API real: el bloque de código y después prosa que el cliente puede cortar"""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            time.sleep(latency)
+            chunks = [WRAPPER[i:i + 8] for i in range(0, len(WRAPPER), 8)] + [" explicación"] * trailing
+            try:
+                for chunk in chunks:
+                    event = {"choices": [{"delta": {"content": chunk}}]}
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+                    self.wfile.flush()
+                    time.sleep(CHUNK_DELAY)
+                self.wfile.write(b"data: [DONE]\n\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # el cliente cortó el stream al cerrarse el bloque de código
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_requests(n, stream=False):
+    return [
+        CompletionRequest(
+            key=i,
+            messages=[{"role": "user", "content": f"Wrapper para la API {i} " * 20}],
+            stream_stop=FencedCodeWatcher if stream else None
+        )
+        for i in range(n)
+    ]
+
+
+def sequential(base_url, n):
+    started = time.perf_counter()
+    with httpx.Client(base_url=base_url, timeout=60) as client:
+        for request in make_requests(n):
+            client.post("/chat/completions", json={"messages": request.messages, "max_tokens": request.max_tokens})
+    return time.perf_counter() - started
+
+
+def engine_run(base_url, n, concurrency, rpm, tpm, stream=False):
+    engine = CompletionEngine(
+        base_url=base_url, api_key="", concurrency=concurrency,
+        requests_per_minute=rpm, tokens_per_minute=tpm, deadline=60
+    )
+    started = time.perf_counter()
+    results = list(engine.map_unordered(make_requests(n, stream)))
+    elapsed = time.perf_counter() - started
+    engine.close()
+    ok = sum(result.ok for result in results)
+    first_usable = min((result.latency for result in results if result.ok), default=0.0)
+    return elapsed, ok, first_usable, engine.metrics
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=1.0, help="segundos por completion en el stub")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 32])
+    parser.add_argument("--rpm", type=int, default=100_000)
+    parser.add_argument("--tpm", type=int, default=100_000_000)
+    parser.add_argument("--trailing-chunks", type=int, default=200, help="deltas de prosa tras el bloque de código")
+    parser.add_argument("--throttle-every", type=int, default=0, help="responder 429 cada N peticiones")
+    parser.add_argument("--sequential-sample", type=int, default=10, help="peticiones medidas en serie (se extrapola)")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--serve", action="store_true", help="solo levantar el stub y esperar")
+    args = parser.parse_args()
+
+    server = stub_server(args.port, args.latency, args.throttle_every, args.trailing_chunks)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    if args.serve:
+        print(f"Stub de chat completions en {base_url} (Ctrl+C para salir)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            return
+
+    sample = min(args.sequential_sample, args.requests)
+    per_request = sequential(base_url, sample) / sample
+    print(f"{args.requests} completions, latencia del stub {args.latency}s")
+    print(f"  en serie           {per_request * args.requests:8.1f} s (extrapolado de {sample})")
+    for concurrency in args.concurrency:
+        for stream in (False, True):
+            elapsed, ok, first_usable, metrics = engine_run(
+                base_url, args.requests, concurrency, args.rpm, args.tpm, stream
+            )
+            label = f"motor x{concurrency}{' stream' if stream else ''}"
+            print(f"  {label:<18} {elapsed:8.1f} s  ok={ok}  primer wrapper={first_usable:.2f}s"
+                  f"  tokens={metrics['tokens']}  cortados={metrics['stopped_early']}  throttled={metrics['throttled']}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,18 @@
 #!/usr/bin/env python3
 import os
+import shutil
 import subprocess
 import requests
+import tempfile
 import time
 from pathlib import Path
+from sqlalchemy import func, or_
+from app.database import SessionLocal
+from app.models.api_opportunity import ApiOpportunity
+from scripts.wrapper.auto_wrapper import wrapper_path
+
+# Despliegues fallidos tras los que un wrapper deja de reintentarse
+MAX_DEPLOY_ATTEMPTS = int(os.getenv("MAX_DEPLOY_ATTEMPTS", "3"))
 
 class AutoDeployer:
     def __init__(self):
@@ -13,18 +22,16 @@ class AutoDeployer:
         """Despliega un wrapper a Railway"""
         print(f"🚀 Desplegando {wrapper_path} a Railway...")
         
+        # Estructura temporal propia de este despliegue (varios workers despliegan a la vez)
+        temp_dir = tempfile.mkdtemp(prefix="deploy_")
         try:
-            # Crear estructura temporal para deployment
-            temp_dir = f"deploy_{int(time.time())}"
-            os.makedirs(temp_dir, exist_ok=True)
-            
             # Copiar archivos necesarios
             self.create_deployment_structure(temp_dir, wrapper_path)
             
             # Usar Railway CLI para deployment
             result = subprocess.run([
-                'railway', 'deploy', '--service', temp_dir
-            ], capture_output=True, text=True, timeout=300)
+                'railway', 'deploy', '--service', os.path.basename(temp_dir)
+            ], cwd=temp_dir, capture_output=True, text=True, timeout=300)
             
             if result.returncode == 0:
                 print(f"✅ Deployment exitoso para {wrapper_path}")
@@ -36,6 +43,8 @@ class AutoDeployer:
         except Exception as e:
             print(f"❌ Error desplegando a Railway: {e}")
             return False
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
     
     def create_deployment_structure(self, temp_dir, wrapper_path):
         """Crea estructura para deployment"""
@@ -70,19 +79,68 @@ celery==5.3.4
 }
             """.strip())
 
-def main():
+def undeployed_wrappers(db):
+    """Wrappers ya generados pero sin desplegar (p.ej. tras una caída): lista de (id, ruta).
+    
+    Se omiten los que ya fallaron MAX_DEPLOY_ATTEMPTS veces.
+    """
+    opportunities = db.query(ApiOpportunity).filter(
+        ApiOpportunity.is_processed == True,
+        ApiOpportunity.is_deployed == False,
+        or_(ApiOpportunity.deploy_failures.is_(None), ApiOpportunity.deploy_failures < MAX_DEPLOY_ATTEMPTS)
+    ).all()
+    pending = []
+    for opportunity in opportunities:
+        path = wrapper_path(opportunity)
+        if os.path.exists(path):
+            pending.append((opportunity.id, path))
+    return pending
+
+def deploy_opportunity_wrapper(item, deployer=None):
+    """Despliega el wrapper (id, ruta) de una oportunidad y lo marca como desplegado.
+    
+    Si falla se suma a deploy_failures, que undeployed_wrappers() usa para
+    dejar de reintentarlo.
+    """
+    opportunity_id, path = item
+    deployed = (deployer or AutoDeployer()).deploy_to_railway(path)
+    
+    db = SessionLocal()
+    try:
+        if deployed:
+            values = {ApiOpportunity.is_deployed: True}
+        else:
+            values = {ApiOpportunity.deploy_failures: func.coalesce(ApiOpportunity.deploy_failures, 0) + 1}
+        db.query(ApiOpportunity).filter(ApiOpportunity.id == opportunity_id).update(values)
+        db.commit()
+    finally:
+        db.close()
+    if not deployed:
+        raise RuntimeError(f"No se pudo desplegar {path}")
+    return item
+
+def deploy_wrappers(wrapper_files):
+    """Despliega los wrappers indicados; devuelve cuántos se desplegaron"""
     deployer = AutoDeployer()
+    deployed = 0
+    
+    for index, wrapper_file in enumerate(wrapper_files):
+        if index:
+            time.sleep(10)  # Esperar entre deployments
+        if deployer.deploy_to_railway(str(wrapper_file)):
+            deployed += 1
     
+    return deployed
+
+def main():
     # Buscar wrappers generados
     wrapper_dir = Path("generated_wrappers")
     if wrapper_dir.exists():
         wrapper_files = list(wrapper_dir.glob("*.py"))
-        
-        for wrapper_file in wrapper_files[:2]:  # Desplegar primeros 2
-            deployer.deploy_to_railway(str(wrapper_file))
-            time.sleep(10)  # Esperar entre deployments
+        return deploy_wrappers(wrapper_files[:2])  # Desplegar primeros 2
     else:
         print("❌ No hay wrappers generados para desplegar")
+        return 0
 
 if __name__ == "__main__":
     main()
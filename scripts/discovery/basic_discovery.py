@@ -2,177 +2,318 @@
 import requests
 import json
 import os
-from bs4 import BeautifulSoup
+import pandas as pd
 from sqlalchemy.orm import Session
 from app.database import SessionLocal, engine
-from app.models.api_opportunity import ApiOpportunity, Base
+from app.models import add_missing_columns
+from app.models.api_opportunity import ApiOpportunity, Base, ensure_unique_source_url
+from app.models.harvest_state import HarvestCursor, SeenItem
+from app.services.harvest_scheduler import HarvestPage, HarvestRequest, HarvestScheduler, HarvestSource
+from app.services.harvest_state_service import HarvestStateService
+from app.services.persistence_service import PersistenceService
+from app.services.scoring_service import KeywordMatcher, ScoringService
+from app.utils.html_stream import StreamingHTMLExtractor, charset_from_content_type
+from app.utils.http_cache import get_http_cache
 
 # Crear tablas
 Base.metadata.create_all(bind=engine)
+ensure_unique_source_url(engine)
+add_missing_columns(Base.metadata, engine)
 
 class ApiDiscovery:
     def __init__(self):
         self.deepseek_api_key = os.getenv("DEEPSEEK_API_KEY")
         self.session = requests.Session()
+        self.cache = get_http_cache()
+        self.scoring = ScoringService()
+        self.reddit_matcher = KeywordMatcher({keyword: 1.0 for keyword in [
+            'looking for api', 'need api', 'api for', 'is there an api for',
+            'api wrapper', 'rest api', 'graphql api'
+        ]})
+    
+    def harvest(self, sources):
+        """Descarga todas las fuentes a la vez y devuelve las oportunidades por fuente"""
+        scheduler = HarvestScheduler(sources, session=self.session, cache=self.cache)
+        results = scheduler.run()
+        
+        for name, metrics in scheduler.metrics_snapshot().items():
+            print(f"📊 {name}: {metrics['requests']} peticiones, {metrics['errors']} errores, "
+                  f"{metrics['throttled']} frenadas, latencia media {metrics['avg_latency_ms']} ms "
+                  f"(máx {metrics['max_latency_ms']} ms)")
+        return results
         
     def search_github_trending(self):
         """Busca APIs trending en GitHub"""
         print("🔍 Buscando APIs trending en GitHub...")
+        source = GitHubTrendingSource(self)
+        return self.github_opportunities(self.filter_relevant_repos(self.harvest([source])[source.name]))
+    
+    def parse_github_page(self, response):
+        """Extrae los repos candidatos (title, description) de una página de GitHub trending/topics"""
+        # Solo interesan los article.Box-row: se extraen en streaming sin construir el DOM
+        repos = []
+        extractor = StreamingHTMLExtractor(
+            on_box_row=repos.append,
+            encoding=charset_from_content_type(response.headers.get('Content-Type'))
+        )
+        extractor.feed_all(response.iter_content(chunk_size=64 * 1024))
         
-        urls = [
-            "https://github.com/trending?since=weekly",
-            "https://github.com/topics/api",
-            "https://github.com/topics/rest-api"
-        ]
-        
-        opportunities = []
+        # Filtrado y scoring se hacen después, en lote y solo sobre los repos nuevos
+        return repos
+    
+    def filter_relevant_repos(self, repos):
+        """Se queda con los repos cuyo título o descripción menciona APIs"""
+        if not repos:
+            return []
+        frame = pd.DataFrame(repos, columns=['title', 'description'])
+        mask = self.scoring.relevant(frame, title='title', description='description')
+        return [repo for repo, keep in zip(repos, mask) if keep]
+    
+    def github_opportunities(self, repos):
+        """Construye y puntúa en una sola pasada las oportunidades de repos de GitHub"""
+        if not repos:
+            return []
+        frame = pd.DataFrame(repos, columns=['title', 'description'])
+        scored = self.scoring.score(frame, title='title', description='description')
         
-        for url in urls:
-            try:
-                response = self.session.get(url)
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Buscar repositorios relacionados con APIs
-                repos = soup.find_all('article', class_='Box-row')
-                
-                for repo in repos[:10]:
-                    title_elem = repo.find('h2')
-                    if title_elem:
-                        title = title_elem.get_text(strip=True).replace('\n', '').replace(' ', '')
-                        description_elem = repo.find('p')
-                        description = description_elem.get_text(strip=True) if description_elem else ""
-                        
-                        if any(keyword in title.lower() or keyword in description.lower() 
-                              for keyword in ['api', 'rest', 'graphql', 'wrapper', 'client']):
-                            
-                            opportunity = {
-                                'name': title,
-                                'description': description,
-                                'source_url': f"https://github.com/{title}",
-                                'viability_score': self.calculate_viability(description),
-                                'demand_metric': self.estimate_demand(title),
-                                'implementation_complexity': 3.0,
-                                'category': 'github_trending',
-                                'tags': 'api,github,trending'
-                            }
-                            opportunities.append(opportunity)
-                            
-            except Exception as e:
-                print(f"❌ Error scraping {url}: {e}")
-                
-        return opportunities
+        opportunities = pd.DataFrame({
+            'name': scored['title'],
+            'description': scored['description'],
+            'source_url': 'https://github.com/' + scored['title'],
+            'viability_score': scored['viability_score'],
+            'demand_metric': scored['demand_metric'],
+            'implementation_complexity': 3.0,
+            'category': 'github_trending',
+            'tags': 'api,github,trending'
+        })
+        return opportunities.to_dict('records')
     
     def search_reddit_demand(self):
         """Analiza demanda en Reddit"""
         print("🔍 Analizando demanda en Reddit...")
+        source = RedditDemandSource(self)
+        return self.harvest([source])[source.name]
+    
+    def parse_reddit_listing(self, response, subreddit):
+        """Extrae oportunidades de un listado JSON de Reddit"""
+        if response.status_code != 200:
+            return []
         
+        data = response.json()
+        return self.reddit_opportunities(data['data']['children'], subreddit)
+    
+    def reddit_opportunities(self, posts, subreddit):
+        """Filtra los posts de Reddit que piden una API"""
         opportunities = []
-        subreddits = ['programming', 'webdev', 'learnprogramming', 'SideProject']
-        
-        for subreddit in subreddits:
-            try:
-                url = f"https://www.reddit.com/r/{subreddit}/hot.json?limit=20"
-                headers = {'User-Agent': 'API-Factory-Bot 1.0'}
-                response = self.session.get(url, headers=headers)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    posts = data['data']['children']
-                    
-                    for post in posts:
-                        post_data = post['data']
-                        title = post_data['title']
-                        selftext = post_data['selftext']
-                        url = post_data['url']
-                        
-                        # Buscar solicitudes de APIs
-                        api_keywords = ['looking for api', 'need api', 'api for', 'is there an api for', 
-                                      'api wrapper', 'rest api', 'graphql api']
-                        
-                        if any(keyword in title.lower() or keyword in selftext.lower() 
-                              for keyword in api_keywords):
-                            
-                            opportunity = {
-                                'name': f"Reddit Demand: {title[:50]}",
-                                'description': f"Demand from r/{subreddit}: {title}",
-                                'source_url': url,
-                                'viability_score': 7.0,
-                                'demand_metric': 8.0,
-                                'implementation_complexity': 4.0,
-                                'category': 'reddit_demand',
-                                'tags': f'demand,reddit,{subreddit}'
-                            }
-                            opportunities.append(opportunity)
-                            
-            except Exception as e:
-                print(f"❌ Error searching Reddit r/{subreddit}: {e}")
-                
+        if not posts:
+            return opportunities
+        
+        # Buscar solicitudes de APIs en todos los posts a la vez
+        texts = pd.Series([post['data']['title'] + KeywordMatcher.SEPARATOR + post['data']['selftext'] for post in posts])
+        requests_api = self.reddit_matcher.matches_any(texts)
+        
+        for post, is_request in zip(posts, requests_api):
+            post_data = post['data']
+            title = post_data['title']
+            url = post_data['url']
+            
+            if is_request:
+                opportunity = {
+                    'name': f"Reddit Demand: {title[:50]}",
+                    'description': f"Demand from r/{subreddit}: {title}",
+                    'source_url': url,
+                    'viability_score': 7.0,
+                    'demand_metric': 8.0,
+                    'implementation_complexity': 4.0,
+                    'category': 'reddit_demand',
+                    'tags': f'demand,reddit,{subreddit}'
+                }
+                opportunities.append(opportunity)
+        
         return opportunities
     
     def calculate_viability(self, description):
         """Calcula viabilidad basada en keywords"""
-        score = 5.0  # Base score
-        
-        positive_keywords = ['easy', 'simple', 'documented', 'popular', 'free', 'open source']
-        negative_keywords = ['complex', 'difficult', 'paid', 'enterprise', 'complicated']
-        
-        for keyword in positive_keywords:
-            if keyword in description.lower():
-                score += 0.5
-                
-        for keyword in negative_keywords:
-            if keyword in description.lower():
-                score -= 0.5
-                
-        return min(max(score, 1.0), 10.0)
+        return float(self.scoring.viability_scores(pd.Series([description])).iloc[0])
     
     def estimate_demand(self, title):
         """Estima demanda basada en el título"""
-        demand_keywords = ['popular', 'trending', 'hot', 'most used', 'essential']
-        score = 5.0
-        
-        for keyword in demand_keywords:
-            if keyword in title.lower():
-                score += 1.0
-                
-        return min(max(score, 1.0), 10.0)
+        return float(self.scoring.demand_scores(pd.Series([title])).iloc[0])
     
-    def save_opportunities(self, opportunities):
-        """Guarda oportunidades en la base de datos"""
+    def save_opportunities(self, opportunities, checkpoint=None):
+        """Guarda oportunidades en la base de datos.
+        
+        checkpoint(db), si se pasa, se ejecuta en la misma transacción: así
+        los cursores solo avanzan si las oportunidades se guardaron.
+        Devuelve el número de oportunidades insertadas.
+        """
         db = SessionLocal()
         try:
-            for opp_data in opportunities:
-                opportunity = ApiOpportunity(**opp_data)
-                db.add(opportunity)
-            
+            counts = PersistenceService().bulk_insert_opportunities(db, opportunities)
+            if checkpoint:
+                checkpoint(db)
             db.commit()
-            print(f"✅ Guardadas {len(opportunities)} oportunidades en la base de datos")
+            print(f"✅ Guardadas {counts['inserted']} oportunidades en la base de datos "
+                  f"({counts['skipped']} duplicadas omitidas)")
+            return counts['inserted']
         except Exception as e:
             db.rollback()
             print(f"❌ Error guardando oportunidades: {e}")
+            return 0
         finally:
             db.close()
 
+class GitHubTrendingSource(HarvestSource):
+    """Páginas trending/topics de GitHub"""
+    name = 'github'
+    rate_per_second = 1.0
+    burst = 3
+    deadline = 20.0
+    
+    urls = [
+        "https://github.com/trending?since=weekly",
+        "https://github.com/topics/api",
+        "https://github.com/topics/rest-api"
+    ]
+    
+    def __init__(self, discovery):
+        self.discovery = discovery
+    
+    def initial_requests(self):
+        return [HarvestRequest(url) for url in self.urls]
+    
+    def parse(self, request, response):
+        return HarvestPage(items=self.discovery.parse_github_page(response))
+
+
+class RedditDemandSource(HarvestSource):
+    """Listados new.json de subreddits de desarrollo, leídos de forma incremental.
+    
+    Los posts llegan del más nuevo al más antiguo: se pagina con `after`
+    hasta alcanzar el último post procesado en la pasada anterior (cursor)
+    o agotar max_pages. El post más nuevo de cada subreddit pasa a ser el
+    cursor de la próxima pasada solo si el recorrido llegó al cursor
+    anterior o al final del listado: si una página falla o se agota
+    max_pages, se conserva el cursor anterior para no saltarse los posts
+    intermedios. Los posts que se vuelvan a leer no se duplican: el índice
+    único de source_url los descarta al insertar (ON CONFLICT DO NOTHING).
+    """
+    name = 'reddit'
+    # Reddit permite ~60 peticiones/minuto sin OAuth
+    rate_per_second = 1.0
+    burst = 4
+    deadline = 15.0
+    # Las páginas dependen del cursor; reutilizar una respuesta cacheada reprocesaría posts
+    cacheable = False
+    
+    subreddits = ['programming', 'webdev', 'learnprogramming', 'SideProject']
+    page_size = 100
+    
+    def __init__(self, discovery, cursors=None, max_pages=5):
+        self.discovery = discovery
+        self.cursors = cursors or {}
+        self.max_pages = max_pages
+        self.newest = {}
+        # Post más nuevo visto en la página 0, pendiente de que el recorrido termine
+        self._walk_newest = {}
+    
+    def initial_requests(self):
+        return [self._listing_request(subreddit) for subreddit in self.subreddits]
+    
+    def _listing_request(self, subreddit, after=None, page=0):
+        url = f"https://www.reddit.com/r/{subreddit}/new.json?limit={self.page_size}"
+        if after:
+            url += f"&after={after}"
+        return HarvestRequest(
+            url,
+            headers={'User-Agent': 'API-Factory-Bot 1.0'},
+            context={'subreddit': subreddit, 'page': page}
+        )
+    
+    def parse(self, request, response):
+        if response.status_code != 200:
+            return HarvestPage()
+        
+        subreddit = request.context['subreddit']
+        last_seen_id, last_seen_created = self.cursors.get(subreddit, (None, None))
+        listing = response.json()['data']
+        
+        new_posts = []
+        reached_cursor = False
+        for post in listing['children']:
+            post_data = post['data']
+            if post_data.get('stickied'):
+                continue  # los fijados no siguen el orden cronológico
+            if post_data['name'] == last_seen_id or (
+                last_seen_created is not None and post_data['created_utc'] <= last_seen_created
+            ):
+                reached_cursor = True
+                break
+            new_posts.append(post)
+        
+        if request.context['page'] == 0 and new_posts:
+            newest = new_posts[0]['data']
+            self._walk_newest[subreddit] = (newest['name'], newest['created_utc'])
+        
+        next_requests = []
+        next_page = request.context['page'] + 1
+        has_more = not reached_cursor and listing.get('after')
+        if has_more and next_page < self.max_pages:
+            next_requests.append(self._listing_request(subreddit, listing['after'], next_page))
+        elif subreddit in self._walk_newest and (not has_more or last_seen_id is None):
+            # Sin cursor previo no hay hueco que proteger: la primera pasada no rellena el histórico
+            self.newest[subreddit] = self._walk_newest[subreddit]
+        
+        return HarvestPage(
+            items=self.discovery.reddit_opportunities(new_posts, subreddit),
+            next_requests=next_requests
+        )
+
+
 def main():
+    """Ejecuta una pasada de descubrimiento; devuelve el número de oportunidades nuevas guardadas"""
     discovery = ApiDiscovery()
     
     print("🚀 Iniciando descubrimiento automático de APIs...")
     
-    # Ejecutar diferentes métodos de descubrimiento
-    github_opportunities = discovery.search_github_trending()
-    reddit_opportunities = discovery.search_reddit_demand()
+    state = HarvestStateService()
+    db = SessionLocal()
+    try:
+        reddit = RedditDemandSource(discovery, cursors=state.load_cursors(db, 'reddit'))
+        
+        # Todas las fuentes se descargan en paralelo, cada una con su propio límite de ritmo
+        results = discovery.harvest([GitHubTrendingSource(discovery), reddit])
+        
+        # GitHub no tiene orden cronológico: solo se puntúan los repos nunca vistos
+        repos = {repo['title']: repo for repo in discovery.filter_relevant_repos(results['github'])}
+        new_titles = state.unseen_keys(db, 'github', repos)
+    finally:
+        db.close()
+    
+    github_opportunities = discovery.github_opportunities([repos[title] for title in repos if title in new_titles])
+    reddit_opportunities = results['reddit']
+    print(f"🆕 {len(github_opportunities)} repos nuevos de {len(repos)} candidatos; "
+          f"{len(reddit_opportunities)} oportunidades nuevas en Reddit")
+    
+    def checkpoint(db):
+        state.mark_seen(db, 'github', repos)
+        for subreddit, (last_seen_id, last_seen_created) in reddit.newest.items():
+            state.save_cursor(db, 'reddit', subreddit, last_seen_id, last_seen_created)
     
     all_opportunities = github_opportunities + reddit_opportunities
+    saved = discovery.save_opportunities(all_opportunities, checkpoint)
     
     if all_opportunities:
-        discovery.save_opportunities(all_opportunities)
         print(f"🎯 Total oportunidades encontradas: {len(all_opportunities)}")
         
-        # Mostrar resumen
-        for opp in all_opportunities[:5]:
+        # Mostrar resumen: las 5 mejores según el ranking
+        top = discovery.scoring.rank(pd.DataFrame(all_opportunities), top_k=5)
+        for opp in top.to_dict('records'):
             print(f"📌 {opp['name']} - Score: {opp['viability_score']}/10")
     else:
         print("❌ No se encontraron oportunidades")
+    
+    return saved
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""Recalcula viability_score y demand_metric de toda la tabla api_opportunities.
+
+Usar tras cambiar los pesos (SCORING_WEIGHTS_FILE o --weights):
+    python scripts/scoring/rescore_opportunities.py --weights pesos.json
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from app.database import SessionLocal  # noqa: E402
+from app.services.scoring_service import ScoringService, load_weights  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--weights', help='JSON con los pesos a aplicar')
+    parser.add_argument('--category', action='append', default=None,
+                        help='Categorías a recalcular (por defecto github_trending)')
+    args = parser.parse_args()
+
+    service = ScoringService(load_weights(args.weights))
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        count = service.rescore_table(db, args.category or ('github_trending',))
+        db.commit()
+        print(f"✅ {count} oportunidades recalculadas en {time.perf_counter() - start:.2f}s")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error recalculando oportunidades: {e}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
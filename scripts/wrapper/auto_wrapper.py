@@ -1,21 +1,51 @@
 #!/usr/bin/env python3
-import requests
-import json
 import os
 import re
-from sqlalchemy.orm import Session
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Dict, List, Optional, Tuple
 from app.database import SessionLocal
 from app.models.api_opportunity import ApiOpportunity
+from app.services.completion_engine import CompletionEngine, CompletionRequest
+from app.utils.code_extraction import FencedCodeWatcher, validate_python
+from app.utils.completion_cache import CompletionCache, get_completion_cache
+
+# Viabilidad mínima para generar el wrapper de una oportunidad
+VIABILITY_THRESHOLD = 6.0
+
+# Versión de la plantilla del prompt: forma parte de la clave de la caché,
+# subirla al cambiar el prompt invalida las respuestas anteriores
+# (2: solo se guarda código que compila)
+PROMPT_TEMPLATE_VERSION = "2"
+
+# Reintentos con prompt de reparación cuando el código devuelto no compila
+REPAIR_ATTEMPTS = int(os.getenv("WRAPPER_REPAIR_ATTEMPTS", "1"))
+
+def wrapper_path(opportunity):
+    """Ruta del fichero del wrapper generado para una oportunidad"""
+    safe_name = re.sub(r'[^a-zA-Z0-9]', '_', opportunity.name.lower())
+    return f"generated_wrappers/{safe_name}_api.py"
 
 class AutoWrapperGenerator:
-    def __init__(self):
-        self.deepseek_api_key = os.getenv("DEEPSEEK_API_KEY")
-        self.base_url = "https://api.deepseek.com/v1"
-        
-    def generate_wrapper(self, api_opportunity):
-        """Genera un wrapper de API usando DeepSeek"""
-        print(f"🛠️ Generando wrapper para: {api_opportunity.name}")
-        
+    def __init__(self, engine: CompletionEngine = None, cache: Optional[CompletionCache] = None, use_cache: bool = True):
+        # Un único motor compartido: concurrencia y presupuestos por minuto comunes
+        self.engine = engine or CompletionEngine()
+        self.cache = (cache or get_completion_cache()) if use_cache else None
+        # Peticiones en vuelo por clave: oportunidades repetidas esperan a la misma respuesta
+        self._in_flight: Dict[str, Future] = {}
+        self._in_flight_lock = threading.Lock()
+    
+    def cache_key(self, api_opportunity, request: CompletionRequest) -> str:
+        """Clave de la respuesta: modelo, versión del prompt, entradas normalizadas y temperatura"""
+        inputs = {
+            "name": api_opportunity.name,
+            "description": api_opportunity.description,
+            "source_url": api_opportunity.source_url,
+        }
+        return CompletionCache.key(self.engine.model, PROMPT_TEMPLATE_VERSION, inputs, request.temperature)
+    
+    def build_request(self, api_opportunity):
+        """Petición de chat completion para el wrapper de una oportunidad"""
         prompt = f"""
         Eres un experto desarrollador de APIs. Crea un wrapper de FastAPI para la siguiente API:
         
@@ -34,51 +64,153 @@ class AutoWrapperGenerator:
         
         Genera el código Python completo listo para usar.
         """
+        return CompletionRequest(
+            key=api_opportunity.id,
+            messages=[
+                {"role": "system", "content": "Eres un experto desarrollador de Python y FastAPI."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=4000,
+            temperature=0.3,
+            # Streaming: el stream se corta al cerrarse el bloque ```python
+            stream_stop=FencedCodeWatcher
+        )
+    
+    def repair_request(self, request: CompletionRequest, content: str, error: str) -> CompletionRequest:
+        """Petición de corrección: la conversación original, la respuesta fallida y el error"""
+        return CompletionRequest(
+            key=request.key,
+            messages=request.messages + [
+                {"role": "assistant", "content": content or ""},
+                {"role": "user", "content": (
+                    f"El código anterior no es Python válido: {error}. "
+                    "Devuelve el código completo corregido en un único bloque ```python, sin explicaciones."
+                )}
+            ],
+            max_tokens=request.max_tokens,
+            temperature=request.temperature,
+            stream_stop=request.stream_stop
+        )
+    
+    def generate_wrapper(self, api_opportunity):
+        """Genera un wrapper de API usando DeepSeek; devuelve la ruta del fichero o None"""
+        print(f"🛠️ Generando wrapper para: {api_opportunity.name}")
+        return self.save_code(api_opportunity, self.generate_code(api_opportunity))
+    
+    def generate_code(self, api_opportunity) -> Optional[str]:
+        """Código del wrapper: de la caché, de una petición ya en vuelo o de una nueva"""
+        request = self.build_request(api_opportunity)
+        key = self.cache_key(api_opportunity, request)
+        code = self.cache.get(key) if self.cache else None
+        if code is not None:
+            return code
+        
+        with self._in_flight_lock:
+            pending = self._in_flight.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._in_flight[key] = Future()
+        if not owner:
+            return pending.result()
         
         try:
-            headers = {
-                "Authorization": f"Bearer {self.deepseek_api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            data = {
-                "model": "deepseek-coder",
-                "messages": [
-                    {"role": "system", "content": "Eres un experto desarrollador de Python y FastAPI."},
-                    {"role": "user", "content": prompt}
-                ],
-                "max_tokens": 4000,
-                "temperature": 0.3
-            }
-            
-            response = requests.post(f"{self.base_url}/chat/completions", 
-                                   headers=headers, json=data, timeout=60)
-            
-            if response.status_code == 200:
-                result = response.json()
-                wrapper_code = result['choices'][0]['message']['content']
-                
-                # Extraer solo el código Python
-                python_code = self.extract_python_code(wrapper_code)
-                
-                if python_code:
-                    self.save_wrapper(api_opportunity, python_code)
-                    return True
-                else:
-                    print("❌ No se pudo extraer código Python válido")
-                    return False
-            else:
-                print(f"❌ Error en API DeepSeek: {response.status_code}")
-                return False
-                
+            result = self.engine.complete(request)
+            code, error = self.code_from_result(api_opportunity, key, result)
+            for _ in range(REPAIR_ATTEMPTS if error else 0):
+                request = self.repair_request(request, result.content, error)
+                result = self.engine.complete(request)
+                code, error = self.code_from_result(api_opportunity, key, result)
+                if not error:
+                    break
+            pending.set_result(code)
         except Exception as e:
-            print(f"❌ Error generando wrapper: {e}")
-            return False
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._in_flight_lock:
+                self._in_flight.pop(key, None)
+        return code
+    
+    def generate_many(self, opportunities):
+        """Genera los wrappers de todas las oportunidades a la vez; emite (oportunidad, ruta o None) según terminan.
+        
+        Las que ya están en caché no llegan al LLM y las repetidas dentro del
+        lote comparten una sola petición. Las respuestas que no compilan se
+        reenvían con un prompt de reparación sin esperar al resto del lote.
+        """
+        groups: Dict[str, List] = {}
+        requests = {}
+        cached = []
+        for opportunity in opportunities:
+            request = self.build_request(opportunity)
+            key = self.cache_key(opportunity, request)
+            if key in groups:
+                groups[key].append(opportunity)
+                continue
+            code = self.cache.get(key) if self.cache else None
+            if code is not None:
+                cached.append((opportunity, code))
+                continue
+            groups[key] = [opportunity]
+            request.key = key
+            requests[key] = request
+        
+        if cached:
+            print(f"♻️ {len(cached)} wrappers servidos desde la caché")
+        for opportunity, code in cached:
+            yield opportunity, self.save_code(opportunity, code)
+        
+        print(f"🛠️ Generando {len(requests)} wrappers (hasta {self.engine.concurrency} en paralelo)")
+        pending = {self.engine.submit(request): (request, 0) for request in requests.values()}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                request, repairs = pending.pop(future)
+                result = future.result()
+                group = groups[request.key]
+                code, error = self.code_from_result(group[0], request.key, result)
+                if error and repairs < REPAIR_ATTEMPTS:
+                    repair = self.repair_request(request, result.content, error)
+                    pending[self.engine.submit(repair)] = (repair, repairs + 1)
+                    continue
+                for opportunity in group:
+                    yield opportunity, self.save_code(opportunity, code)
+    
+    def code_from_result(self, api_opportunity, key: str, result) -> Tuple[Optional[str], Optional[str]]:
+        """(código, None) si la respuesta trae Python válido, que se guarda en la caché.
+        
+        (None, motivo) si hay que pedir una reparación; (None, None) si la
+        petición falló y no tiene arreglo por esa vía.
+        """
+        if not result.ok:
+            print(f"❌ Error generando wrapper para {api_opportunity.name}: {result.error}")
+            return None, None
+        
+        # Extraer solo el código Python y comprobar que compila
+        python_code = self.extract_python_code(result.content or "")
+        error = validate_python(python_code)
+        if error:
+            print(f"⚠️ Código no válido para {api_opportunity.name}: {error}")
+            return None, error
+        
+        if self.cache:
+            self.cache.store(key, python_code, tokens=result.tokens, meta={"name": api_opportunity.name})
+        return python_code, None
+    
+    def save_code(self, api_opportunity, python_code: Optional[str]):
+        """Guarda el código de un wrapper; devuelve la ruta del fichero o None"""
+        if python_code is None:
+            return None
+        try:
+            return self.save_wrapper(api_opportunity, python_code)
+        except Exception as e:
+            print(f"❌ Error guardando wrapper: {e}")
+            return None
     
     def extract_python_code(self, text):
         """Extrae código Python del texto generado"""
         # Buscar bloques de código entre ```
-        code_blocks = re.findall(r'```python\n(.*?)\n```', text, re.DOTALL)
+        code_blocks = re.findall(r'```(?:python|py|python3)[ \t]*\r?\n(.*?)\n```', text, re.DOTALL | re.IGNORECASE)
         if code_blocks:
             return code_blocks[0]
         
@@ -98,8 +230,7 @@ class AutoWrapperGenerator:
     
     def save_wrapper(self, opportunity, code):
         """Guarda el wrapper generado"""
-        safe_name = re.sub(r'[^a-zA-Z0-9]', '_', opportunity.name.lower())
-        filename = f"generated_wrappers/{safe_name}_api.py"
+        filename = wrapper_path(opportunity)
         
         os.makedirs("generated_wrappers", exist_ok=True)
         
@@ -108,39 +239,78 @@ class AutoWrapperGenerator:
         
         print(f"✅ Wrapper guardado en: {filename}")
         
-        # Actualizar base de datos
+        # Actualizar base de datos (checkpoint: la oportunidad ya no está pendiente)
         db = SessionLocal()
         try:
-            opportunity.is_processed = True
+            db.query(ApiOpportunity).filter(ApiOpportunity.id == opportunity.id).update(
+                {ApiOpportunity.is_processed: True}
+            )
             db.commit()
         except Exception as e:
             db.rollback()
             print(f"❌ Error actualizando BD: {e}")
         finally:
             db.close()
+        
+        return filename
 
-def process_pending_opportunities():
-    """Procesa oportunidades pendientes de la base de datos"""
+def process_pending_opportunities(generator=None):
+    """Genera los wrappers de todas las oportunidades pendientes; devuelve las rutas generadas"""
     db = SessionLocal()
     try:
-        opportunities = db.query(ApiOpportunity).filter(
+        # Solo las columnas que usa el prompt: la cola completa, no un lote fijo
+        opportunities = db.query(
+            ApiOpportunity.id, ApiOpportunity.name, ApiOpportunity.description, ApiOpportunity.source_url
+        ).filter(
             ApiOpportunity.is_processed == False,
-            ApiOpportunity.viability_score >= 6.0
-        ).limit(3).all()
-        
-        generator = AutoWrapperGenerator()
-        success_count = 0
-        
-        for opportunity in opportunities:
-            if generator.generate_wrapper(opportunity):
-                success_count += 1
-                
-        print(f"🎉 Wrappers generados exitosamente: {success_count}/{len(opportunities)}")
-        
+            ApiOpportunity.viability_score >= VIABILITY_THRESHOLD
+        ).order_by(ApiOpportunity.viability_score.desc()).all()
+    finally:
+        db.close()
+    
+    generated = []
+    owns_generator = generator is None
+    generator = generator or AutoWrapperGenerator()
+    try:
+        # Cada wrapper se guarda y marca como procesado en cuanto llega (checkpoint)
+        for _, filename in generator.generate_many(opportunities):
+            if filename:
+                generated.append(filename)
+        print(f"🎉 Wrappers generados exitosamente: {len(generated)}/{len(opportunities)}")
+        print(f"📊 LLM: {generator.engine.metrics}")
+        if generator.cache:
+            print(f"📊 Caché LLM: {generator.cache.stats()}")
     except Exception as e:
         print(f"❌ Error procesando oportunidades: {e}")
     finally:
+        if owns_generator:
+            generator.engine.close()
+    
+    return generated
+
+def pending_opportunity_ids(db):
+    """Oportunidades por encima del umbral aún sin wrapper, de mayor a menor viabilidad"""
+    rows = db.query(ApiOpportunity.id).filter(
+        ApiOpportunity.is_processed == False,
+        ApiOpportunity.viability_score >= VIABILITY_THRESHOLD
+    ).order_by(ApiOpportunity.viability_score.desc()).all()
+    return [row.id for row in rows]
+
+def generate_for_opportunity(opportunity_id, generator=None):
+    """Genera el wrapper de una oportunidad; devuelve (id, ruta) para la etapa de despliegue o None"""
+    db = SessionLocal()
+    try:
+        opportunity = db.query(
+            ApiOpportunity.id, ApiOpportunity.name, ApiOpportunity.description, ApiOpportunity.source_url
+        ).filter(ApiOpportunity.id == opportunity_id, ApiOpportunity.is_processed == False).first()
+    finally:
+        # La sesión no se retiene durante la llamada al LLM
         db.close()
+    if opportunity is None:
+        return None
+    
+    filename = (generator or AutoWrapperGenerator()).generate_wrapper(opportunity)
+    return (opportunity_id, filename) if filename else None
 
 if __name__ == "__main__":
     process_pending_opportunities()